@@ -23,7 +23,7 @@ import re
 
 __author__ = 'R.D. Vaughan <rdvLaunchpad@gmail.com>'
 __date__ = '$03/09/2012'
-__version__ = '0.2.2'
+__version__ = '0.2.3'
 # Version change log:
 # 0.1.0 Initial development
 # 0.1.1 Alpha release
@@ -145,6 +145,54 @@ __version__ = '0.2.2'
 # 0.2.2 Bug Fix:
 #       Handle abort when mediainfo cannot find a video's duration.
 #       The issue is likely caused by a corrupt recording.
+# 0.2.3 Added a new configuration section "performance".
+#       The recording device details are read with a single joined
+#       query and cached on disk per channel.
+#       Added disk caches for grabber metadata and MythVideo artwork.
+#       Added a precompiled ISO639-2 language code index file.
+#       Concert Cuts are cut with a single mkvmerge pass and each
+#       segment is exported while the following segments are cut.
+#       Error detection rules are run concurrently up to and including
+#       each "abort" rule.
+#       Added a preflight stage of checks before any full pass over the
+#       recording.
+#       Added per job stage timing and I/O statistics JSON files.
+#       Added the "--profile" option files.
+#       Added the ll_benchmark.py micro benchmark script.
+#       Jobs reserve their working directory disk space in a shared
+#       ledger and wait for space instead of overcommitting the directory.
+#       The "-s" option also displays an execution plan with the predicted
+#       I/O, working directory space, output size and run time.
+#       Added an SQLite stand-in for the MythTV python bindings and tools
+#       so whole jobs can be timed without a MythTV install.
+#       Each job works in its own scratch directory in the working
+#       directory which is removed as a unit when the job ends. The
+#       Concert Cuts error paths no longer remove other jobs' files.
+#       Added a per recording processing lease so a second lossless_cut or
+#       keyframe_adjust job for the same recording waits or exits.
+#       A job records its finished stages in a manifest. A rerun after the
+#       job died resumes from the first stage that cannot be verified.
+#       A job that failed after finishing a stage keeps its scratch
+#       directory and finished stage files for a rerun to resume.
+#       Cut segments can be kept in a segment cache so a re-cut after a
+#       cut list change only cuts the segments whose boundaries changed.
+#       The cache is off by default and is limited in size.
+#       The mkvmerge cut and merge arguments are passed in option files
+#       so very long cut lists never hit command line length limits.
+#       The cut segments can be cut by several mkvmerge processes at the
+#       same time with the new "cut_processes" performance setting. Each
+#       process reads only its own span of a transport stream recording.
+#       A recording without usable recordedseek table keyframe records
+#       has its keyframes found by scanning the MPEG transport stream.
+#       A sample video's seek table is trimmed to the sample by
+#       bisecting the keyframe timestamps instead of row by row and its
+#       database records pickle is loaded with cPickle.
+#       The recorded record is read by the chanid and start time in the
+#       recording's basename before searching by basename.
+#       Added the "-R" transport stream cut which copies the kept byte
+#       ranges of the recording into a trimmed transport stream.
+#       Added the "-F" follow option which cuts the final segments of a
+#       recording into the segment cache while it is still being recorded.
 #
 __copyright__ = 'Copyright (c) 2012 R.D. Vaughan'
 __license__ = 'GPLV2'
@@ -175,6 +223,8 @@ INIT_MKVMERGE_USER_SETTINGS_CONFIG_FILE = \
             u'%simportcode/init_mkvmerge_user_settings.cfg' % APPDIR
 INIT_ERROR_DETECTION_CONFIG_FILE = \
             u'%simportcode/init_error_detection.cfg' % APPDIR
+INIT_PERFORMANCE_CONFIG_FILE = \
+            u'%simportcode/init_performance.cfg' % APPDIR
 INIT_PROJECTX_INI_FILE = u'%simportcode/init_ProjectX.ini' % APPDIR
 PROJECTX_INI_PATH = u'%(workpath)s/%(recorded_name)s.ini'
 #
@@ -197,16 +247,131 @@ EXTRACT_DVB_SUBTITLES = u'''-Djava.awt.headless=true -jar "%(projectx_jar_path)s
 CLEAR_CUTLIST = u'--clearcutlist --chanid %(chanid)s --starttime "%(SQL_starttime)s"'
 CLEAR_SKIPLIST = u'--clearskiplist --chanid %(chanid)s --starttime "%(SQL_starttime)s"'
 GEN_CUTLIST = u'--gencutlist --chanid %(chanid)s --starttime "%(SQL_starttime)s"'
-CUTS_CMD = u'-o "%(workpath)s/%(recorded_name)s-%%04d.mkv" %(strip_args)s --split parts:%(split_list)s "%(sourcefile)s"'
-CONCERT_CUTS_CMD = u'-o "%(segment_path)s/%(segment_filename)s.mkv" %(strip_args)s --split parts:%(split_list)s "%(sourcefile)s"'
+## The numbered segment files of the mkvmerge "--split parts:" cut
+CUTS_OUTPUT = u'%(workpath)s/%(recorded_name)s-%%04d.mkv'
+## A cut segment file, the name prefix newly cut segments are given
+## before they take their places among the segments reused from the
+## segment cache in the working directory and the cached segments. Each
+## mkvmerge cut process has its own prefix.
+SEGMENT_FILE = u'%(workpath)s/%(recorded_name)s-%(seg_num)04d.mkv'
+SEGMENT_CUT_PREFIX = u'%(recorded_name)s.new%(cut_process)02d'
+## The copy of a transport stream recording's span of kept parts that one
+## of several mkvmerge cut processes reads
+SEGMENT_SPAN_FILE = u'%(workpath)s/%(recorded_name)s.span%(cut_process)02d.ts'
+SEGMENT_CACHE_DIR = u'%(workpath_root)s/segment_cache'
+SEGMENT_CACHE_FILE = u'%(segment_cache)s/%(recorded_name)s-%(key)s.mkv'
+CONCERT_CUTS_FILE = u'%(workpath)s/%(recorded_name)s-cc-%%04d.mkv'
+CONCERT_CUTS_LOG = u'%(workpath)s/%(recorded_name)s-cc.log'
+## How often the Concert Cuts mkvmerge output files are checked
+CONCERT_CUTS_POLL_SECONDS = 0.5
 #
-START_CUT_CMD = u'%(strip_args)s --split parts:%(split_list)s "%(sourcefile)s"'
 CONVERT_CMD = u'%s -o "%%s" --title "%%s" --attachment-description "%%s" "%%s" &>>"%%s"'
 GEN_GET_CUTLIST_CMD = u'--chanid %(chanid)s --starttime "%(SQL_starttime)s"'
 #
+## A MythTV recording's basename holds the recorded table primary key, the
+## channel id and start time e.g. "1001_20120913200000.mpg". The start time
+## is UTC from MythTV v0.26.
+RECORDED_BASENAME_REGEX = re.compile(
+        u'''^(?P<chanid>[0-9]+)_(?P<starttime>[0-9]{14})\.[^.]+$''',
+        re.UNICODE)
+RECORDED_BASENAME_TIME_FORMAT = '%Y%m%d%H%M%S'
+RECORDED_UTC_ISO_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
 ## Command line utilities
 MKVMERGE = u'mkvmerge'
 MKVMERGE_MIN_VERSION = '5.7'
+## The mkvmerge cut and merge arguments are passed in an option file.
+## MKVToolNix 7.9.0 and later read a JSON array, earlier versions one
+## argument per line with these characters escaped. A JSON option file
+## must have the ".json" extension.
+MKVMERGE_OPTIONS_FILE = u'%(workpath)s/%(recorded_name)s_%(purpose)s.options'
+MKVMERGE_JSON_OPTIONS_FILE = \
+            u'%(workpath)s/%(recorded_name)s_%(purpose)s.json'
+MKVMERGE_JSON_OPTIONS_VERSION = (7, 9)
+MKVMERGE_OPTIONS_ESCAPES = [(u'\\', u'\\\\'), (u' ', u'\\s'),
+                            (u'"', u'\\2'), (u'#', u'\\h'), ]
+## Per job stage timing and I/O statistics saved next to the log file
+JOB_STATS_FILE = u'%(logpath)s/%(recorded_name)s_stats.json'
+## The "--profile" option's statistics and summary files
+PROFILE_STATS_FILE = u'%(logpath)s/%(recorded_name)s_%(script)s.prof'
+PROFILE_SUMMARY_FILE = u'%(logpath)s/%(recorded_name)s_%(script)s_profile.txt'
+PROFILE_TOP_N = 40
+PROFILE_MEMORY_TOP_N = 10
+## ll_benchmark.py synthetic recording sizes, saved baseline file and the
+## slow down compared to the baseline that is reported as a regression
+BENCHMARK_SIZES = {
+    'small': {'seek_rows': 20000, 'cuts': 20, },
+    'medium': {'seek_rows': 100000, 'cuts': 100, },
+    'large': {'seek_rows': 500000, 'cuts': 300, },
+}
+BENCHMARK_BASELINE_FILE = u'%s/ll_benchmark_baseline.json' % CONFIG_DIR
+BENCHMARK_REGRESSION_RATIO = 1.25
+## Benchmarks quicker than this in the baseline are too noisy to be
+## reported as a regression e.g. the short end to end job stages
+BENCHMARK_MIN_COMPARE_SECONDS = 0.01
+## When set this environment variable names the SQLite data base file of
+## the MythTV bindings stand-in (importcode/mythtv_standin.py) which is
+## then used instead of the MythTV python bindings
+MYTHTV_STANDIN_ENV = 'LOSSLESS_CUT_MYTHTV_STANDIN'
+## Extra disk space allowed for when estimating the space a job needs
+PREFLIGHT_DISK_SPACE_MARGIN = 1.05
+## Each job's scratch directory inside the configured working directory
+## and the file naming the host and process that owns it
+JOB_WORKPATH = u'%(workpath_root)s/%(recorded_name)s.%(pid)d.job'
+JOB_WORKPATH_GLOB = u'%s/*.job'
+JOB_WORKPATH_RECORDING_GLOB = u'%(workpath_root)s/%(recorded_name)s.*.job'
+JOB_WORKPATH_OWNER = u'%s/.owner'
+## The manifest of a job's finished stages in its scratch directory and
+## the samples of each output file that are checksummed
+JOB_MANIFEST_FILE = u'%(workpath)s/.manifest.json'
+MANIFEST_SAMPLES = 4
+MANIFEST_SAMPLE_BYTES = 1024 * 1024
+## A job that failed after finishing a stage keeps its scratch directory
+## so a rerun can resume. It is removed after this many hours.
+JOB_WORKPATH_RESUME_HOURS = 24
+## The working directory disk space reservation ledger and how often a
+## job waiting for space checks the ledger again. The ledger is kept in
+## the configured working directory and not in a job's scratch directory.
+RESERVATION_LEDGER_FILE = u'%(workpath)s/.lossless_cut_reservations.json'
+RESERVATION_POLL_SECONDS = 30
+## The per recording processing leases kept in the "performance" section
+## "cachepath" directory and how often a job waiting for a lease checks it
+LEASE_DIR = u'%(cachepath)s/leases'
+LEASE_FILE = u'%(leasepath)s/%(chanid)s_%(starttime)s.json'
+LEASE_LOCK_FILE = u'%s/.lock'
+LEASE_STARTTIME_FORMAT = '%Y%m%d%H%M%S'
+LEASE_POLL_SECONDS = 10
+## The "-s" execution plan. The stage throughput of earlier jobs is kept
+## in the "performance" section "cachepath" directory. Each new job
+## counts fully and the earlier jobs' totals are scaled down by the decay.
+PLAN_STAGES = ['mediainfo', 'metadata', 'subtitles', 'cut', 'merge',
+               'export', 'tscut', ]
+PLAN_METADATA_STAGES = ['mediainfo', 'metadata', ]
+PLAN_DEFAULT_THROUGHPUT = 50 * 1024 * 1024
+THROUGHPUT_HISTORY_FILE = u'%(cachepath)s/throughput.pickle'
+THROUGHPUT_HISTORY_HOURS = 90 * 24
+THROUGHPUT_HISTORY_DECAY = 0.8
+## The MPEG transport stream keyframe scan used when a recording's
+## recordedseek table has no usable keyframe records. Packets are read in
+## batches from the memory mapped recording and the program tables are
+## looked for in the first part of the recording.
+TS_PACKET_SIZE = 188
+TS_SYNC_BYTE = '\x47'
+TS_SCAN_BATCH_PACKETS = 8192
+TS_PROGRAM_SCAN_BYTES = 32 * 1024 * 1024
+## Transport stream video stream types: MPEG-1/2, H.264 and H.265
+TS_VIDEO_STREAM_TYPES = {0x01: 'mpeg2', 0x02: 'mpeg2', 0x1b: 'h264',
+                         0x24: 'hevc', }
+## The transport stream cut "-R" copies each kept byte range of the
+## recording with kernel copies of at most the copy bytes each, or in
+## blocks when the kernel copies cannot be used. A replaced recording is
+## first cut to a temporary file beside it as the cut keeps the
+## recording's file name.
+TS_CUT_COPY_BYTES = 64 * 1024 * 1024
+TS_CUT_BLOCK_BYTES = 1024 * 1024
+TS_CUT_REPLACE_FILE = u'%(recorded_dir)s/%(recorded_name)s.tscut%(output_extension)s'
+## mkvmerge exit codes: 0 success, 1 warnings, 2 errors
+MKVMERGE_ERROR_RETURN_CODE = 2
 MKVTOOLNIX_DOWNLOADS_URL = u'https://www.bunkus.org/videotools/mkvtoolnix/downloads.html'
 MKVTOOLNIX_SOURCE_URL = u'https://www.bunkus.org/videotools/mkvtoolnix/source.html'
 MEDIAINFO = u'mediainfo'
@@ -221,14 +386,31 @@ BIT_ARCH_64 = u'%ssubtitle/%s64bit'
 BIT_ARCH_32 = u'%ssubtitle/%s32bit'
 CCEXTRACTOR = u'ccextractor'
 ISO639_2_LANG_CODE_FILE = u'%simportcode/ISO639-2_language_code.txt' % APPDIR
+ISO639_2_LANG_INDEX_FILE = u'%(cachepath)s/iso639_2_index.pickle'
+## Precompiled indexes of an older layout are rebuilt
+ISO639_2_LANG_INDEX_FORMAT = 2
 #
 ## SQL statements used for processing a lossless cut recording
 SQL_GET_GENRE = u"SELECT genre FROM `programgenres` WHERE chanid=%(chanid)s AND starttime='%(SQL_progstart)s' LIMIT 1;"
 #
-## SQL statements to collect information on the device that recorded the video
-SQL_GET_CARDID = u"SELECT `cardtype`, `defaultinput`, `videodevice`, `audiodevice`, `hostname` FROM `capturecard` WHERE `cardid` = %d"
-SQL_GET_CARDINFO = u"SELECT `cardid`, `displayname` FROM `cardinput` WHERE `sourceid` = %d"
-SQL_GET_SOURCEID = u"SELECT `sourceid`  FROM `channel` WHERE `chanid` = %d"
+## SQL statement to collect information on the device that recorded the video
+SQL_GET_RECORDER_DETAILS = u"SELECT `cardinput`.`displayname`, `capturecard`.`cardtype`, `capturecard`.`defaultinput`, `capturecard`.`videodevice`, `capturecard`.`audiodevice`, `capturecard`.`hostname` FROM `channel` INNER JOIN `cardinput` ON `cardinput`.`sourceid` = `channel`.`sourceid` INNER JOIN `capturecard` ON `capturecard`.`cardid` = `cardinput`.`cardid` WHERE `channel`.`chanid` = %d ORDER BY `cardinput`.`cardinputid` LIMIT 1"
+## The configuration keys in the same order as the SQL_GET_RECORDER_DETAILS
+## columns
+RECORDER_DETAIL_KEYS = ['recorder_displayname', 'recorders_cardtype',
+                        'recorders_defaultinput', 'recorders_videodevice',
+                        'recorders_audiodevice', 'recorders_hostname', ]
+#
+## Disk caches kept in the "performance" section "cachepath" directory
+RECORDER_CACHE_FILE = u'%(cachepath)s/recorders.pickle'
+METADATA_CACHE_FILE = u'%(cachepath)s/metadata.pickle'
+ARTWORK_CACHE_FILE = u'%(cachepath)s/artwork.pickle'
+## The artwork record fields that are cached
+ARTWORK_KEYS = ['season', 'coverart', 'fanart', 'banner', ]
+#
+## The recordedmarkup skip and cut list types dropped when a sample video's
+## records are loaded as their frame numbers no longer apply
+SAMPLE_SKIPPED_MARKUP_TYPES = frozenset([0, 1, 4, 5, 34])
 #
 ## SQL statements for collecting and inserting a Recording's data base records.
 ## Used to assist in problem analysis and testing
@@ -341,9 +523,35 @@ DEFAULT_CONFIG_SETTINGS = {
         'unknown_1': u'3',
         'unknown_2': u'1',
         'vobsub_delay': u'0',
-    }
+    },
+    #
+    # Defaults for the performance section
+    'performance_defaults': {
+        'cachepath': u'~/.mythtv/lossless_cut_cache',
+        'recorder_cache_hours': u'168',
+        'metadata_cache_hours': u'24',
+        'metadata_cache_size': u'500',
+        'artwork_cache_hours': u'24',
+        'concert_cuts_queue_size': u'1',
+        'error_detection_workers': u'4',
+        'reservation_wait_minutes': u'120',
+        'lease_wait_minutes': u'0',
+        'segment_cache_hours': u'0',
+        'segment_cache_megabytes': u'4096',
+        'cut_processes': u'1',
+        'follow_poll_seconds': u'60',
+        'follow_guard_seconds': u'300',
+    },
 }
 #
+## Performance section variables which must be integers
+PERFORMANCE_INTEGER_OPTIONS = ['recorder_cache_hours',
+    'metadata_cache_hours', 'metadata_cache_size', 'artwork_cache_hours',
+    'concert_cuts_queue_size', 'error_detection_workers',
+    'reservation_wait_minutes', 'lease_wait_minutes',
+    'segment_cache_hours', 'segment_cache_megabytes', 'cut_processes',
+    'follow_poll_seconds', 'follow_guard_seconds', ]
+#
 CONCERT_CUT_DEFAULT_FORMAT = u'%SEGNUMPAD% - %TITLE%: %SUBTITLE%'
 #
 FORMAT_SUP_VALUES = u'''%(font_point_size)s,%(background_alpha)s,%(yoffset)s,%(xoffset)s,%(xwidth)s,%(h_unused)s,%(vertical)s,%(yoffset2)s,%(maxlines)s,%(unknown_1)s,%(unknown_2)s'''
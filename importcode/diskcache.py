@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+# ----------------------
+# Name: diskcache.py   Provides a small persistent key/value cache
+#                      used by lossless_cut
+# Python Script
+# Author:   R.D. Vaughan
+# Purpose:  This python script supports the lossless_cut.py.
+#           Keeps data that rarely changes (e.g. recording device details)
+#           on disk so repeated and batch jobs can skip the look ups.
+#
+# Copyright (C) 2012 R.D. Vaughan
+# rdvLaunchpad@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# License:Creative Commons GNU GPL v2
+# (https://www.gnu.org/licenses/gpl-2.0.html)
+#-------------------------------------
+#
+"""
+__version__ = '0.1.1'
+# Version change log:
+# 0.1.0 Initial development
+# 0.1.1 Added an optional maximum number of entries with the least
+#       recently used entries removed first.
+#       Values which cannot be pickled are silently not cached.
+#
+## Common function imports
+import os
+import time
+import fcntl
+import tempfile
+from pickle import load, dump, dumps
+#
+#
+class DiskCache(object):
+    """A pickle file backed cache. Every entry is stamped with the time it
+    was stored and is ignored once it is older than the time to live.
+    When a maximum number of entries is set the time each entry was last
+    used is also kept and the least recently used entries are dropped.
+    Updates are written to a temporary file then renamed so a job that
+    dies part way through never leaves a corrupt cache behind.
+    """
+
+    def __init__(self, filename, ttl, max_entries=0):
+        #
+        self.filename = filename
+        # Time to live in seconds, zero or less disables the cache
+        self.ttl = ttl
+        # Maximum number of entries, zero or less means no limit
+        self.max_entries = max_entries
+        #
+        return    # end __init__()
+
+    def _read(self, ):
+        ''' Read the whole cache file. A missing or unreadable cache
+        file is treated as an empty cache.
+        return dictionary of cache entries
+        '''
+        try:
+            fileh = open(self.filename, 'rb')
+        except IOError:
+            return {}
+        try:
+            try:
+                entries = load(fileh)
+            except Exception:
+                entries = {}
+        finally:
+            fileh.close()
+        #
+        if not isinstance(entries, dict):
+            return {}
+        return entries
+
+    def _write(self, entries):
+        ''' Save the cache entries by writing a temporary file in the
+        cache directory and renaming it over the old cache file.
+        return nothing
+        '''
+        directory = os.path.dirname(self.filename)
+        fileno, temp_filename = tempfile.mkstemp(dir=directory,
+                                                    suffix=u'.tmp')
+        fileh = os.fdopen(fileno, 'wb')
+        try:
+            dump(entries, fileh, 2)
+        finally:
+            fileh.close()
+        os.rename(temp_filename, self.filename)
+        #
+        return
+
+    def _locked(self, ):
+        ''' Serialize read-modify-write cycles between concurrent jobs.
+        return an open lock file handle which releases the lock when closed
+        '''
+        lockh = open(self.filename + u'.lock', 'a')
+        fcntl.flock(lockh.fileno(), fcntl.LOCK_EX)
+        return lockh
+
+    def get(self, key):
+        ''' Look up a cache entry.
+        return the cached value or None when missing or expired
+        '''
+        if self.ttl <= 0:
+            return None
+        #
+        entry = self._read().get(key)
+        if entry is None:
+            return None
+        now = time.time()
+        if now - entry[0] > self.ttl:
+            return None
+        #
+        ## Only a size limited cache needs to remember when an entry
+        ## was last used
+        if self.max_entries > 0:
+            try:
+                lockh = self._locked()
+            except (IOError, OSError):
+                return entry[1]
+            try:
+                entries = self._read()
+                if key in entries:
+                    entries[key] = (entries[key][0], entries[key][1], now)
+                    try:
+                        self._write(entries)
+                    except (IOError, OSError):
+                        pass
+            finally:
+                lockh.close()
+        #
+        return entry[1]
+
+    def set(self, key, value):
+        ''' Store a value and drop any entries that have expired.
+        Failing to save the cache is never fatal to a job.
+        return nothing
+        '''
+        if self.ttl <= 0:
+            return
+        #
+        ## Some grabber results hold objects that cannot be pickled
+        try:
+            dumps(value, 2)
+        except Exception:
+            return
+        #
+        try:
+            lockh = self._locked()
+        except (IOError, OSError):
+            return
+        try:
+            now = time.time()
+            entries = self._read()
+            for old_key in entries.keys():
+                if now - entries[old_key][0] > self.ttl:
+                    del entries[old_key]
+            entries[key] = (now, value, now)
+            #
+            ## Drop the least recently used entries when over the limit.
+            ## The last element of an entry is the time it was last used.
+            if self.max_entries > 0 and len(entries) > self.max_entries:
+                by_last_used = sorted(entries.keys(),
+                                    key=lambda k: entries[k][-1])
+                for old_key in by_last_used[:len(entries) - \
+                                                    self.max_entries]:
+                    del entries[old_key]
+            try:
+                self._write(entries)
+            except (IOError, OSError):
+                pass
+        finally:
+            lockh.close()
+        #
+        return
@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+# ----------------------
+# Name: jobstats.py   Provides per job stage timing and I/O accounting
+#                     used by lossless_cut
+# Python Script
+# Author:   R.D. Vaughan
+# Purpose:  This python script supports the lossless_cut.py.
+#           Times each processing stage of a job and the bytes read and
+#           written during the stage then saves the results as a JSON file
+#           next to the job's log file.
+#
+# Copyright (C) 2012 R.D. Vaughan
+# rdvLaunchpad@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# License:Creative Commons GNU GPL v2
+# (https://www.gnu.org/licenses/gpl-2.0.html)
+#-------------------------------------
+#
+"""
+__version__ = '0.1.1'
+# Version change log:
+# 0.1.0 Initial development
+# 0.1.1 Added the resource usage of every external tool run. The runs are
+#       tagged with the stage that started them and totaled per tool.
+#       Added stage boundary hooks
+#       A tool run's block I/O is recorded as its storage bytes
+#
+## Common function imports
+import os
+import time
+import json
+import shlex
+from datetime import datetime
+from contextlib import contextmanager
+#
+## The /proc/self/io counters that are recorded and their JSON names.
+## The kernel adds the counters of child processes once they have been
+## waited for so the external tools' I/O is included.
+IO_COUNTERS = [
+    ('rchar', 'bytes_read'),
+    ('wchar', 'bytes_written'),
+    ('read_bytes', 'storage_bytes_read'),
+    ('write_bytes', 'storage_bytes_written'),
+]
+#
+## Every external tool run by this process and the job statistics
+## currently being collected
+TOOL_RUNS = []
+_ACTIVE_JOB = [None]
+## Functions called with the stage name and "start" or "end" at each
+## stage boundary e.g. the "--profile" memory snapshots
+STAGE_HOOKS = []
+#
+#
+def current_stage():
+    ''' The name of the innermost stage of the active job.
+    return the stage name or None when there is no stage running
+    '''
+    if _ACTIVE_JOB[0] is None:
+        return None
+    return _ACTIVE_JOB[0].current_stage()
+#
+def tool_name(command):
+    ''' Get the name of the program from a command line.
+    return the base name of the command line's program
+    '''
+    try:
+        argv = shlex.split(command.encode('utf8'))
+    except ValueError:
+        argv = command.encode('utf8').split()
+    if not argv:
+        return u''
+    return unicode(os.path.basename(argv[0]), 'utf8')
+#
+def record_tool_run(command, returncode, seconds, rusage, stage):
+    ''' Record the cost of one external tool run. The resource usage
+    from os.wait4 is for the tool and any processes it waited for. Its
+    block counts are storage I/O, so page cache hits are not included.
+    return nothing
+    '''
+    record = {
+        'tool': tool_name(command),
+        'argv': command,
+        'returncode': returncode,
+        'stage': stage,
+        'seconds': round(seconds, 3),
+    }
+    if rusage is not None:
+        record['user_seconds'] = round(rusage.ru_utime, 3)
+        record['system_seconds'] = round(rusage.ru_stime, 3)
+        record['max_rss_kb'] = rusage.ru_maxrss
+        record['storage_bytes_read'] = rusage.ru_inblock * 512
+        record['storage_bytes_written'] = rusage.ru_oublock * 512
+    TOOL_RUNS.append(record)
+    #
+    return
+#
+def tool_totals(tool_runs):
+    ''' Add up the tool runs per tool. Peak memory is the largest of any
+    one run.
+    return dictionary of totals keyed by tool name
+    '''
+    totals = {}
+    for record in tool_runs:
+        total = totals.setdefault(record['tool'], {'count': 0,
+                        'seconds': 0.0, 'user_seconds': 0.0,
+                        'system_seconds': 0.0, 'max_rss_kb': 0,
+                        'storage_bytes_read': 0,
+                        'storage_bytes_written': 0, 'failed': 0, })
+        total['count'] += 1
+        if record['returncode']:
+            total['failed'] += 1
+        for key in ['seconds', 'user_seconds', 'system_seconds']:
+            total[key] = round(total[key] + record.get(key, 0.0), 3)
+        for key in ['storage_bytes_read', 'storage_bytes_written']:
+            total[key] += record.get(key, 0)
+        total['max_rss_kb'] = max(total['max_rss_kb'],
+                                    record.get('max_rss_kb', 0))
+    #
+    return totals
+#
+#
+def read_process_io():
+    ''' Read this process's I/O counters.
+    return dictionary of I/O counters, empty when they are not available
+    '''
+    counters = {}
+    try:
+        fileh = open('/proc/self/io', 'r')
+    except IOError:
+        return counters
+    try:
+        for line in fileh:
+            key, value = line.split(':', 1)
+            counters[key.strip()] = long(value.strip())
+    except ValueError:
+        pass
+    finally:
+        fileh.close()
+    #
+    return counters
+#
+#
+class JobStatistics(object):
+    """Collects the wall time and I/O of each stage of a job. Stages may
+    be nested, e.g. error detection within a Concert Cut, in which case
+    the nested stage's time and I/O is also part of the enclosing stage.
+    The external tools run during the job are included when saved.
+    """
+
+    def __init__(self, ):
+        #
+        self.started = time.time()
+        self.started_at = datetime.now()
+        self.stages = []
+        self.active = []
+        # Only tool runs from this job onwards are part of its statistics
+        self.first_tool_run = len(TOOL_RUNS)
+        _ACTIVE_JOB[0] = self
+        #
+        return    # end __init__()
+
+    def current_stage(self, ):
+        ''' The name of the innermost stage that is running.
+        return the stage name or None when no stage is running
+        '''
+        if self.active:
+            return self.active[-1]
+        return None
+
+    @contextmanager
+    def stage(self, name):
+        ''' Time a block of processing as a named stage. The stage is
+        recorded even when the block exits the script.
+        return nothing
+        '''
+        parent = self.current_stage()
+        for hook in STAGE_HOOKS:
+            hook(name, 'start')
+        start_time = time.time()
+        start_io = read_process_io()
+        self.active.append(name)
+        try:
+            yield
+        finally:
+            self.active.pop()
+            for hook in STAGE_HOOKS:
+                hook(name, 'end')
+            end_io = read_process_io()
+            record = {
+                'stage': name,
+                'parent': parent,
+                'start_offset': round(start_time - self.started, 3),
+                'seconds': round(time.time() - start_time, 3),
+            }
+            for counter, json_name in IO_COUNTERS:
+                if counter in start_io and counter in end_io:
+                    record[json_name] = end_io[counter] - start_io[counter]
+            self.stages.append(record)
+        #
+        return
+
+    def totals(self, ):
+        ''' Add up the time and I/O of stages with the same name.
+        return dictionary of totals keyed by stage name
+        '''
+        totals = {}
+        for record in self.stages:
+            total = totals.setdefault(record['stage'],
+                                        {'count': 0, 'seconds': 0.0})
+            total['count'] += 1
+            total['seconds'] = round(total['seconds'] + record['seconds'], 3)
+            for counter, json_name in IO_COUNTERS:
+                if json_name in record:
+                    total[json_name] = total.get(json_name, 0) + \
+                                                        record[json_name]
+        #
+        return totals
+
+    def write(self, filename, job_details):
+        ''' Save the job details, every stage record and the per stage
+        totals as a JSON file.
+        return nothing
+        '''
+        statistics = dict(job_details)
+        statistics['started'] = self.started_at.isoformat()
+        statistics['seconds'] = round(time.time() - self.started, 3)
+        statistics['stages'] = sorted(self.stages,
+                                    key=lambda record: record['start_offset'])
+        statistics['stage_totals'] = self.totals()
+        tool_runs = TOOL_RUNS[self.first_tool_run:]
+        statistics['tool_runs'] = tool_runs
+        statistics['tool_totals'] = tool_totals(tool_runs)
+        #
+        temp_filename = filename + u'.tmp'
+        fileh = open(temp_filename, 'w')
+        try:
+            json.dump(statistics, fileh, indent=2, sort_keys=True)
+        finally:
+            fileh.close()
+        os.rename(temp_filename, filename)
+        #
+        return
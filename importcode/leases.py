@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+# ----------------------
+# Name: leases.py   Provides the per recording processing lease used by
+#                   lossless_cut and keyframe_adjust
+# Python Script
+# Author:   R.D. Vaughan
+# Purpose:  This python script supports the lossless_cut.py and
+#           keyframe_adjust.py scripts.
+#           Only one job at a time may process a recording. A job takes
+#           the recording's lease in the lease directory before reading
+#           the recording. A second job for the same recording waits for
+#           the lease or exits instead of repeating all of the I/O.
+#
+# Copyright (C) 2012 R.D. Vaughan
+# rdvLaunchpad@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# License:Creative Commons GNU GPL v2
+# (https://www.gnu.org/licenses/gpl-2.0.html)
+#-------------------------------------
+#
+"""
+__version__ = '0.1.0'
+# Version change log:
+# 0.1.0 Initial development
+#
+## Common function imports
+import os
+import time
+import json
+import fcntl
+import tempfile
+from socket import gethostname
+#
+# Indicator specific imports
+import importcode.common as common
+from importcode.utilities import create_cachedir, process_alive
+#
+#
+class RecordingLease(object):
+    """The lease on one recording keyed by its chanid and starttime. The
+    lease file names the host, process and MythTV job id of the holder.
+    A lease held by a job on this host that is no longer running is taken
+    over.
+    """
+
+    def __init__(self, configuration, chanid, starttime, script):
+        #
+        self.leasepath = common.LEASE_DIR % configuration
+        self.filename = common.LEASE_FILE % {
+            'leasepath': self.leasepath,
+            'chanid': chanid,
+            'starttime': starttime.strftime(common.LEASE_STARTTIME_FORMAT),
+            }
+        self.details = {
+            'hostname': gethostname(),
+            'pid': os.getpid(),
+            'jobid': configuration.get('jobid'),
+            'script': script,
+            'recordedfile': configuration['recordedfile'],
+            }
+        self.held = False
+        #
+        return    # end __init__()
+
+    def _locked(self, ):
+        ''' Serialize taking and releasing leases between jobs.
+        return an open lock file handle which releases the lock when closed
+        '''
+        create_cachedir(self.leasepath)
+        lockh = open(common.LEASE_LOCK_FILE % self.leasepath, 'a')
+        fcntl.flock(lockh.fileno(), fcntl.LOCK_EX)
+        return lockh
+
+    def _holder(self, ):
+        ''' Read the recording's lease. A missing or unreadable lease and
+        the lease of a job on this host that has died are not held.
+        return the holder's details or None
+        '''
+        try:
+            fileh = open(self.filename, 'r')
+        except IOError:
+            return None
+        try:
+            try:
+                holder = json.load(fileh)
+            except ValueError:
+                return None
+        finally:
+            fileh.close()
+        if not isinstance(holder, dict):
+            return None
+        if holder.get('hostname') == self.details['hostname'] and \
+                not process_alive(holder.get('pid', 0)):
+            return None
+        #
+        return holder
+
+    def try_acquire(self, ):
+        ''' Take the recording's lease unless another running job has it.
+        return None when the lease was taken otherwise the holder's details
+        '''
+        lockh = self._locked()
+        try:
+            holder = self._holder()
+            if holder is not None and \
+                    (holder.get('hostname'), holder.get('pid')) != \
+                    (self.details['hostname'], self.details['pid']):
+                return holder
+            #
+            self.details['time'] = time.time()
+            fileno, temp_filename = tempfile.mkstemp(dir=self.leasepath,
+                                        prefix=u'.', suffix=u'.tmp')
+            fileh = os.fdopen(fileno, 'w')
+            try:
+                json.dump(self.details, fileh, indent=2, sort_keys=True)
+            finally:
+                fileh.close()
+            os.rename(temp_filename, self.filename)
+            self.held = True
+        finally:
+            lockh.close()
+        #
+        return None
+
+    def release(self, ):
+        ''' Give up the lease. Failing to remove the lease file is never
+        fatal as the lease is taken over once this job has ended.
+        return nothing
+        '''
+        if not self.held:
+            return
+        self.held = False
+        try:
+            lockh = self._locked()
+        except (IOError, OSError):
+            return
+        try:
+            holder = self._holder()
+            if holder is not None and holder.get('pid') == \
+                    self.details['pid'] and holder.get('hostname') == \
+                    self.details['hostname']:
+                os.remove(self.filename)
+        except (IOError, OSError):
+            pass
+        finally:
+            lockh.close()
+        #
+        return
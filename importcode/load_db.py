@@ -30,7 +30,7 @@
 import os
 import sys
 import tarfile
-from pickle import load
+from cPickle import load
 from optparse import OptionParser
 from datetime import datetime
 
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+# ----------------------
+# Name: manifest.py   Provides the job manifest used to resume a
+#                     lossless_cut job that died part way through
+# Python Script
+# Author:   R.D. Vaughan
+# Purpose:  This python script supports the lossless_cut.py.
+#           The manifest in a job's scratch directory records the
+#           recording and cut list the job was started with and each
+#           finished stage with the size and checksum of its output files.
+#           A rerun of the same recording and cut list takes over the
+#           scratch directory and continues from the first stage whose
+#           outputs cannot be verified.
+#
+# Copyright (C) 2012 R.D. Vaughan
+# rdvLaunchpad@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# License:Creative Commons GNU GPL v2
+# (https://www.gnu.org/licenses/gpl-2.0.html)
+#-------------------------------------
+#
+"""
+__version__ = '0.1.1'
+# Version change log:
+# 0.1.0 Initial development
+# 0.1.1 Added recorded_outputs for the working directory clean up
+#
+## Common function imports
+import os
+import json
+import hashlib
+import tempfile
+from glob import glob
+#
+# Indicator specific imports
+import importcode.common as common
+#
+#
+def sample_checksum(filename):
+    ''' Checksum a file from evenly spaced samples of its contents and its
+    size. Reading every byte of a segment again would cost as much as
+    cutting it again.
+    return the hex SHA1 digest
+    '''
+    size = os.path.getsize(filename)
+    digest = hashlib.sha1(str(size))
+    sample = common.MANIFEST_SAMPLE_BYTES
+    if size <= sample * common.MANIFEST_SAMPLES:
+        offsets = [0]
+        sample = size
+    else:
+        step = (size - sample) // (common.MANIFEST_SAMPLES - 1)
+        offsets = [step * index for index in range(common.MANIFEST_SAMPLES)]
+    fileh = open(filename, 'rb')
+    try:
+        for offset in offsets:
+            fileh.seek(offset)
+            digest.update(fileh.read(sample))
+    finally:
+        fileh.close()
+    #
+    return digest.hexdigest()
+#
+def read_manifest(filename):
+    ''' Read a job manifest file. A missing or unreadable manifest has no
+    finished stages.
+    return the manifest dictionary or None
+    '''
+    try:
+        fileh = open(filename, 'r')
+    except IOError:
+        return None
+    try:
+        try:
+            manifest = json.load(fileh)
+        except ValueError:
+            return None
+    finally:
+        fileh.close()
+    if not isinstance(manifest, dict):
+        return None
+    #
+    return manifest
+#
+def recorded_outputs(workpath):
+    ''' The output files of the finished stages recorded in a scratch
+    directory's manifest.
+    return a list of file names
+    '''
+    manifest = read_manifest(common.JOB_MANIFEST_FILE % {
+                                                'workpath': workpath})
+    outputs = []
+    try:
+        for stage in manifest['stages']:
+            for output in stage['outputs']:
+                outputs.append(os.path.join(workpath, output['filename']))
+    except (KeyError, TypeError):
+        pass
+    #
+    return outputs
+#
+#
+class JobManifest(object):
+    """The record of a job's finished stages in its scratch directory.
+    Stages are recorded in the order they finish and a stage only counts
+    as finished when every stage before it does too.
+    """
+
+    def __init__(self, workpath, recorded_name, job):
+        #
+        self.workpath = workpath
+        self.recorded_name = recorded_name
+        self.filename = common.JOB_MANIFEST_FILE % {'workpath': workpath}
+        ## Compare the job as it reads back from the manifest file
+        self.job = json.loads(json.dumps(job))
+        self.stages = []
+        #
+        return    # end __init__()
+
+    def _read(self, ):
+        ''' Read an earlier run's manifest.
+        return the manifest dictionary or None
+        '''
+        return read_manifest(self.filename)
+
+    def _write(self, ):
+        ''' Save the manifest by writing a temporary file in the scratch
+        directory and renaming it over the old manifest.
+        return nothing
+        '''
+        fileno, temp_filename = tempfile.mkstemp(dir=self.workpath,
+                                    prefix=u'.', suffix=u'.tmp')
+        fileh = os.fdopen(fileno, 'w')
+        try:
+            json.dump({'job': self.job, 'stages': self.stages}, fileh,
+                      indent=2, sort_keys=True)
+        finally:
+            fileh.close()
+        os.rename(temp_filename, self.filename)
+        #
+        return
+
+    def _verified(self, stage):
+        ''' Check that each output file of a recorded stage still has its
+        recorded size and checksum.
+        return True or False
+        '''
+        try:
+            for output in stage['outputs']:
+                filename = os.path.join(self.workpath, output['filename'])
+                if os.path.getsize(filename) != output['size'] or \
+                        sample_checksum(filename) != output['sha1']:
+                    return False
+        except (KeyError, TypeError, OSError, IOError):
+            return False
+        #
+        return True
+
+    def load(self, ):
+        ''' Keep the finished stages of an earlier run of the same job up
+        to the first stage that cannot be verified. Any other files of the
+        recording in the scratch directory are removed so that stages
+        which are run again start clean.
+        return the list of finished stage names
+        '''
+        manifest = self._read()
+        self.stages = []
+        if manifest is not None and manifest.get('job') == self.job:
+            for stage in manifest.get('stages') or []:
+                if not isinstance(stage, dict) or \
+                        not self._verified(stage):
+                    break
+                self.stages.append(stage)
+        #
+        keep = set([os.path.join(self.workpath, output['filename'])
+                    for stage in self.stages for output in stage['outputs']])
+        for filename in glob(u'%s/%s*' % (self.workpath,
+                                          self.recorded_name)):
+            if filename not in keep and not os.path.isdir(filename):
+                os.remove(filename)
+        self._write()
+        #
+        return [stage['stage'] for stage in self.stages]
+
+    def finished(self, stage):
+        ''' Check if a stage finished in this or an earlier run.
+        return True or False
+        '''
+        return stage in [entry['stage'] for entry in self.stages]
+
+    def record(self, stage, filenames):
+        ''' Record a finished stage and its output files. The files are
+        recorded relative to the scratch directory which is renamed when a
+        rerun takes it over.
+        return nothing
+        '''
+        self.stages.append({
+            'stage': stage,
+            'outputs': [{'filename': os.path.relpath(filename,
+                                                     self.workpath),
+                         'size': os.path.getsize(filename),
+                         'sha1': sample_checksum(filename), }
+                        for filename in filenames],
+            })
+        self._write()
+        #
+        return
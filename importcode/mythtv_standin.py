@@ -0,0 +1,1025 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+# ----------------------
+# Name: mythtv_standin.py   Provides an SQLite backed stand-in for the
+#                           MythTV python bindings and the media tools
+#                           used by lossless_cut
+# Python Script
+# Author:   R.D. Vaughan
+# Purpose:  This python script supports the lossless_cut.py.
+#           Serves the recorded, markup, seek, jobqueue and videometadata
+#           data that lossless_cut uses from an SQLite data base file so a
+#           whole job can be run and timed on a machine without MythTV.
+#           The same file also acts as scripted "mkvmerge", "mkvinfo",
+#           "mediainfo" and "mythutil" command line tools.
+#           Only used for development and performance measurement.
+#
+# Copyright (C) 2012 R.D. Vaughan
+# rdvLaunchpad@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# License:Creative Commons GNU GPL v2
+# (https://www.gnu.org/licenses/gpl-2.0.html)
+#-------------------------------------
+#
+"""
+__version__ = '0.1.2'
+# Version change log:
+# 0.1.0 Initial development
+# 0.1.1 The mkvmerge stand-in reads "@" option files in the JSON and the
+#       older one argument per line formats
+# 0.1.2 A Recorded record can be read by its (chanid, starttime) key
+#
+## Common function imports
+import os
+import sys
+import stat
+import random
+import sqlite3
+import hashlib
+import json
+from socket import gethostname
+from collections import namedtuple
+from datetime import datetime, timedelta
+#
+# Indicator specific imports
+import importcode.common as common
+#
+## The stand-in reports itself as MythTV v0.25 whose start times are not
+## UTC aware
+OWN_VERSION = (0, 25, -1, 0)
+#
+## Synthetic recording shape. A HD ATSC recording has a keyframe every
+## 15 frames. Newer MythTV versions add a duration map row (type 33) for
+## every keyframe row (type 9).
+FPS = 29.97
+KEYFRAME_INTERVAL = 15
+KEYFRAME_SEEK_TYPE = 9
+DURATION_SEEK_TYPE = 33
+## A real HD recording is about 2.4 MB per second. The stand-in
+## recordings and the videos made by the stand-in tools are sparse files
+## with a much lower rate so that a long recording still fits in any
+## working directory. Their size is only used to work out play times.
+RECORDING_BYTES_PER_SECOND = 2424000
+STANDIN_BYTES_PER_SECOND = 1024
+#
+## recordedmarkup types
+MARK_CUT_END = 0
+MARK_CUT_START = 1
+MARK_COMM_START = 4
+MARK_COMM_END = 5
+MARK_VIDEO_WIDTH = 30
+MARK_VIDEO_HEIGHT = 31
+MARK_VIDEO_RATE = 32
+MARK_DURATION_MS = 33
+MARK_TOTAL_FRAMES = 34
+#
+## The synthetic recording's data base keys and metadata
+CHANID = 1001
+STARTTIME = datetime(2012, 9, 13, 20, 0, 0)
+INETREF = u'80379'
+#
+## Only the tables and columns that lossless_cut uses
+SCHEMA = [
+    u'''CREATE TABLE recorded (chanid INTEGER, starttime TEXT, endtime TEXT,
+        title TEXT, subtitle TEXT, description TEXT, season INTEGER,
+        episode INTEGER, category TEXT, hostname TEXT, cutlist INTEGER,
+        commflagged INTEGER, recgroup TEXT, inetref TEXT, filesize INTEGER,
+        originalairdate TEXT, basename TEXT, progstart TEXT, progend TEXT,
+        storagegroup TEXT)''',
+    u'''CREATE TABLE recordedprogram (chanid INTEGER, starttime TEXT,
+        title TEXT, subtitle TEXT, category_type TEXT, airdate INTEGER,
+        originalairdate TEXT)''',
+    u'''CREATE TABLE recordedmarkup (chanid INTEGER, starttime TEXT,
+        mark INTEGER, type INTEGER, data INTEGER)''',
+    u'''CREATE TABLE recordedseek (chanid INTEGER, starttime TEXT,
+        mark INTEGER, offset INTEGER, type INTEGER)''',
+    u'''CREATE INDEX recordedseek_key ON recordedseek (chanid, starttime)''',
+    u'''CREATE TABLE recordedcredits (chanid INTEGER, starttime TEXT,
+        role TEXT, name TEXT)''',
+    u'''CREATE TABLE programgenres (chanid INTEGER, starttime TEXT,
+        relevance TEXT, genre TEXT)''',
+    u'''CREATE TABLE channel (chanid INTEGER, sourceid INTEGER)''',
+    u'''CREATE TABLE cardinput (cardinputid INTEGER, cardid INTEGER,
+        sourceid INTEGER, displayname TEXT)''',
+    u'''CREATE TABLE capturecard (cardid INTEGER, cardtype TEXT,
+        defaultinput TEXT, videodevice TEXT, audiodevice TEXT,
+        hostname TEXT)''',
+    u'''CREATE TABLE settings (value TEXT, data TEXT, hostname TEXT)''',
+    u'''CREATE TABLE jobqueue (id INTEGER PRIMARY KEY, chanid INTEGER,
+        starttime TEXT, type INTEGER, status INTEGER, comment TEXT)''',
+    u'''CREATE TABLE videometadata (intid INTEGER PRIMARY KEY, title TEXT,
+        subtitle TEXT, plot TEXT, director TEXT, studio TEXT,
+        inetref TEXT, year INTEGER, releasedate TEXT, length INTEGER,
+        season INTEGER, episode INTEGER, filename TEXT, hash TEXT,
+        coverfile TEXT, fanart TEXT, banner TEXT, host TEXT,
+        category TEXT, contenttype INTEGER)''',
+    u'''CREATE TABLE recordedartwork (inetref TEXT, season INTEGER,
+        host TEXT, coverart TEXT, fanart TEXT, banner TEXT)''',
+]
+#
+RECORDED_COLUMNS = ['chanid', 'starttime', 'endtime', 'title', 'subtitle',
+        'description', 'season', 'episode', 'category', 'hostname',
+        'cutlist', 'commflagged', 'recgroup', 'inetref', 'filesize',
+        'originalairdate', 'basename', 'progstart', 'progend',
+        'storagegroup', ]
+VIDEO_COLUMNS = ['title', 'subtitle', 'plot', 'director', 'studio',
+        'inetref', 'year', 'releasedate', 'length', 'season', 'episode',
+        'filename', 'hash', 'coverfile', 'fanart', 'banner', 'host',
+        'category', 'contenttype', ]
+## Recorded and metadata fields which are date times or dates
+DATETIME_COLUMNS = ['starttime', 'endtime', 'progstart', 'progend', ]
+DATE_COLUMNS = ['originalairdate', 'releasedate', ]
+DATE_FORMAT = '%Y-%m-%d'
+#
+#
+class MythError(Exception):
+    """The stand-in's equivalent of the bindings' MythError."""
+    pass
+#
+#
+class MythLog(object):
+    """Logging is not used through the bindings."""
+    def __init__(self, *args, **kwargs):
+        return
+#
+#
+class Row(dict):
+    """A data base row which, like the MythTV bindings, allows both
+    dictionary and attribute access.
+    """
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if name.startswith('_'):
+            dict.__setattr__(self, name, value)
+        else:
+            self[name] = value
+#
+#
+class Metadata(Row):
+    """Grabber and exported recording metadata."""
+    pass
+#
+#
+Seek = namedtuple('Seek', 'mark offset type')
+#
+#
+class SeekTable(list):
+    """The recordedseek rows of a recording."""
+    def clean(self, ):
+        ''' Remove every seek table row.
+        return nothing
+        '''
+        del self[:]
+#
+#
+class Markup(list):
+    """The recordedmarkup rows of a recording with the bindings' cut and
+    skip list methods.
+    """
+    def _pairs(self, start_type, end_type):
+        ''' Pair each start mark with the following end mark.
+        return a list of (start, end) frame numbers
+        '''
+        pairs = []
+        start = None
+        for mark in sorted(self, key=lambda mark: mark['mark']):
+            if mark['type'] == start_type:
+                start = mark['mark']
+            elif mark['type'] == end_type and start is not None:
+                pairs.append((start, mark['mark']))
+                start = None
+        return pairs
+
+    def getcutlist(self, ):
+        return self._pairs(MARK_CUT_START, MARK_CUT_END)
+
+    def getskiplist(self, ):
+        return self._pairs(MARK_COMM_START, MARK_COMM_END)
+
+    def getuncutlist(self, ):
+        uncutlist = []
+        previous = 0
+        for start, end in self.getcutlist():
+            if start > previous:
+                uncutlist.append((previous, start))
+            previous = end
+        uncutlist.append((previous, 9999999))
+        return uncutlist
+#
+#
+def _to_python(name, value):
+    ''' Convert a stored date time or date column to its python type.
+    return the converted value
+    '''
+    if not value:
+        return value
+    if name in DATETIME_COLUMNS:
+        return datetime.strptime(value, common.DATETIME_SQL_FORMAT)
+    if name in DATE_COLUMNS:
+        return datetime.strptime(value[:10], DATE_FORMAT).date()
+    return value
+#
+def _to_sql(value):
+    ''' Convert a date time or date to the text that is stored.
+    return the stored value
+    '''
+    if isinstance(value, datetime):
+        return value.strftime(common.DATETIME_SQL_FORMAT)
+    if hasattr(value, 'strftime'):
+        return value.strftime(DATE_FORMAT)
+    return value
+#
+def _fetch_rows(cursor, sql, args=()):
+    ''' Run a query.
+    return a list of Row dictionaries
+    '''
+    cursor.execute(sql, args)
+    names = [column[0] for column in cursor.description]
+    rows = []
+    for values in cursor.fetchall():
+        rows.append(Row([(name, _to_python(name, value))
+                            for name, value in zip(names, values)]))
+    #
+    return rows
+#
+#
+class MythDB(object):
+    """The data base connection. The SQLite data base file is named by
+    the environment variable common.MYTHTV_STANDIN_ENV.
+    """
+    def __init__(self, *args, **kwargs):
+        #
+        filename = os.environ.get(common.MYTHTV_STANDIN_ENV, u'')
+        if not os.path.isfile(filename):
+            raise MythError(u'There is no stand-in data base "%s"' %
+                                                            filename)
+        self.filename = filename
+        self.connection = sqlite3.connect(filename, isolation_level=None)
+        self.settings = Settings(self)
+        #
+        return    # end __init__()
+
+    def cursor(self, ):
+        return self.connection.cursor()
+
+    def gethostname(self, ):
+        return gethostname()
+
+    def searchRecorded(self, **kwargs):
+        ''' Find recorded records by any of their columns.
+        return a list of Recorded instances
+        '''
+        where = [u'%s=?' % key for key in sorted(kwargs.keys())]
+        args = [_to_sql(kwargs[key]) for key in sorted(kwargs.keys())]
+        sql = u'SELECT * FROM recorded'
+        if where:
+            sql += u' WHERE ' + u' AND '.join(where)
+        return [Recorded(row, self)
+                    for row in _fetch_rows(self.cursor(), sql, args)]
+
+    def searchArtwork(self, inetref=None):
+        ''' Find the artwork for an inetref.
+        return a list of artwork rows
+        '''
+        return _fetch_rows(self.cursor(),
+                u'SELECT * FROM recordedartwork WHERE inetref=?', (inetref,))
+#
+#
+class Settings(object):
+    """The settings table as "settings[hostname][value]"."""
+    def __init__(self, db):
+        self.db = db
+
+    def __getitem__(self, hostname):
+        return HostSettings(self.db, hostname)
+#
+#
+class HostSettings(object):
+    """One host's settings. Missing settings are None."""
+    def __init__(self, db, hostname):
+        self.db = db
+        self.hostname = hostname
+
+    def __getitem__(self, value):
+        cursor = self.db.cursor()
+        cursor.execute(
+u'SELECT data FROM settings WHERE value=? AND (hostname=? OR hostname IS NULL)',
+                    (value, self.hostname))
+        rows = cursor.fetchall()
+        if not rows:
+            return None
+        return rows[0][0]
+#
+#
+class Recorded(Row):
+    """A recorded record with its markup, seek table and credits. Like the
+    bindings a record is read by its (chanid, starttime) primary key or
+    made from a data base row.
+    """
+    def __init__(self, data, db=None):
+        if isinstance(data, tuple):
+            db = db or MythDB()
+            rows = _fetch_rows(db.cursor(),
+u'SELECT * FROM recorded WHERE chanid=? AND starttime=?',
+                    (data[0], _to_sql(data[1])))
+            if not rows:
+                raise MythError(u'There is no recorded record for %s %s' %
+                                                                    data)
+            data = rows[0]
+        Row.__init__(self, data)
+        self._db = db
+        self._key = (data['chanid'], _to_sql(data['starttime']))
+        self._markup = None
+        self._seek = None
+        self._cast = None
+
+    @property
+    def markup(self):
+        if self._markup is None:
+            self._markup = Markup(_fetch_rows(self._db.cursor(),
+u'SELECT mark, type, data FROM recordedmarkup WHERE chanid=? AND starttime=? ORDER BY mark',
+                    self._key))
+        return self._markup
+
+    @property
+    def seek(self):
+        if self._seek is None:
+            cursor = self._db.cursor()
+            cursor.execute(
+u'SELECT mark, offset, type FROM recordedseek WHERE chanid=? AND starttime=? ORDER BY mark, type',
+                    self._key)
+            self._seek = SeekTable([Seek(*values)
+                                    for values in cursor.fetchall()])
+        return self._seek
+
+    @property
+    def cast(self):
+        if self._cast is None:
+            self._cast = _fetch_rows(self._db.cursor(),
+u'SELECT role, name FROM recordedcredits WHERE chanid=? AND starttime=?',
+                    self._key)
+        return self._cast
+
+    def getRecordedProgram(self, ):
+        rows = _fetch_rows(self._db.cursor(),
+u'SELECT * FROM recordedprogram WHERE chanid=? AND starttime=?',
+                    (self._key[0], _to_sql(self['progstart'])))
+        if not rows:
+            raise MythError(u'No recordedprogram record for %s %s' %
+                                                            self._key)
+        return rows[0]
+
+    def exportMetadata(self, ):
+        ''' The recording's own metadata as a grabber would return it.
+        return a Metadata instance
+        '''
+        return _recorded_metadata(self)
+
+    def update(self, ):
+        ''' Save the recorded record and any markup or seek table changes.
+        return nothing
+        '''
+        cursor = self._db.cursor()
+        cursor.execute(u'UPDATE recorded SET %s WHERE chanid=? AND starttime=?'
+                % u', '.join([u'%s=?' % name for name in RECORDED_COLUMNS]),
+                [_to_sql(self.get(name)) for name in RECORDED_COLUMNS] +
+                list(self._key))
+        if self._markup is not None:
+            cursor.execute(
+u'DELETE FROM recordedmarkup WHERE chanid=? AND starttime=?', self._key)
+            cursor.executemany(
+u'INSERT INTO recordedmarkup (chanid, starttime, mark, type, data) VALUES (?, ?, ?, ?, ?)',
+                [self._key + (mark['mark'], mark['type'], mark['data'])
+                                            for mark in self._markup])
+        if self._seek is not None:
+            cursor.execute(
+u'DELETE FROM recordedseek WHERE chanid=? AND starttime=?', self._key)
+            cursor.executemany(
+u'INSERT INTO recordedseek (chanid, starttime, mark, offset, type) VALUES (?, ?, ?, ?, ?)',
+                [self._key + tuple(seek) for seek in self._seek])
+        self._key = (self['chanid'], _to_sql(self['starttime']))
+        #
+        return
+#
+#
+class RecordedProgram(Row):
+    """Only ever returned by Recorded.getRecordedProgram()."""
+    pass
+#
+#
+def _recorded_metadata(recorded):
+    ''' Make grabber style metadata from a recorded record.
+    return a Metadata instance
+    '''
+    metadata = Metadata(title=recorded['title'],
+                subtitle=recorded['subtitle'],
+                description=recorded['description'],
+                season=recorded['season'], episode=recorded['episode'],
+                inetref=recorded['inetref'],
+                releasedate=recorded['originalairdate'],
+                studios=[], categories=[], cast=[], levenshtein=0)
+    if recorded['category']:
+        metadata['categories'].append(recorded['category'])
+    #
+    return metadata
+#
+#
+class VideoGrabber(object):
+    """Answers grabber searches from the recordings in the data base."""
+    def __init__(self, mode, db=None):
+        self.mode = mode
+        self.path = u'standin_%s' % mode.lower()
+        self._db = db
+
+    def _recorded(self, **kwargs):
+        if self._db is None:
+            self._db = MythDB()
+        return self._db.searchRecorded(**kwargs)
+
+    def grabInetref(self, inetref, season=None, episode=None):
+        for recorded in self._recorded(inetref=inetref):
+            if season and recorded['season'] != season:
+                continue
+            if episode and recorded['episode'] != episode:
+                continue
+            return _recorded_metadata(recorded)
+        raise StopIteration
+
+    def sortedSearch(self, title, subtitle=None):
+        if subtitle:
+            found = self._recorded(title=title, subtitle=subtitle)
+        else:
+            found = self._recorded(title=title)
+        return [_recorded_metadata(recorded) for recorded in found]
+#
+#
+class MythBE(object):
+    """The master backend recording look up and delete."""
+    def __init__(self, backend=None, db=None):
+        self.db = db or MythDB()
+
+    def getRecording(self, chanid, starttime):
+        recorded = self.db.searchRecorded(chanid=chanid, starttime=starttime)
+        if not recorded:
+            return None
+        return recorded[0]
+
+    def deleteRecording(self, program, force=False):
+        ''' Delete a recording's records. The recording file is left alone.
+        return u'-1' like the backend does on success
+        '''
+        cursor = self.db.cursor()
+        for table in ['recorded', 'recordedmarkup', 'recordedseek',
+                      'recordedcredits']:
+            cursor.execute(
+                u'DELETE FROM %s WHERE chanid=? AND starttime=?' % table,
+                program._key)
+        return u'-1'
+#
+#
+class MythVideo(object):
+    """MythVideo searches."""
+    def __init__(self, db=None):
+        self.db = db or MythDB()
+
+    def searchVideos(self, custom=()):
+        ''' Find videos with custom "column=%s" conditions.
+        return a list of Video instances
+        '''
+        where = [condition.replace(u'%s', u'?') for condition, value in custom]
+        args = [value for condition, value in custom]
+        sql = u'SELECT * FROM videometadata'
+        if where:
+            sql += u' WHERE ' + u' AND '.join(where)
+        return [Video(row['intid'], db=self.db)
+                    for row in _fetch_rows(self.db.cursor(), sql, args)]
+#
+#
+class Video(Row):
+    """A videometadata record. The video files are kept in a "videos"
+    directory next to the data base file.
+    """
+    def __init__(self, intid=None, db=None):
+        Row.__init__(self)
+        self._db = db or MythDB()
+        self.cast = []
+        if intid is not None:
+            rows = _fetch_rows(self._db.cursor(),
+                    u'SELECT * FROM videometadata WHERE intid=?', (intid,))
+            if not rows:
+                raise MythError(u'There is no video %s' % intid)
+            self.update_fields(rows[0])
+
+    def update_fields(self, fields):
+        for key, value in fields.items():
+            self[key] = value
+
+    def create(self, data):
+        cursor = self._db.cursor()
+        cursor.execute(u'INSERT INTO videometadata (%s) VALUES (%s)' % (
+                u', '.join(data.keys()), u', '.join([u'?'] * len(data))),
+                [_to_sql(value) for value in data.values()])
+        self.update_fields(_fetch_rows(cursor,
+                u'SELECT * FROM videometadata WHERE intid=?',
+                (cursor.lastrowid,))[0])
+        return self
+
+    def importMetadata(self, metadata):
+        for key, name in [('title', 'title'), ('subtitle', 'subtitle'),
+                          ('description', 'plot'), ('inetref', 'inetref'),
+                          ('season', 'season'), ('episode', 'episode'),
+                          ('releasedate', 'releasedate'), ]:
+            if metadata.get(key) is not None:
+                self[name] = metadata[key]
+        return
+
+    def _path(self, ):
+        return os.path.join(os.path.dirname(self._db.filename), u'videos',
+                            self['filename'])
+
+    def open(self, mode='r'):
+        path = self._path()
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        return open(path, mode + 'b')
+
+    def getHash(self, ):
+        ''' A content hash of the first and last 64 KB of the video.
+        return hexadecimal hash text
+        '''
+        sha1 = hashlib.sha1()
+        fileh = open(self._path(), 'rb')
+        try:
+            sha1.update(fileh.read(65536))
+            fileh.seek(max(0, os.path.getsize(self._path()) - 65536))
+            sha1.update(fileh.read(65536))
+        finally:
+            fileh.close()
+        return sha1.hexdigest()[:16]
+
+    def update(self, ):
+        columns = [name for name in VIDEO_COLUMNS if name in self]
+        self._db.cursor().execute(
+                u'UPDATE videometadata SET %s WHERE intid=?' %
+                u', '.join([u'%s=?' % name for name in columns]),
+                [_to_sql(self[name]) for name in columns] + [self['intid']])
+        return
+
+    def delete(self, ):
+        self._db.cursor().execute(
+                u'DELETE FROM videometadata WHERE intid=?', (self['intid'],))
+        return
+#
+#
+class Job(Row):
+    """A jobqueue record."""
+    def __init__(self, jobid, db=None):
+        Row.__init__(self)
+        self._db = db or MythDB()
+        rows = _fetch_rows(self._db.cursor(),
+                    u'SELECT * FROM jobqueue WHERE id=?', (jobid,))
+        if not rows:
+            raise MythError(u'There is no job %s' % jobid)
+        self.update(rows[0])
+
+    def setComment(self, comment):
+        self._db.cursor().execute(
+                u'UPDATE jobqueue SET comment=? WHERE id=?',
+                (comment, self['id']))
+        self['comment'] = comment
+
+    def setStatus(self, status):
+        self._db.cursor().execute(
+                u'UPDATE jobqueue SET status=? WHERE id=?',
+                (int(status), self['id']))
+        self['status'] = int(status)
+#
+#
+## Synthetic recording data
+def make_seek_table(seek_rows, bytes_per_second=RECORDING_BYTES_PER_SECOND):
+    ''' Create a recordedseek table with a keyframe row and a duration map
+    row for every keyframe.
+    return a list of Seek rows
+    '''
+    rng = random.Random(seek_rows)
+    keyframe_bytes = int(bytes_per_second * KEYFRAME_INTERVAL / FPS)
+    seek = SeekTable()
+    for count in range(seek_rows // 2):
+        mark = count * KEYFRAME_INTERVAL
+        seek.append(Seek(mark, count * keyframe_bytes +
+                        rng.randint(0, keyframe_bytes // 4),
+                        KEYFRAME_SEEK_TYPE))
+        seek.append(Seek(mark, int(mark * 1000 / FPS), DURATION_SEEK_TYPE))
+    #
+    return seek
+#
+def make_markup(last_frame, cuts):
+    ''' Spread commercial breaks evenly through a recording. The break
+    frame numbers are deliberately not keyframes. The same breaks are
+    used for both the skip list and the cut list.
+    return a Markup list
+    '''
+    rng = random.Random(cuts)
+    block = last_frame // (cuts + 1)
+    markup = Markup()
+    for count in range(cuts):
+        start = block * count + block // 3 + rng.randint(1, 14)
+        end = start + block // 4 + rng.randint(1, 14)
+        for mark, mark_type in [(start, MARK_COMM_START),
+                                (end, MARK_COMM_END),
+                                (start, MARK_CUT_START),
+                                (end, MARK_CUT_END)]:
+            markup.append(Row(mark=mark, type=mark_type, data=None))
+    #
+    return markup
+#
+def make_mediainfo_xml(complete_name, duration, subtitles=True):
+    ''' Create mediainfo XML for a HD recording with two audio tracks and
+    optionally a DVB and a SRT subtitle track.
+    return XML string
+    '''
+    milliseconds = int(round(duration * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    xml = u'''<?xml version="1.0" encoding="UTF-8"?>
+<Mediainfo version="0.7.58">
+<File>
+<track type="General">
+<Complete_name>%s</Complete_name>
+<Format>MPEG-TS</Format>
+<Duration>%dh %dmn %ds %dms</Duration>
+<Overall_bit_rate>19.4 Mbps</Overall_bit_rate>
+</track>
+<track type="Video" streamid="1">
+<ID>49 (0x31)</ID>
+<Format>MPEG Video</Format>
+<Format_version>Version 2</Format_version>
+<Bit_rate_mode>Variable</Bit_rate_mode>
+<Bit_rate>18.0 Mbps</Bit_rate>
+<Width>1 920 pixels</Width>
+<Height>1 080 pixels</Height>
+<Display_aspect_ratio>16:9</Display_aspect_ratio>
+<Frame_rate>29.970 fps</Frame_rate>
+<Standard>Component</Standard>
+<Color_space>YUV</Color_space>
+<Chroma_subsampling>4:2:0</Chroma_subsampling>
+<Bit_depth>8 bits</Bit_depth>
+<Scan_type>Interlaced</Scan_type>
+<Compression_mode>Lossy</Compression_mode>
+</track>
+<track type="Audio" streamid="2">
+<ID>52 (0x34)</ID>
+<Format>AC-3</Format>
+<Bit_rate_mode>Constant</Bit_rate_mode>
+<Bit_rate>384 Kbps</Bit_rate>
+<Channel_s_>6 channels</Channel_s_>
+<Sampling_rate>48.0 KHz</Sampling_rate>
+<Compression_mode>Lossy</Compression_mode>
+<Delay_relative_to_video>-133ms</Delay_relative_to_video>
+<Language>English</Language>
+</track>
+<track type="Audio" streamid="3">
+<ID>53 (0x35)</ID>
+<Format>AC-3</Format>
+<Bit_rate_mode>Constant</Bit_rate_mode>
+<Bit_rate>192 Kbps</Bit_rate>
+<Channel_s_>2 channels</Channel_s_>
+<Sampling_rate>48.0 KHz</Sampling_rate>
+<Compression_mode>Lossy</Compression_mode>
+<Delay_relative_to_video>-133ms</Delay_relative_to_video>
+<Language>Spanish</Language>
+</track>
+''' % (complete_name, hours, minutes, seconds, milliseconds)
+    if subtitles:
+        xml += u'''<track type="Text" streamid="4">
+<ID>54 (0x36)</ID>
+<Format>DVB Subtitle</Format>
+<Delay_relative_to_video>1s 200ms</Delay_relative_to_video>
+<Language>English</Language>
+</track>
+<track type="Text" streamid="5">
+<ID>5</ID>
+<Format>UTF-8</Format>
+<Codec_ID>S_TEXT/UTF8</Codec_ID>
+<Default>No</Default>
+<Forced>No</Forced>
+<Language>French</Language>
+</track>
+'''
+    xml += u'''</File>
+</Mediainfo>
+'''
+    return xml.encode('utf8')
+#
+def create_database(filename, recordedfile, seek_rows, cuts, jobid=None,
+                    bytes_per_second=STANDIN_BYTES_PER_SECOND):
+    ''' Create a stand-in data base holding one recording of a series
+    episode with a skip list and a cut list. A sparse recording file of
+    matching size is created as well.
+    return the recording's duration in seconds
+    '''
+    if os.path.isfile(filename):
+        os.remove(filename)
+    connection = sqlite3.connect(filename)
+    cursor = connection.cursor()
+    for sql in SCHEMA:
+        cursor.execute(sql)
+    #
+    seek = make_seek_table(seek_rows, bytes_per_second)
+    last_frame = seek[-1].mark
+    duration = last_frame / FPS
+    filesize = int(duration * bytes_per_second)
+    starttime = _to_sql(STARTTIME)
+    key = (CHANID, starttime)
+    hostname = gethostname()
+    #
+    cursor.execute(u'INSERT INTO recorded (%s) VALUES (%s)' % (
+            u', '.join(RECORDED_COLUMNS),
+            u', '.join([u'?'] * len(RECORDED_COLUMNS))),
+        (CHANID, starttime,
+         _to_sql(STARTTIME + timedelta(seconds=duration)),
+         u'Synthetic Series', u'Synthetic Episode',
+         u'A synthetic recording used to time lossless_cut.', 1, 2,
+         u'Drama', hostname, 1, 1, u'Default', INETREF, filesize,
+         u'2012-09-13', os.path.basename(recordedfile), starttime,
+         _to_sql(STARTTIME + timedelta(seconds=duration)), u'Default'))
+    cursor.execute(u'''INSERT INTO recordedprogram VALUES (?, ?, ?, ?, ?, ?, ?)''',
+        key + (u'Synthetic Series', u'Synthetic Episode', u'series',
+                2012, u'2012-09-13'))
+    cursor.executemany(u'INSERT INTO recordedseek VALUES (?, ?, ?, ?, ?)',
+                    [key + tuple(row) for row in seek])
+    markup = make_markup(last_frame, cuts)
+    markup.extend([
+        Row(mark=0, type=MARK_VIDEO_WIDTH, data=1920),
+        Row(mark=0, type=MARK_VIDEO_HEIGHT, data=1080),
+        Row(mark=0, type=MARK_VIDEO_RATE, data=29970),
+        Row(mark=0, type=MARK_DURATION_MS, data=int(duration * 1000)),
+        Row(mark=0, type=MARK_TOTAL_FRAMES, data=last_frame), ])
+    cursor.executemany(u'INSERT INTO recordedmarkup VALUES (?, ?, ?, ?, ?)',
+            [key + (mark['mark'], mark['type'], mark['data'])
+                                                    for mark in markup])
+    cursor.execute(u'INSERT INTO recordedcredits VALUES (?, ?, ?, ?)',
+                    key + (u'director', u'Synthetic Director'))
+    cursor.execute(u'INSERT INTO programgenres VALUES (?, ?, ?, ?)',
+                    key + (u'0', u'Drama'))
+    cursor.execute(u'INSERT INTO channel VALUES (?, ?)', (CHANID, 1))
+    cursor.execute(u'INSERT INTO cardinput VALUES (?, ?, ?, ?)',
+                    (1, 1, 1, u'Synthetic Tuner'))
+    cursor.execute(u'INSERT INTO capturecard VALUES (?, ?, ?, ?, ?, ?)',
+                    (1, u'HDHOMERUN', u'MPEG2TS', u'1010CC54-0',
+                    u'', hostname))
+    cursor.execute(u'INSERT INTO recordedartwork VALUES (?, ?, ?, ?, ?, ?)',
+                    (INETREF, 1, hostname, u'synthetic_cover.jpg',
+                    u'synthetic_fanart.jpg', u'synthetic_banner.jpg'))
+    if jobid is not None:
+        cursor.execute(u'INSERT INTO jobqueue VALUES (?, ?, ?, ?, ?, ?)',
+                        (int(jobid), CHANID, starttime, 256, 4, u''))
+    connection.commit()
+    connection.close()
+    #
+    ## A sparse file uses no disk space
+    fileh = open(recordedfile, 'wb')
+    try:
+        fileh.truncate(filesize)
+    finally:
+        fileh.close()
+    #
+    return duration
+#
+#
+## Scripted command line tools. Every output video is a sparse file whose
+## size is its play time in STANDIN_BYTES_PER_SECOND.
+TOOLS = ['mkvmerge', 'mkvinfo', 'mediainfo', 'mythutil', ]
+TOOL_SCRIPT = u'''#!/bin/sh
+PYTHONPATH="%s" exec "%s" -m importcode.mythtv_standin %s "$@"
+'''
+## mkvmerge options that are followed by a value
+MKVMERGE_VALUE_OPTIONS = ['-o', '--output', '--split', '-a',
+        '--audio-tracks', '-d', '--video-tracks', '-s', '--subtitle-tracks',
+        '--title', '--attachment-description', '--sync', '--append-to',
+        '--append-mode', '--language', '--track-name', '--default-track',
+        '--forced-track', '--split-max-files', '--timecodes', '--chapters',
+        '--attach-file', '--default-duration', '--cues', '--compression', ]
+#
+def install_tools(directory):
+    ''' Create shell scripts that run the stand-in tools in a directory
+    which can then be put first in the PATH.
+    return nothing
+    '''
+    for tool in TOOLS:
+        filename = os.path.join(directory, tool)
+        fileh = open(filename, 'w')
+        try:
+            fileh.write(TOOL_SCRIPT % (common.APPDIR, sys.executable, tool))
+        finally:
+            fileh.close()
+        os.chmod(filename, os.stat(filename).st_mode |
+                            stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    #
+    return
+#
+def _timestamp_seconds(timestamp):
+    ''' Convert a "00:00:00.123456789" cut point timestamp to seconds.
+    return seconds
+    '''
+    hours, minutes, seconds = timestamp.split(u':')
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+#
+def _option_file_arguments(args):
+    ''' Replace each "@" option file argument with the arguments in the
+    file. A JSON array is read as is, otherwise the file has one escaped
+    argument per line.
+    return the list of arguments
+    '''
+    expanded = []
+    for arg in args:
+        if not arg.startswith('@'):
+            expanded.append(arg)
+            continue
+        fileh = open(arg[1:], 'r')
+        try:
+            text = fileh.read().decode('utf8')
+        finally:
+            fileh.close()
+        if text.lstrip().startswith(u'['):
+            expanded.extend([value.encode('utf8')
+                                for value in json.loads(text)])
+            continue
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith(u'#'):
+                continue
+            for character, escape in reversed(
+                                        common.MKVMERGE_OPTIONS_ESCAPES):
+                line = line.replace(escape, character)
+            expanded.append(line.encode('utf8'))
+    #
+    return expanded
+#
+def _sparse_file(filename, seconds):
+    ''' Create a sparse video file of a play time.
+    return nothing
+    '''
+    fileh = open(filename, 'wb')
+    try:
+        fileh.truncate(int(seconds * STANDIN_BYTES_PER_SECOND))
+    finally:
+        fileh.close()
+    #
+    return
+#
+def _play_seconds(filename):
+    ''' The play time of a video file.
+    return seconds
+    '''
+    return os.path.getsize(filename) / float(STANDIN_BYTES_PER_SECOND)
+#
+def mkvmerge(args):
+    ''' Identify, cut, split or join videos.
+    return the exit code
+    '''
+    args = _option_file_arguments(args)
+    if '--version' in args or '-V' in args:
+        sys.stdout.write("mkvmerge v5.8.0 ('No Sleep / Pillow') built on Sep 13 2012 20:00:00\n")
+        return 0
+    #
+    output, split, inputs = None, None, []
+    identify = '--identify' in args or '-i' in args
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg in MKVMERGE_VALUE_OPTIONS and index + 1 < len(args):
+            if arg in ['-o', '--output']:
+                output = args[index + 1]
+            elif arg == '--split':
+                split = args[index + 1]
+            index += 2
+            continue
+        if not arg.startswith('-') and arg not in ['(', ')']:
+            filename = arg.lstrip('+')
+            if os.path.isfile(filename):
+                inputs.append(filename)
+        index += 1
+    #
+    if not inputs:
+        sys.stdout.write('Error: no source files were given.\n')
+        return 2
+    #
+    if identify:
+        sys.stdout.write(
+"""File '%s': container: MPEG transport stream
+Track ID 0: video (MPEG-1/2)
+Track ID 1: audio (AC3/EAC3)
+Track ID 2: audio (AC3/EAC3)
+""" % inputs[0])
+        return 0
+    #
+    if output is None:
+        sys.stdout.write('Error: no output file name was given.\n')
+        return 2
+    #
+    sys.stdout.write('mkvmerge v5.8.0 (\'No Sleep / Pillow\')\n')
+    if split and split.startswith('parts:'):
+        for count, part in enumerate(split[len('parts:'):].split(','), 1):
+            start, end = part.split('-')
+            filename = output
+            if output.find('%') != -1:
+                filename = output % count
+            _sparse_file(filename, _timestamp_seconds(end) -
+                                    _timestamp_seconds(start))
+            sys.stdout.write("The file '%s' has been opened for writing.\n"
+                                % filename)
+    else:
+        _sparse_file(output, sum([_play_seconds(filename)
+                                    for filename in inputs]))
+        sys.stdout.write("The file '%s' has been opened for writing.\n"
+                            % output)
+    sys.stdout.write('Progress: 100%\nMuxing took 0 seconds.\n')
+    #
+    return 0
+#
+def mkvinfo(args):
+    ''' Display a video's play time.
+    return the exit code
+    '''
+    seconds = _play_seconds(args[-1])
+    sys.stdout.write(
+"""+ EBML head
++ Segment, size %d
+|+ Segment information
+| + Timecode scale: 1000000
+| + Duration: %.3fs (%s)
+""" % (os.path.getsize(args[-1]), seconds,
+        str(timedelta(seconds=int(seconds)))))
+    #
+    return 0
+#
+def mediainfo(args):
+    ''' Describe a video's tracks in XML. The stand-in recordings have no
+    subtitle tracks.
+    return the exit code
+    '''
+    if '--version' in args:
+        sys.stdout.write('MediaInfo Command line,\nMediaInfoLib - v0.7.58\n')
+        return 0
+    #
+    sys.stdout.write(make_mediainfo_xml(args[-1], _play_seconds(args[-1]),
+                                        subtitles=False))
+    #
+    return 0
+#
+def mythutil(args):
+    ''' Generate or clear a recording's cut list or skip list.
+    return the exit code
+    '''
+    chanid = args[args.index('--chanid') + 1]
+    starttime = args[args.index('--starttime') + 1]
+    key = (int(chanid), starttime)
+    db = MythDB()
+    cursor = db.cursor()
+    if '--gencutlist' in args:
+        cursor.execute(
+u'DELETE FROM recordedmarkup WHERE chanid=? AND starttime=? AND type IN (?, ?)',
+                key + (MARK_CUT_START, MARK_CUT_END))
+        for skip_type, cut_type in [(MARK_COMM_START, MARK_CUT_START),
+                                    (MARK_COMM_END, MARK_CUT_END)]:
+            cursor.execute(
+u'INSERT INTO recordedmarkup SELECT chanid, starttime, mark, ?, data FROM recordedmarkup WHERE chanid=? AND starttime=? AND type=?',
+                (cut_type, ) + key + (skip_type, ))
+        sys.stdout.write('Cutlist set to the skip list\n')
+    elif '--clearcutlist' in args:
+        cursor.execute(
+u'DELETE FROM recordedmarkup WHERE chanid=? AND starttime=? AND type IN (?, ?)',
+                key + (MARK_CUT_START, MARK_CUT_END))
+        sys.stdout.write('Cutlist cleared\n')
+    elif '--clearskiplist' in args:
+        cursor.execute(
+u'DELETE FROM recordedmarkup WHERE chanid=? AND starttime=? AND type IN (?, ?)',
+                key + (MARK_COMM_START, MARK_COMM_END))
+        sys.stdout.write('Commercial skip list cleared\n')
+    else:
+        sys.stdout.write('Unsupported mythutil command\n')
+        return 1
+    #
+    return 0
+#
+#
+if __name__ == "__main__":
+    sys.exit(globals()[sys.argv[1]](sys.argv[2:]))
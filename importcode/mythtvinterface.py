@@ -27,7 +27,7 @@
 #-------------------------------------
 #
 """
-__version__ = '0.1.8'
+__version__ = '0.2.7'
 # Version change log:
 # 0.1.0 Initial development
 # 0.1.1 Alpha release
@@ -74,6 +74,28 @@ __version__ = '0.1.8'
 #       recorded markup table. This is because those records are not
 #       created by MythTV when a scheduled recording occurs when a user
 #       is watching LiveTV.
+# 0.1.9 Collect the recording device details with a single joined query
+#       and keep them in a disk cache per channel id.
+#       Cache TV and movie grabber results and MythVideo artwork searches
+#       on disk so a batch of recordings from one series only runs the
+#       grabber once per series, season and episode.
+# 0.2.0 Use the SQLite bindings stand-in when the environment variable
+#       common.MYTHTV_STANDIN_ENV is set. Only for performance runs.
+# 0.2.1 Added the keyframe byte offsets used by the "-s" execution plan
+# 0.2.2 Take the recording's processing lease as soon as the recorded
+#       record is found so only one job at a time processes a recording
+# 0.2.3 Use a keyframe index from a scan of the recording's transport
+#       stream when the recordedseek table has no usable keyframe records
+# 0.2.4 Trim a sample video's markup and seek tables with column operations
+#       and bisect the keyframe timestamps for the sample's keyframes
+# 0.2.5 Read the recorded record by the chanid and start time in its
+#       basename and only search by basename when that fails. The key is
+#       kept for reading the record again after a cut list is generated.
+# 0.2.6 A replaced recording keeps the file extension of a transport
+#       stream cut and its duration is found from the kept frames.
+# 0.2.7 Added the checks and the refresh of the keyframes and the kept
+#       parts used to follow a recording that is still being recorded.
+#       Added the keyframe byte span of a group of kept parts.
 #
 __title__ = \
 '''mythtvinterface - Providing all MythTV interface functionality'''
@@ -85,11 +107,18 @@ all MythTV interface functionality.
 # Common function imports
 import os
 import time
+from datetime import datetime
+from bisect import bisect_left, bisect_right
+from itertools import compress
+from operator import itemgetter
 from socket import gethostname
 
 # Indicator specific imports
 from importcode.utilities import set_language, commandline_call, cleanup_working_dir, \
     is_not_punct_char, is_punct_char
+from importcode.diskcache import DiskCache
+from importcode.leases import RecordingLease
+from importcode.tsscan import scan_keyframes
 import importcode.common as common
 
 ## Local variables
@@ -98,6 +127,22 @@ __author__ = common.__author__
 _ = set_language()
 
 
+class _FrameTimestamps(object):
+    """The timestamps in seconds of a list of frame numbers in frame
+    order. A timestamp is only worked out when a bisect looks at it.
+    """
+
+    def __init__(self, marks, fps):
+        self.marks = marks
+        self.fps = fps
+
+    def __len__(self):
+        return len(self.marks)
+
+    def __getitem__(self, index):
+        return self.marks[index] / self.fps
+
+
 class Mythtvinterface(object):
     """Main interface to all MythTV Recorded data base records.
     Supports several metadata access methods with the MythTV master backend.
@@ -111,6 +156,7 @@ class Mythtvinterface(object):
         self.mythdb = None
         self.mythbeconn = None
         self.keyframe_adjust = False
+        self.lease = None
         #
         self.error_messages = {
             'BackendConnectFailed':
@@ -172,9 +218,16 @@ You will need to upgrade your MythTV install to at least a v0.%d+Fixes release.'
         # Find out if the MythTV python bindings can be accessed and
         # instances can be created
         try:
-            from MythTV import \
-                Recorded, RecordedProgram, Video, MythVideo, VideoGrabber, \
-                MythDB, MythBE, MythError, MythLog, OWN_VERSION, Job
+            if os.environ.get(common.MYTHTV_STANDIN_ENV):
+                from importcode.mythtv_standin import \
+                    Recorded, RecordedProgram, Video, MythVideo, \
+                    VideoGrabber, MythDB, MythBE, MythError, MythLog, \
+                    OWN_VERSION, Job
+            else:
+                from MythTV import \
+                    Recorded, RecordedProgram, Video, MythVideo, \
+                    VideoGrabber, MythDB, MythBE, MythError, MythLog, \
+                    OWN_VERSION, Job
             self.Recorded = Recorded
             self.RecordedProgram = RecordedProgram
             self.VideoGrabber = VideoGrabber
@@ -253,6 +306,15 @@ You will need to upgrade your MythTV install to at least a v0.%d+Fixes release.'
             self.logger.critical(verbage)
             raise Exception(verbage)
         #
+        ## Disk caches for the grabber and artwork look ups
+        self.metadata_cache = DiskCache(
+                    common.METADATA_CACHE_FILE % self.configuration,
+                    self.configuration['metadata_cache_hours'] * 3600,
+                    max_entries=self.configuration['metadata_cache_size'])
+        self.artwork_cache = DiskCache(
+                    common.ARTWORK_CACHE_FILE % self.configuration,
+                    self.configuration['artwork_cache_hours'] * 3600)
+        #
         ## Get the mythvidexport settings if they exist in the data base
         format_str = self.mythdb.settings[\
                             self.localhostname]['mythvideo.TVexportfmt']
@@ -268,6 +330,8 @@ You will need to upgrade your MythTV install to at least a v0.%d+Fixes release.'
             self.configuration['GENERICexportfmt'] = format_str
         #
         self.recorded = None
+        self.recorded_key = None
+        self.keyframe_index = None
         self.recorded_program = None
         self.vid = None
         self.category = None
@@ -291,9 +355,8 @@ You will need to upgrade your MythTV install to at least a v0.%d+Fixes release.'
         self.configuration['pre_massage_cutlist'] = []
         self.configuration['keyframe_cuts'] = []
         #
-        recorded = list(self.mythdb.searchRecorded(
-                        basename=self.configuration['base_name']))
-        if not recorded:
+        self.recorded = self._find_recorded()
+        if self.recorded is None:
             # TRANSLATORS: Please leave %s as it is,
             # because it is needed by the program.
             # Thank you for contributing to this project.
@@ -308,9 +371,8 @@ file "%s", aborting script.''') % self.configuration['base_name']
                                 self.configuration['recorded_name'])
             exit(int(common.JOBSTATUS().ABORTED))
         #
-        # Use the first recorded record.
-        # There should be only one record per base_name
-        self.recorded = recorded[0]
+        self.keyframe_index = None
+        self.acquire_lease()
         try:
             self.recorded_program = self.recorded.getRecordedProgram()
         except self.MythError as errmsg:
@@ -575,8 +637,8 @@ Error: %s''') % (self.configuration['mythutil'], result[1])
             #
             ## The current recorded record and its data needs to be
             ## Refreshed as the markup table cutlist has changed
-            self.recorded = list(self.mythdb.searchRecorded(
-                        basename=self.configuration['base_name']))[0]
+            self.recorded = self._find_recorded()
+            self.keyframe_index = None
             #
             ## Now the markup information is accurate
             self.configuration['rawcutlist'] = \
@@ -592,6 +654,64 @@ Error: %s''') % (self.configuration['mythutil'], result[1])
             self._process_cutlist()
         #
         return
+#
+    def recording_in_progress(self, ):
+        ''' Check if MythTV is still recording this recording. A recording
+        is in progress until its recorded record's end time has passed and
+        its file has not grown for a "follow_poll_seconds" interval, which
+        allows for recordings that run late.
+        return True or False
+        '''
+        recorded = self._find_recorded()
+        if recorded is None:
+            return False
+        self.recorded = recorded
+        self.keyframe_index = None
+        #
+        endtime = self.recorded.endtime
+        if endtime > datetime.now(endtime.tzinfo):
+            return True
+        #
+        return time.time() - os.path.getmtime(
+                    self.configuration['recordedfile']) < \
+                                self.configuration['follow_poll_seconds']
+#
+    def refresh_recording(self, ):
+        ''' Find the keyframes and the kept parts of a recording that is
+        still being recorded again from its latest recordedseek table and
+        markup. The cut list is never generated while the skip list is
+        still changing so a "-g" job uses the skip list as the cut list it
+        will generate once the recording has ended.
+        return nothing
+        '''
+        self.keyframe_index = None
+        self.configuration['recorded_filesize'] = os.path.getsize(
+                                    self.configuration['recordedfile'])
+        self.configuration['fps'], self.configuration['first_frame'], \
+        self.configuration['last_frame'], self.configuration['width'],\
+        self.configuration['height'] = \
+                            self._get_fps_and_more()
+        #
+        cutlist = self.recorded.markup.getcutlist()
+        if not cutlist and self.configuration['gencutlist']:
+            cutlist = self.recorded.markup.getskiplist()
+        self.configuration['rawcutlist'] = cutlist
+        self.configuration['keyframe_cuts'] = []
+        ## The kept parts between the cuts like the bindings' uncut list
+        ## where the last part runs to frame 9999999
+        self.configuration['pre_massage_cutlist'] = []
+        previous = 0
+        for start, end in cutlist:
+            if start > previous:
+                self.configuration['pre_massage_cutlist'].append(
+                                                    (previous, start))
+            previous = end
+        self.configuration['pre_massage_cutlist'].append(
+                                                    (previous, 9999999))
+        if cutlist:
+            self._process_cutlist()
+        #
+        return
 #
     def _get_fps_and_more(self, ):
         ''' Get a recorded file's fps rate, first frame and last frame.
@@ -674,8 +794,7 @@ invalid, aborting script.
         #
         ## Get firstframe
         try:
-            firstframe = [seek.mark for seek in self.recorded.seek
-                                        if seek.type == 9][0]
+            firstframe = self.keyframes()[0][0]
             if firstframe == None:
                 raise IndexError
         except IndexError:
@@ -685,7 +804,8 @@ invalid, aborting script.
             verbage = \
 _(u'''This MythTV recording has no recordedseek table first keyframe record.
 It is likely that the recordedseek table records for this recording is
-invalid, aborting script.
+invalid and no keyframes were found by scanning the recording file,
+aborting script.
 ''')
             self.logger.critical(verbage)
             self.stderr.write(verbage + u'\n')
@@ -697,8 +817,7 @@ invalid, aborting script.
         #
         ## Get lastframe
         try:
-            lastframe = [seek.mark for seek in self.recorded.seek
-                                        if seek.type == 9][-1]
+            lastframe = self.keyframes()[-1][0]
             if lastframe == None:
                 raise IndexError
         except IndexError:
@@ -708,7 +827,8 @@ invalid, aborting script.
             verbage = _(
 u'''This MythTV recording has no recordedseek table last keyframe record.
 It is likely that the recordedseek table records for this recording is
-invalid, aborting script.
+invalid and no keyframes were found by scanning the recording file,
+aborting script.
 ''')
             self.logger.critical(verbage)
             self.stderr.write(verbage + u'\n')
@@ -726,36 +846,29 @@ invalid, aborting script.
         Log original INCLUSIVE cut list and massaged cutlist
         return nothing
         '''
+        marks = [keyframe[0] for keyframe in self.keyframes()]
         #
         ## Find keyframe less than or equal to frame
         def less_than(frame):
             '''Find a keyframe that is less than or equal to a input frame
             return the keyframe or if none found return the original frame
             '''
-            try:
-                keyframe = [seek.mark for seek in self.recorded.seek
-                            if seek.type == 9 and seek.mark <= frame][-1]
-                if keyframe == None:
-                    raise IndexError
-            except IndexError:
+            index = bisect_right(marks, frame) - 1
+            if index < 0:
                 return frame
             #
-            return keyframe
+            return marks[index]
         #
         ## Find keyframe greater than or equal to frame
         def greater_than(frame):
             '''Find a keyframe that is less than or equal to a input frame
             return the keyframe or if none found return the original frame
             '''
-            try:
-                keyframe = [seek.mark for seek in self.recorded.seek
-                            if seek.type == 9 and seek.mark >= frame][0]
-                if keyframe == None:
-                    raise IndexError
-            except IndexError:
+            index = bisect_left(marks, frame)
+            if index == len(marks):
                 return frame
             #
-            return keyframe
+            return marks[index]
         #
         # If this is a copy then the cutlist is the first and last keyframes
         if first_last:
@@ -915,14 +1028,16 @@ Error: %s
         self.recorded.commflagged = 0
         self.recorded.filesize = self.configuration['filesize']
         self.recorded.basename = self.configuration['recorded_name'] + \
-                                                            u'.mkv'
+                                    self.configuration['output_extension']
         #
         ## Get the mkv video's duration for the recorded markup
         ## type 33 record update
         self._get_new_duration()
         #
-        ## Delete all recordedseek records for this recording
+        ## Delete all recordedseek records for this recording. The byte
+        ## offsets of a transport stream cut no longer match either.
         self.recorded.seek.clean()
+        self.keyframe_index = None
         #
         ## Update/change/delete recordedmarkup table records
         # Update recordedmarkup type 33 video duration in milliseconds
@@ -978,9 +1093,24 @@ Error: %s
         return
 #
     def _get_new_duration(self,):
-        ''' Calculate the new mkv file's play time (duration).
+        ''' Calculate the new mkv file's play time (duration). A transport
+        stream cut has no mkv file information so its duration is the
+        number of kept frames at the recording's frame rate.
         return nothing
         '''
+        if self.configuration['tscut']:
+            if self.configuration['rawcutlist']:
+                cuts = self.configuration['keyframe_cuts']
+            else:
+                cuts = self.configuration['first_last_keyframes']
+            kept_frames = sum([min(end, self.configuration['last_frame']) -
+                                start for start, end in cuts])
+            self.configuration['new_duration'] = int(round(
+                        kept_frames * 1000 / self.configuration['fps']))
+            self.new_runtime = int(round(
+                        self.configuration['new_duration'] / 60000.0))
+            return
+        #
         ## Get the mkv video's duration for the recorded markup
         ## type 33 record update
         result = commandline_call('mkvinfo',
@@ -1048,9 +1178,8 @@ _(u'''mkvinfo could not find the mkv video's duration, aborting script.''')
         self.keyframe_adjust = True
         #
         ## Find the recorded record for this MythTV recording
-        recorded = list(self.mythdb.searchRecorded(
-                        basename = self.configuration['base_name']))
-        if not recorded:
+        self.recorded = self._find_recorded()
+        if self.recorded is None:
             # TRANSLATORS: Please leave %s as it is,
             # because it is needed by the program.
             # Thank you for contributing to this project.
@@ -1065,9 +1194,8 @@ file "%s", aborting script.''') % self.configuration['base_name']
                                 self.configuration['recorded_name'])
             exit(int(common.JOBSTATUS().ABORTED))
         #
-        # Use the first recorded record.
-        # There should be only one record per base_name
-        self.recorded = recorded[0]
+        self.keyframe_index = None
+        self.acquire_lease()
         self.configuration['chanid'] = self.recorded.chanid
         self.configuration['starttime'] = self.recorded.starttime
         self.configuration['progstart'] = self.recorded.progstart
@@ -1212,6 +1340,122 @@ Error: %s
                     _(u'''Successfully generated a new cut list\n\n'''))
         #
         return
+#
+    def _basename_key(self, ):
+        ''' The recorded table primary key held in a MythTV recording's
+        basename. From MythTV v0.26 the start time is given as UTC.
+        return a tuple of (chanid, starttime) or None
+        '''
+        match = common.RECORDED_BASENAME_REGEX.match(
+                                            self.configuration['base_name'])
+        if not match:
+            return None
+        starttime = datetime.strptime(match.group('starttime'),
+                                      common.RECORDED_BASENAME_TIME_FORMAT)
+        if self.OWN_VERSION[1] >= 26:
+            starttime = starttime.strftime(common.RECORDED_UTC_ISO_FORMAT)
+        #
+        return int(match.group('chanid')), starttime
+#
+    def _find_recorded(self, ):
+        ''' Read the recording's recorded record by its primary key, which
+        is kept once the record is found so that later reads in this job
+        use it too. Recordings whose basename does not hold the key, or
+        whose key look up fails, are searched for by basename.
+        return a Recorded instance or None
+        '''
+        key = self.recorded_key or self._basename_key()
+        if key is not None:
+            try:
+                recorded = self.Recorded(key, db=self.mythdb)
+                if recorded.basename == self.configuration['base_name']:
+                    self.recorded_key = key
+                    return recorded
+            except Exception:
+                pass
+        #
+        # Use the first recorded record.
+        # There should be only one record per base_name
+        recorded = list(self.mythdb.searchRecorded(
+                        basename=self.configuration['base_name']))
+        if not recorded:
+            return None
+        self.recorded_key = (recorded[0].chanid, recorded[0].starttime)
+        #
+        return recorded[0]
+#
+    def acquire_lease(self, ):
+        ''' Take the recording's processing lease so no other lossless_cut
+        or keyframe_adjust job processes it at the same time. Wait while
+        another running job holds it, for at most the "lease_wait_minutes"
+        performance setting. The "-s" summary never takes the lease.
+        return nothing
+        '''
+        if self.configuration.get('summary'):
+            return
+        #
+        self.lease = RecordingLease(self.configuration,
+                self.recorded.chanid, self.recorded.starttime,
+                (u'lossless_cut', u'keyframe_adjust')[self.keyframe_adjust])
+        started = time.time()
+        waiting = False
+        while True:
+            try:
+                holder = self.lease.try_acquire()
+            except (IOError, OSError) as errmsg:
+                # TRANSLATORS: Please leave %s as it is,
+                # because it is needed by the program.
+                # Thank you for contributing to this project.
+                self.logger.info(_(
+u'''Could not take the processing lease for "%s", continuing without it.
+Error: %s''') % (self.configuration['recordedfile'], errmsg))
+                self.lease = None
+                return
+            if holder is None:
+                break
+            #
+            minutes = self.configuration['lease_wait_minutes']
+            if time.time() - started >= minutes * 60:
+                # TRANSLATORS: Please leave %s as it is,
+                # because it is needed by the program.
+                # Thank you for contributing to this project.
+                verbage = _(
+u'''The recording "%s" is already being processed by %s job id "%s"
+(process "%s" on host "%s"), exiting script.''') % (
+                    self.configuration['recordedfile'],
+                    holder.get('script'), holder.get('jobid'),
+                    holder.get('pid'), holder.get('hostname'))
+                self.logger.critical(verbage)
+                self.stderr.write(verbage + u'\n')
+                exit(int(common.JOBSTATUS().ABORTED))
+            #
+            if not waiting:
+                waiting = True
+                # TRANSLATORS: Please leave %s as it is,
+                # because it is needed by the program.
+                # Thank you for contributing to this project.
+                verbage = _(
+u'''Waiting for %s job id "%s" to finish processing the recording "%s".''') % (
+                    holder.get('script'), holder.get('jobid'),
+                    self.configuration['recordedfile'])
+                self.logger.info(verbage)
+                self.stdout.write(verbage + u'\n')
+                if self.configuration.get('jobid'):
+                    self.update_jobqueue(common.JOBSTATUS().RUNNING,
+                                         verbage)
+            time.sleep(common.LEASE_POLL_SECONDS)
+        #
+        return
+#
+    def release_lease(self, ):
+        ''' Give up the recording's processing lease when it is held.
+        return nothing
+        '''
+        if self.lease is not None:
+            self.lease.release()
+            self.lease = None
+        #
+        return
 #
     def _set_sql_starttime(self,):
         ''' Set the SQL starttime based on whether the starttime
@@ -1269,45 +1513,35 @@ Your installed version has been detected as "%s", aborting script.''') % \
         self.configuration['recorders_videodevice'] = "Unknown"
         self.configuration['recorders_audiodevice'] = "Unknown"
         self.configuration['recorders_hostname'] = "Unknown"
+        ## The device details for a channel rarely change so check the
+        ## disk cache before querying the data base
+        cache = DiskCache(common.RECORDER_CACHE_FILE % self.configuration,
+                    self.configuration['recorder_cache_hours'] * 3600)
+        cache_key = str(self.recorded.chanid)
+        details = cache.get(cache_key)
+        if details is not None:
+            for key, value in zip(common.RECORDER_DETAIL_KEYS, details):
+                self.configuration[key] = value
+            return
         #
         ## Get a MythTV data base cursor
         cursor = self.mythdb.cursor()
         #
-        sql_cmd = common.SQL_GET_SOURCEID % self.recorded.chanid
+        sql_cmd = common.SQL_GET_RECORDER_DETAILS % self.recorded.chanid
         cursor.execute(sql_cmd)
-        channel = cursor.fetchall()
-        if not len(channel) > 0:
+        details = cursor.fetchall()
+        cursor.close()
+        if not len(details) > 0:
             self.logger.info(
-_(u'''There is no channel record for chanid "%d", skipping getting recorder details.''' %
+_(u'''There is no channel, cardinput or capturecard record for chanid "%d", skipping getting recorder details.''' %
                 self.recorded.chanid))
             return
         #
-        sql_cmd = common.SQL_GET_CARDINFO % channel[0][0]
-        cursor.execute(sql_cmd)
-        cardinfo = cursor.fetchall()
-        if not len(cardinfo) > 0:
-            self.logger.info(
-_(u'''There is no cardinfo record for sourceid "%d", skipping getting recorder details.''' %
-                    channel[0][0]))
-            return
+        details = tuple(details[0])
+        for key, value in zip(common.RECORDER_DETAIL_KEYS, details):
+            self.configuration[key] = value
         #
-        sql_cmd = common.SQL_GET_CARDID % cardinfo[0][0]
-        cursor.execute(sql_cmd)
-        capturecard = cursor.fetchall()
-        if not len(capturecard) > 0:
-            self.logger.info(
-_(u'''There is no capturecard record for cardid "%d", skipping getting recorder details.''' %
-                    cardinfo[0][0]))
-            return
-        #
-        self.configuration['recorder_displayname'] = cardinfo[0][1]
-        self.configuration['recorders_cardtype'] = capturecard[0][0]
-        self.configuration['recorders_defaultinput'] = capturecard[0][1]
-        self.configuration['recorders_videodevice'] = capturecard[0][2]
-        self.configuration['recorders_audiodevice'] = capturecard[0][3]
-        self.configuration['recorders_hostname'] = capturecard[0][4]
-        #
-        cursor.close()
+        cache.set(cache_key, details)
         #
         return
 #
@@ -1375,8 +1609,8 @@ _(u'''There is no program guide for this recorded video, skipping getting the ge
         ## Add the artwork if it already exists
         if not self.configuration['v024'] and \
                     self.configuration['inetref']:
-            artworkArray = list(self.mythdb.searchArtwork(
-                                inetref=self.configuration['inetref']))
+            artworkArray = self._search_artwork(
+                                self.configuration['inetref'])
             keys = ['coverart', 'fanart', 'banner']
             if len(artworkArray):
                 first_match = None
@@ -1387,14 +1621,14 @@ _(u'''There is no program guide for this recorded video, skipping getting the ge
                         self.recorded_program.category_type == 'series' and \
                             not self.configuration['subtitle'] and \
                             self.configuration['season_num'] == 0:
-                        if not artwork.season == 0:
+                        if not artwork['season'] == 0:
                             continue
                     if not first_match:
                         first_match = artwork
                     #
                     ## Try to find the graphics for the specific season
                     if not self.configuration['season_num'] == \
-                            artwork.season:
+                            artwork['season']:
                         continue
                     for key in keys:
                         if key == 'coverart':
@@ -1504,7 +1738,9 @@ Copying "%s"''') % self.configuration['mkv_file']
         try:
             if inetref:
                 try:
-                    self.metadata = self.ttvdb.grabInetref(inetref,
+                    self.metadata = self._cached_grab(self.ttvdb, 'TV',
+                                    (inetref, season_num, episode_num),
+                                    self.ttvdb.grabInetref, inetref,
                                     season=season_num, episode=episode_num)
                     # Default to the first studio and category
                     if self.metadata.studios:
@@ -1520,7 +1756,9 @@ Copying "%s"''') % self.configuration['mkv_file']
             #
             if not self.metadata and series and episode:
                 try:
-                    self.metadata = self.ttvdb.sortedSearch(
+                    self.metadata = self._cached_grab(self.ttvdb, 'TV',
+                                    (series, episode, None),
+                                    self.ttvdb.sortedSearch,
                                     series, episode)
                     self.logger.info(
                             _(u'''Found TV series "%s" Episode "%s".''') %
@@ -1554,6 +1792,47 @@ Error %s''') % errmsg)
                 self.metadata = self.recorded.exportMetadata()
         #
         return
+#
+    def _cached_grab(self, grabber, grabber_type, key, grab, *args,
+                                                        **kwargs):
+        ''' Return a grabber result from the metadata disk cache or call
+        the grabber and cache a successful result. The cache key is the
+        grabber, the inetref or title plus the season and episode.
+        Failed look ups raise as usual and are never cached.
+        return the grabber result
+        '''
+        cache_key = (getattr(grabber, 'path', grabber_type),
+                     grab.__name__, ) + tuple(key)
+        metadata = self.metadata_cache.get(cache_key)
+        if metadata is not None:
+            self.logger.info(
+                _(u'''Using cached %s grabber results for "%s".''') %
+                (grabber_type, key[0]))
+            return metadata
+        #
+        metadata = grab(*args, **kwargs)
+        if metadata:
+            self.metadata_cache.set(cache_key, metadata)
+        #
+        return metadata
+#
+    def _search_artwork(self, inetref):
+        ''' Search the MythVideo artwork for an inetref. The results are
+        kept as plain dictionaries in the artwork disk cache.
+        return a list of artwork dictionaries
+        '''
+        artworkArray = self.artwork_cache.get(inetref)
+        if artworkArray is not None:
+            return artworkArray
+        #
+        artworkArray = []
+        for artwork in self.mythdb.searchArtwork(inetref=inetref):
+            artworkArray.append(dict([(key, artwork[key])
+                                for key in common.ARTWORK_KEYS]))
+        if artworkArray:
+            self.artwork_cache.set(inetref, artworkArray)
+        #
+        return artworkArray
 #
     def _get_movie_metadata(self, title=None, inetref=False):
         ''' Use the grabber (internal tmdb/tmdb3) or grabber in the settings
@@ -1567,7 +1846,9 @@ Error %s''') % errmsg)
         try:
             if inetref:
                 try:
-                    self.metadata = self.tmdb.grabInetref(inetref)
+                    self.metadata = self._cached_grab(self.tmdb, 'Movie',
+                                    (inetref, None, None),
+                                    self.tmdb.grabInetref, inetref)
                     self.logger.info(
                             _(u'''Found Movie "%s".''') %
                             (self.metadata['title']))
@@ -1581,7 +1862,9 @@ Error %s''') % errmsg)
             #
             if not self.metadata and title:
                 try:
-                    self.metadata = self.tmdb.sortedSearch(title)
+                    self.metadata = self._cached_grab(self.tmdb, 'Movie',
+                                    (title, None, None),
+                                    self.tmdb.sortedSearch, title)
                     self.logger.info(
                             _(u'''Found Movie "%s".''') %
                             (self.metadata[0]['title']))
@@ -1662,9 +1945,8 @@ Error %s''') % errmsg)
             self.configuration['frame'] = \
                         int(starttime * self.configuration['fps'])
             #
-            frame_offset = [seek.offset for seek in self.recorded.seek
-                    if seek.type == 9 and seek.mark <=
-                                    self.configuration['frame']][-1]
+            frame_offset = [offset for mark, offset in self.keyframes()
+                    if mark <= self.configuration['frame']][-1]
             #
             if frame_offset == None:
                 self.logger.info(
@@ -1675,6 +1957,91 @@ _(u'''There was no offset found for frame %(frame)s, returning start block equal
 _(u'''There is not FPS value to calculate an offset, returning start block equal to zero.'''))
         #
         return frame_offset
+#
+    def keyframes(self, ):
+        ''' The recording's keyframe index from the recordedseek table
+        keyframe records. When there are none or they are damaged the
+        index comes from a scan of the recording file instead, which saves
+        a "mythcommflag --rebuild" of the seek table.
+        return a list of (frame number, byte offset) tuples in frame order
+        '''
+        if self.keyframe_index is not None:
+            return self.keyframe_index
+        #
+        keyframes = sorted([(seek.mark, seek.offset)
+                            for seek in self.recorded.seek
+                            if seek.type == 9 and seek.mark is not None])
+        filesize = self.configuration.get('recorded_filesize') or \
+                        os.path.getsize(self.configuration['recordedfile'])
+        ## Damaged keyframe records repeat frames, go backwards in the file
+        ## or point past its end
+        damaged = bool(keyframes) and (keyframes[-1][1] > filesize or
+                    [keyframe for keyframe, following in
+                        zip(keyframes, keyframes[1:])
+                        if following[0] == keyframe[0] or
+                                            following[1] < keyframe[1]])
+        if not keyframes or damaged:
+            # TRANSLATORS: Please leave %s as it is,
+            # because it is needed by the program.
+            # Thank you for contributing to this project.
+            self.logger.info(_(
+u'''The recordedseek table has no usable keyframe records, scanning
+"%s" for keyframes.''') % self.configuration['recordedfile'])
+            keyframes = scan_keyframes(self.configuration['recordedfile'])
+            # TRANSLATORS: Please leave %s as it is,
+            # because it is needed by the program.
+            # Thank you for contributing to this project.
+            self.logger.info(_(
+u'''Found "%d" keyframes in the recording.''') % len(keyframes))
+        self.keyframe_index = keyframes
+        #
+        return self.keyframe_index
+#
+    def keyframe_byte_offsets(self, frames):
+        ''' Using the keyframe index find the byte offset of each keyframe
+        number. Frames at or past the last frame are at the end of the
+        recording.
+        return a list of byte offsets in the same order as the frames
+        '''
+        keyframes = self.keyframes()
+        marks = [keyframe[0] for keyframe in keyframes]
+        filesize = self.configuration['recorded_filesize']
+        #
+        offsets = []
+        for frame in frames:
+            if not keyframes or frame >= self.configuration['last_frame']:
+                offsets.append(filesize)
+                continue
+            index = bisect_right(marks, frame) - 1
+            if index < 0:
+                offsets.append(0)
+            else:
+                offsets.append(min(keyframes[index][1], filesize))
+        #
+        return offsets
+#
+    def keyframe_byte_span(self, start_frame, end_frame):
+        ''' Using the keyframe index find the bytes of the recording from
+        the keyframe at or before a start frame to the first keyframe after
+        an end frame. The bytes up to that following keyframe hold the rest
+        of the end frame's group of pictures and the audio muxed after it.
+        return a tuple of (the start keyframe number, start byte offset,
+        end byte offset)
+        '''
+        keyframes = self.keyframes()
+        marks = [keyframe[0] for keyframe in keyframes]
+        filesize = self.configuration['recorded_filesize']
+        #
+        start = (0, 0)
+        index = bisect_right(marks, start_frame) - 1
+        if index >= 0:
+            start = keyframes[index]
+        end = filesize
+        index = bisect_right(marks, end_frame)
+        if index < len(keyframes):
+            end = min(keyframes[index][1], filesize)
+        #
+        return start[0], min(start[1], filesize), end
 #
     def get_all_recording_data(self,):
         '''Get all of a recording's DB data. This includes the recorded,
@@ -1763,47 +2130,62 @@ u'''Adjust the DB records as this is only a sample video file.''')
             recorded_data['recorded'][0]['filesize'] = \
                             os.path.getsize(self.configuration['base_name'])
             #
-            new_markuptable = []
-            for markup_record in recorded_data['recordedmarkup']:
-                if markup_record['type'] == 32:
-                    fps_str = str(markup_record['data'])
-                    self.configuration['fps'] = float(fps_str[:2] + '.' +
-                                                        fps_str[2:])
-                elif markup_record['type'] == 33:
-                    # Duration in millseconds
-                    markup_record['data'] = recorded_data[
-                                            'video_duration'] * 1000
-                # Skip any skip or cut frames as they are no longer
-                # accurate
-                if markup_record['type'] in [0, 1, 4, 5, 34]:
-                    continue
-                new_markuptable.append(markup_record)
+            ## The markup and seek tables are trimmed using columns of
+            ## their record types, frame numbers and byte offsets
+            markuptable = recorded_data['recordedmarkup']
+            mark_types = [markup_record['type']
+                                    for markup_record in markuptable]
+            fps_records = [markup_record for markup_record, mark_type in
+                    zip(markuptable, mark_types) if mark_type == 32]
+            if fps_records:
+                fps_str = str(fps_records[-1]['data'])
+                self.configuration['fps'] = float(fps_str[:2] + '.' +
+                                                    fps_str[2:])
+            # Duration in millseconds
+            for markup_record in [markup_record for markup_record, mark_type
+                    in zip(markuptable, mark_types) if mark_type == 33]:
+                markup_record['data'] = recorded_data[
+                                        'video_duration'] * 1000
+            # Skip any skip or cut frames as they are no longer
+            # accurate
+            recorded_data['recordedmarkup'] = [markup_record
+                    for markup_record, mark_type in zip(markuptable,
+                                                        mark_types)
+                    if mark_type not in common.SAMPLE_SKIPPED_MARKUP_TYPES]
             #
-            recorded_data['recordedmarkup'] = new_markuptable
+            seektable = recorded_data['recordedseek']
+            seek_types = map(itemgetter('type'), seektable)
+            keyframes = list(compress(seektable,
+                        [seek_type == 9 for seek_type in seek_types]))
+            new_seektable = list(compress(seektable,
+                        [seek_type != 9 for seek_type in seek_types]))
+            marks = map(itemgetter('mark'), keyframes)
+            if marks != sorted(marks):
+                keyframes.sort(key=itemgetter('mark'))
+                marks = map(itemgetter('mark'), keyframes)
+            timestamps = _FrameTimestamps(marks, self.configuration['fps'])
             #
-            new_seektable = []
-            for seekrecord in recorded_data['recordedseek']:
-                if seekrecord['type'] == 9:
-                    if seekrecord['mark'] == 0 and \
-                                seekrecord['offset'] == 0:
-                        new_seektable.append(seekrecord)
-                        continue
-                    #
-                    # Set when the keyframe's timestamp
-                    timestamp = seekrecord['mark'] / self.configuration['fps']
-                    if recorded_data['sample_starttime'] == 0:
-                        if timestamp > recorded_data['video_duration']:
-                            continue
-                        new_seektable.append(seekrecord)
-                    elif timestamp < recorded_data['sample_starttime'] or \
-                            timestamp > recorded_data['video_duration']:
+            ## The keyframes from the sample's start time up to the
+            ## sample's duration are kept with their offsets counted from
+            ## the last keyframe before the sample. A zero frame at a zero
+            ## offset is always kept.
+            first = bisect_left(timestamps,
+                                recorded_data['sample_starttime'])
+            last = bisect_right(timestamps, recorded_data['video_duration'])
+            if recorded_data['sample_starttime'] == 0:
+                new_seektable.extend(keyframes[:last])
+            else:
+                previous_offset = 0
+                for seekrecord in reversed(keyframes[:first]):
+                    if seekrecord['mark'] != 0 or seekrecord['offset'] != 0:
                         previous_offset = seekrecord['offset']
-                    else:
-                        seekrecord['offset'] = \
-                            seekrecord['offset'] - previous_offset
-                        new_seektable.append(seekrecord)
-                else:
-                    new_seektable.append(seekrecord)
+                        break
+                new_seektable.extend([seekrecord for seekrecord in
+                        keyframes[:min(first, bisect_right(marks, 0))]
+                        if seekrecord['offset'] == 0])
+                for seekrecord in keyframes[first:last]:
+                    seekrecord['offset'] -= previous_offset
+                new_seektable.extend(keyframes[first:last])
             recorded_data['recordedseek'] = new_seektable
         #
         ## Get a MythTV data base cursor
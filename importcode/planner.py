@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+# ----------------------
+# Name: planner.py   Provides the "-s" option execution plan and the
+#                    measured stage throughput history used by lossless_cut
+# Python Script
+# Author:   R.D. Vaughan
+# Purpose:  This python script supports the lossless_cut.py.
+#           Predicts the bytes each job stage reads and writes, the peak
+#           working directory space and the output size from the keyframe
+#           cut list and the recordedseek byte offsets. The run time is
+#           estimated from the throughput of the stages of earlier jobs.
+#
+# Copyright (C) 2012 R.D. Vaughan
+# rdvLaunchpad@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# License:Creative Commons GNU GPL v2
+# (https://www.gnu.org/licenses/gpl-2.0.html)
+#-------------------------------------
+#
+"""
+__version__ = '0.1.1'
+# Version change log:
+# 0.1.0 Initial development
+# 0.1.1 The cut stage of several mkvmerge processes reads only each
+#       process's span of a transport stream recording
+#
+## Common function imports
+from datetime import timedelta
+#
+# Indicator specific imports
+import importcode.common as common
+from importcode.diskcache import DiskCache
+from importcode.utilities import set_language
+#
+# Language translation specific to this desktop
+_ = set_language()
+#
+#
+def throughput_history(configuration):
+    ''' The disk cache of the measured stage throughput of earlier jobs.
+    return a DiskCache instance
+    '''
+    return DiskCache(common.THROUGHPUT_HISTORY_FILE % configuration,
+                     common.THROUGHPUT_HISTORY_HOURS * 3600)
+#
+def record_throughput(configuration, stage_totals):
+    ''' Add a job's stage times and I/O to the throughput history. Older
+    jobs count for less each time a job is added so the history follows
+    changes in the hardware.
+    return nothing
+    '''
+    history = throughput_history(configuration)
+    for stage in common.PLAN_STAGES:
+        total = stage_totals.get(stage)
+        if not total or total['seconds'] <= 0:
+            continue
+        io_bytes = total.get('bytes_read', 0) + \
+                                        total.get('bytes_written', 0)
+        entry = history.get(stage) or {'bytes': 0.0, 'seconds': 0.0,
+                                       'jobs': 0.0, }
+        for key, value in [('bytes', io_bytes),
+                           ('seconds', total['seconds']),
+                           ('jobs', 1)]:
+            entry[key] = entry[key] * common.THROUGHPUT_HISTORY_DECAY + \
+                                                                    value
+        history.set(stage, entry)
+    #
+    return
+#
+def estimate_seconds(history, stage, io_bytes):
+    ''' Estimate a stage's run time from its predicted I/O and the
+    stage's measured throughput. Stages without a history use the
+    default throughput.
+    return a tuple of (seconds, True when measured)
+    '''
+    entry = history.get(stage)
+    if entry and entry['seconds'] > 0:
+        if io_bytes and entry['bytes'] > 0:
+            return io_bytes * entry['seconds'] / entry['bytes'], True
+        return entry['seconds'] / entry['jobs'], True
+    #
+    return float(io_bytes) / common.PLAN_DEFAULT_THROUGHPUT, False
+#
+def group_segments(sizes, count):
+    ''' Split consecutive segments into at most count groups with about
+    the same total size in each group.
+    return a list of lists of segment indexes
+    '''
+    count = min(len(sizes), max(1, count))
+    remaining = float(sum(sizes))
+    groups = [[]]
+    group_size = 0
+    for index, size in enumerate(sizes):
+        ## Start a new group once this one has its share of the sizes
+        ## that were still to be grouped when it was started
+        if groups[-1] and len(groups) < count and \
+                group_size >= remaining / (count - len(groups) + 1):
+            remaining -= group_size
+            groups.append([])
+            group_size = 0
+        groups[-1].append(index)
+        group_size += size
+    #
+    return groups
+#
+#
+def build_plan(configuration, subtitles, segments, transport_stream=False):
+    ''' Work out the stages that will run and the bytes each reads and
+    writes. The segments are the (start, end) byte offsets of each kept
+    part of the recording. Subtitle tracks are remuxed into a full copy
+    of the recording in the working directory before the cuts. A
+    transport stream cut only copies the segments. Each of several
+    mkvmerge cut processes reads a recording from its start unless the
+    recording is a transport stream, then each is given a copy of only
+    its own span.
+    Error detection rules are not included as they run user commands.
+    return a dictionary of the plan
+    '''
+    filesize = configuration['recorded_filesize']
+    cutting = bool(configuration['rawcutlist'] and segments)
+    if cutting:
+        kept = sum([end - start for start, end in segments])
+        last_byte = max([end for start, end in segments])
+    else:
+        kept = filesize
+        last_byte = filesize
+    concertcuts = bool(configuration['concertcuts']) and cutting
+    #
+    stages = []
+    workspace = 0
+    remuxed = False
+    if not configuration['strip'] and subtitles and \
+            not configuration['tscut']:
+        ## The subtitle extraction and the remux both read the recording
+        remuxed = True
+        workspace = filesize
+        stages.append({'stage': u'subtitles', 'read': 2 * filesize,
+                       'written': filesize, 'workspace': workspace, })
+        last_byte = filesize
+    #
+    if configuration['tscut']:
+        ## The kept byte ranges are copied straight to the output
+        stages.append({'stage': u'tscut', 'read': kept, 'written': kept,
+                       'workspace': workspace, })
+    elif concertcuts:
+        ## Finished segments wait in a bounded queue for their export
+        waiting = max(1, configuration['concert_cuts_queue_size']) + 1
+        largest = max([end - start for start, end in segments])
+        stages.append({'stage': u'cut', 'read': last_byte,
+                       'written': kept, 'workspace': workspace +
+                                        min(kept, waiting * largest), })
+        stages.append({'stage': u'export', 'read': kept, 'written': kept,
+                       'workspace': workspace + min(kept, waiting * largest),
+                       })
+    else:
+        if cutting:
+            workspace += kept
+            cut = {'stage': u'cut', 'read': last_byte, 'written': kept,
+                   'workspace': workspace, }
+            groups = group_segments([end - start for start, end in segments],
+                                    configuration['cut_processes'])
+            if len(groups) > 1 and transport_stream and not remuxed:
+                ## Each process's span is copied then read by its mkvmerge
+                spans = sum([segments[group[-1]][1] - segments[group[0]][0]
+                                for group in groups])
+                cut['read'] = 2 * spans
+                cut['written'] = kept + spans
+                cut['workspace'] = workspace + spans
+            stages.append(cut)
+        stages.append({'stage': u'merge', 'read': kept, 'written': kept,
+                       'workspace': workspace, })
+        if configuration['mythvideo_export']:
+            stages.append({'stage': u'export', 'read': kept,
+                           'written': kept, 'workspace': workspace, })
+    #
+    return {
+        'stages': stages,
+        'segments': len(segments),
+        'recorded_filesize': filesize,
+        'output_size': kept,
+        'peak_workspace': max([stage['workspace'] for stage in stages]),
+    }
+#
+def format_bytes(size):
+    ''' Display a byte count in the largest suitable unit.
+    return text
+    '''
+    size = float(size)
+    for unit in [u'B', u'KB', u'MB', u'GB']:
+        if abs(size) < 1024:
+            return u'%.1f %s' % (size, unit)
+        size /= 1024
+    return u'%.1f TB' % size
+#
+def format_plan(configuration, plan):
+    ''' Make the plan's table of stages and totals. The run time of
+    the metadata look up stages is taken from the history.
+    return text
+    '''
+    history = throughput_history(configuration)
+    lines = [u'%-14s %12s %12s %14s %10s' % (u'Stage', u'Read',
+                    u'Written', u'Working space', u'Time')]
+    total_seconds = 0.0
+    estimated = False
+    stages = [{'stage': stage, 'read': 0, 'written': 0, 'workspace': 0}
+                    for stage in common.PLAN_METADATA_STAGES] + \
+                                                            plan['stages']
+    for stage in stages:
+        seconds, measured = estimate_seconds(history, stage['stage'],
+                                    stage['read'] + stage['written'])
+        total_seconds += seconds
+        if not measured:
+            estimated = True
+        lines.append(u'%-14s %12s %12s %14s %9s%s' % (stage['stage'],
+                format_bytes(stage['read']), format_bytes(stage['written']),
+                format_bytes(stage['workspace']),
+                timedelta(seconds=int(round(seconds))),
+                (u' ', u'*')[not measured]))
+    #
+    # TRANSLATORS: Please leave %s as it is,
+    # because it is needed by the program.
+    # Thank you for contributing to this project.
+    text = _(u'''
+Execution plan for "%(recordedfile)s":
+''') % configuration
+    text += u'\n'.join([u'  ' + line for line in lines])
+    # TRANSLATORS: Please leave %s as it is,
+    # because it is needed by the program.
+    # Thank you for contributing to this project.
+    text += _(u'''
+
+  Kept segments:                %s
+  Recording size:               %s
+  Output size:                  %s
+  Peak working directory space: %s
+  Estimated run time:           %s
+''') % (plan['segments'], format_bytes(plan['recorded_filesize']),
+            format_bytes(plan['output_size']),
+            format_bytes(plan['peak_workspace']),
+            timedelta(seconds=int(round(total_seconds))))
+    if estimated:
+        # TRANSLATORS: Please leave %s as it is,
+        # because it is needed by the program.
+        # Thank you for contributing to this project.
+        text += _(u'''
+  * No earlier job measured this stage, "%s" MB per second is assumed.
+''') % (common.PLAN_DEFAULT_THROUGHPUT // (1024 * 1024))
+    #
+    return text + u'\n'
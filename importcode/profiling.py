@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+# ----------------------
+# Name: profiling.py   Provides the opt-in "--profile" option support
+#                      used by lossless_cut, keyframe_adjust and ll_report
+# Python Script
+# Author:   R.D. Vaughan
+# Purpose:  This python script supports the lossless_cut.py.
+#           Runs a script's main processing under cProfile and takes memory
+#           snapshots at each job stage boundary. The profile statistics
+#           and a top functions summary are saved in the log directory.
+#
+# Copyright (C) 2012 R.D. Vaughan
+# rdvLaunchpad@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# License:Creative Commons GNU GPL v2
+# (https://www.gnu.org/licenses/gpl-2.0.html)
+#-------------------------------------
+#
+"""
+__version__ = '0.1.0'
+# Version change log:
+# 0.1.0 Initial development
+#
+## Common function imports
+import time
+import resource
+import cProfile
+import pstats
+from StringIO import StringIO
+#
+# tracemalloc is only part of newer pythons. Without it the memory
+# snapshots fall back to the process's peak resident memory.
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+#
+# Indicator specific imports
+import importcode.common as common
+import importcode.jobstats as jobstats
+#
+#
+class Profiler(object):
+    """Runs a function under cProfile and records memory use at each
+    job stage boundary.
+    """
+
+    def __init__(self, configuration, script_name):
+        #
+        self.configuration = configuration
+        self.script_name = script_name
+        self.memory = []
+        self.last_snapshot = None
+        #
+        return    # end __init__()
+
+    def _snapshot(self, stage, event):
+        ''' Record the memory in use at a stage boundary. With
+        tracemalloc the allocations that grew the most since the previous
+        snapshot are also kept.
+        return nothing
+        '''
+        record = {'stage': stage, 'event': event, 'time': time.time(),
+                  'max_rss_kb': resource.getrusage(
+                                    resource.RUSAGE_SELF).ru_maxrss, }
+        if tracemalloc is not None and tracemalloc.is_tracing():
+            record['current'], record['peak'] = \
+                                    tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            if self.last_snapshot is not None:
+                record['top_growth'] = [unicode(stat) for stat in
+                        snapshot.compare_to(self.last_snapshot, 'lineno')[
+                                            :common.PROFILE_MEMORY_TOP_N]]
+            self.last_snapshot = snapshot
+        self.memory.append(record)
+        #
+        return
+
+    def run(self, function):
+        ''' Run the function under cProfile. The statistics are saved even
+        when the function exits the script.
+        return the function's return value
+        '''
+        if tracemalloc is not None:
+            tracemalloc.start()
+        jobstats.STAGE_HOOKS.append(self._snapshot)
+        self._snapshot(self.script_name, 'start')
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(function)
+        finally:
+            self._snapshot(self.script_name, 'end')
+            jobstats.STAGE_HOOKS.remove(self._snapshot)
+            if tracemalloc is not None:
+                tracemalloc.stop()
+            self._write(profile)
+        #
+        return
+
+    def _write(self, profile):
+        ''' Save the raw profile statistics for use with pstats or other
+        viewers and a text summary of the top functions and the memory
+        snapshots. Failing to save them is never fatal.
+        return nothing
+        '''
+        names = dict(self.configuration)
+        names['script'] = self.script_name
+        try:
+            profile.dump_stats(common.PROFILE_STATS_FILE % names)
+            #
+            summary = StringIO()
+            stats = pstats.Stats(profile, stream=summary)
+            stats.sort_stats('cumulative').print_stats(
+                                                    common.PROFILE_TOP_N)
+            stats.sort_stats('time').print_stats(common.PROFILE_TOP_N)
+            #
+            summary.write('Memory at stage boundaries:\n')
+            for record in self.memory:
+                summary.write('  %-16s %-5s max rss %d KB' % (
+                        record['stage'], record['event'],
+                        record['max_rss_kb']))
+                if 'current' in record:
+                    summary.write(', traced %d bytes, peak %d bytes' % (
+                                    record['current'], record['peak']))
+                summary.write('\n')
+                for line in record.get('top_growth', []):
+                    summary.write('      %s\n' % line)
+            #
+            fileh = open(common.PROFILE_SUMMARY_FILE % names, 'w')
+            try:
+                fileh.write(summary.getvalue())
+            finally:
+                fileh.close()
+        except (IOError, OSError):
+            pass
+        #
+        return
+#
+#
+def run_profiled(function, configuration, script_name):
+    ''' Run a script's main processing under the profiler.
+    return the function's return value
+    '''
+    return Profiler(configuration, script_name).run(function)
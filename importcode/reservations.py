@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+# ----------------------
+# Name: reservations.py   Provides the working directory disk space
+#                         reservation ledger used by lossless_cut
+# Python Script
+# Author:   R.D. Vaughan
+# Purpose:  This python script supports the lossless_cut.py.
+#           Jobs started at the same time all see the same free space in
+#           the working directory. Each job records the space it expects
+#           to need in a lock protected ledger file in the working
+#           directory and waits its turn when the space still needed by
+#           the other running jobs leaves too little for it.
+#
+# Copyright (C) 2012 R.D. Vaughan
+# rdvLaunchpad@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# License:Creative Commons GNU GPL v2
+# (https://www.gnu.org/licenses/gpl-2.0.html)
+#-------------------------------------
+#
+"""
+__version__ = '0.1.1'
+# Version change log:
+# 0.1.0 Initial development
+# 0.1.1 The space used by a job is measured in its scratch directory
+#
+## Common function imports
+import os
+import time
+import json
+import fcntl
+import tempfile
+from glob import glob
+from socket import gethostname
+#
+# Indicator specific imports
+import importcode.common as common
+from importcode.utilities import process_alive
+#
+#
+class SpaceReservations(object):
+    """The working directory's ledger of the space each running job
+    expects to need. Reservations of jobs on this host that are no longer
+    running are removed whenever the ledger is read.
+    """
+
+    def __init__(self, workpath, recorded_name):
+        #
+        self.workpath = workpath
+        self.recorded_name = recorded_name
+        self.filename = common.RESERVATION_LEDGER_FILE % {
+                                                    'workpath': workpath}
+        self.key = u'%s:%d' % (gethostname(), os.getpid())
+        self.reserved = False
+        #
+        return    # end __init__()
+
+    def _locked(self, ):
+        ''' Serialize ledger updates between concurrent jobs.
+        return an open lock file handle which releases the lock when closed
+        '''
+        lockh = open(self.filename + u'.lock', 'a')
+        fcntl.flock(lockh.fileno(), fcntl.LOCK_EX)
+        return lockh
+
+    def _read(self, ):
+        ''' Read the ledger and drop the reservations of jobs on this host
+        that have died. A missing or unreadable ledger is empty.
+        return dictionary of reservations keyed by host and process id
+        '''
+        try:
+            fileh = open(self.filename, 'r')
+        except IOError:
+            return {}
+        try:
+            try:
+                entries = json.load(fileh)
+            except ValueError:
+                entries = {}
+        finally:
+            fileh.close()
+        if not isinstance(entries, dict):
+            return {}
+        #
+        hostname = gethostname()
+        for key, entry in entries.items():
+            if entry.get('hostname') == hostname and \
+                    not process_alive(entry.get('pid', 0)):
+                del entries[key]
+        #
+        return entries
+
+    def _write(self, entries):
+        ''' Save the ledger by writing a temporary file in the working
+        directory and renaming it over the old ledger.
+        return nothing
+        '''
+        fileno, temp_filename = tempfile.mkstemp(dir=self.workpath,
+                                    prefix=u'.', suffix=u'.tmp')
+        fileh = os.fdopen(fileno, 'w')
+        try:
+            json.dump(entries, fileh, indent=2, sort_keys=True)
+        finally:
+            fileh.close()
+        os.rename(temp_filename, self.filename)
+        #
+        return
+
+    def _outstanding(self, entry):
+        ''' The part of a job's reservation that its files in the working
+        directory do not use yet. The free space already excludes what
+        the job has written so far. A job's files are in its own scratch
+        directory which is named after the recording.
+        return bytes
+        '''
+        used = 0
+        for path in glob(u'%s/%s*' % (self.workpath,
+                                            entry['recorded_name'])):
+            filenames = [path]
+            if os.path.isdir(path):
+                filenames = [os.path.join(directory, filename)
+                    for directory, dirs, files in os.walk(path)
+                        for filename in files]
+            for filename in filenames:
+                try:
+                    used += os.path.getsize(filename)
+                except OSError:
+                    pass
+        #
+        return max(0, entry['bytes'] - used)
+
+    def try_reserve(self, size):
+        ''' Reserve the space when the free space less the outstanding
+        space of the other jobs' reservations is enough. A job with no
+        other reservations ahead of it is never made to wait as no
+        amount of waiting would free more space for it.
+        return a tuple of (reserved True or False, bytes available)
+        '''
+        stats = os.statvfs(self.workpath)
+        free = stats.f_bsize * stats.f_bavail
+        lockh = self._locked()
+        try:
+            entries = self._read()
+            entries.pop(self.key, None)
+            available = free - sum([self._outstanding(entry)
+                                    for entry in entries.values()])
+            if available > size or not entries:
+                entries[self.key] = {
+                    'hostname': gethostname(),
+                    'pid': os.getpid(),
+                    'recorded_name': self.recorded_name,
+                    'bytes': size,
+                    'time': time.time(),
+                }
+                self._write(entries)
+                self.reserved = True
+            else:
+                self._write(entries)
+        finally:
+            lockh.close()
+        #
+        return self.reserved, available
+
+    def release(self, ):
+        ''' Remove this job's reservation. Failing to update the ledger is
+        never fatal as the reservation is dropped once the job has ended.
+        return nothing
+        '''
+        if not self.reserved:
+            return
+        self.reserved = False
+        try:
+            lockh = self._locked()
+        except (IOError, OSError):
+            return
+        try:
+            entries = self._read()
+            if entries.pop(self.key, None) is not None:
+                self._write(entries)
+        except (IOError, OSError):
+            pass
+        finally:
+            lockh.close()
+        #
+        return
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+# ----------------------
+# Name: segmentcache.py   Provides the cut segment cache used by
+#                         lossless_cut to re-cut only changed segments
+# Python Script
+# Author:   R.D. Vaughan
+# Purpose:  This python script supports the lossless_cut.py.
+#           Each cut segment file is kept in the "segment_cache"
+#           directory of the working directory keyed by the recording,
+#           the segment's start and end keyframes and the cut settings.
+#           When a recording is cut again after a change to its cut list
+#           only the segments whose boundaries changed are cut again, the
+#           others are reused in the merge.
+#
+# Copyright (C) 2012 R.D. Vaughan
+# rdvLaunchpad@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# License:Creative Commons GNU GPL v2
+# (https://www.gnu.org/licenses/gpl-2.0.html)
+#-------------------------------------
+#
+"""
+__version__ = '0.1.1'
+# Version change log:
+# 0.1.0 Initial development
+# 0.1.1 A followed recording is identified by its first bytes
+#       Added the "segment_cache_megabytes" size limit
+#
+## Common function imports
+import os
+import time
+import json
+import hashlib
+from glob import glob
+#
+# Indicator specific imports
+import importcode.common as common
+from importcode.utilities import create_cachedir
+#
+#
+def segment_cache_bytes(configuration):
+    ''' The space used by the files in the segment cache.
+    return bytes
+    '''
+    size = 0
+    for filename in glob(u'%s/*' % (common.SEGMENT_CACHE_DIR % configuration)):
+        try:
+            size += os.path.getsize(filename)
+        except OSError:
+            pass
+    #
+    return size
+#
+#
+class SegmentCache(object):
+    """The cache of a recording's cut segment files. Segments are shared
+    with the job's scratch directory through hard links so a cached
+    segment takes no extra space while the job that cut it runs. Segments
+    not used for the "segment_cache_hours" performance setting are
+    removed and the least recently used segments are removed once the
+    cache is larger than the "segment_cache_megabytes" setting.
+    """
+
+    def __init__(self, configuration):
+        #
+        self.cachepath = common.SEGMENT_CACHE_DIR % configuration
+        self.recorded_name = configuration['recorded_name']
+        self.seconds = configuration['segment_cache_hours'] * 3600
+        self.max_bytes = configuration['segment_cache_megabytes'] * \
+                                                            1024 * 1024
+        self.enabled = self.seconds > 0
+        ## The recording, whether subtitles were remuxed into the copy that
+        ## is cut and the mkvmerge cut settings identify a segment's source
+        self.source = [
+            configuration['recordedfile'],
+            os.path.getsize(configuration['recordedfile']),
+            os.path.getmtime(configuration['recordedfile']),
+            configuration['sourcefile'] != configuration['recordedfile'],
+            configuration['strip_args'],
+            configuration['mkvmerge_cut_addon'],
+        ]
+        ## A followed recording grows while its segments are cut. Its
+        ## first bytes identify it instead as they never change.
+        if configuration['follow']:
+            fileh = open(configuration['recordedfile'], 'rb')
+            try:
+                self.source[1:3] = [hashlib.sha1(fileh.read(
+                            common.MANIFEST_SAMPLE_BYTES)).hexdigest()]
+            finally:
+                fileh.close()
+        if self.enabled:
+            try:
+                create_cachedir(self.cachepath)
+            except OSError:
+                self.enabled = False
+        #
+        return    # end __init__()
+
+    def _filename(self, cut):
+        ''' The cache file name of the segment between two keyframes.
+        return a file name
+        '''
+        key = hashlib.sha1(json.dumps(self.source + [cut[0], cut[1]])
+                                        ).hexdigest()
+        return common.SEGMENT_CACHE_FILE % {
+            'segment_cache': self.cachepath,
+            'recorded_name': self.recorded_name,
+            'key': key, }
+
+    def expire(self, ):
+        ''' Remove the cached segments of every recording that were not
+        used within the cache period then the least recently used
+        segments until the cache fits its size limit.
+        return nothing
+        '''
+        if not self.enabled:
+            return
+        oldest = time.time() - self.seconds
+        entries = []
+        for filename in glob(u'%s/*' % self.cachepath):
+            try:
+                status = os.stat(filename)
+                if status.st_mtime < oldest:
+                    os.remove(filename)
+                else:
+                    entries.append((status.st_mtime, status.st_size,
+                                    filename))
+            except OSError:
+                pass
+        #
+        if self.max_bytes > 0:
+            size = sum([entry[1] for entry in entries])
+            for mtime, filesize, filename in sorted(entries):
+                if size <= self.max_bytes:
+                    break
+                try:
+                    os.remove(filename)
+                except OSError:
+                    continue
+                size -= filesize
+        #
+        return
+
+    def fetch(self, cut, filename):
+        ''' Link a cached segment into the working directory and mark it
+        as used.
+        return True when the segment was cached otherwise False
+        '''
+        if not self.enabled:
+            return False
+        cached = self._filename(cut)
+        try:
+            os.link(cached, filename)
+            os.utime(cached, None)
+        except OSError:
+            return False
+        #
+        return True
+
+    def store(self, cut, filename):
+        ''' Add a newly cut segment to the cache. A file system without
+        hard links just leaves the segment uncached.
+        return nothing
+        '''
+        if not self.enabled:
+            return
+        cached = self._filename(cut)
+        temp_filename = u'%s.%d.tmp' % (cached, os.getpid())
+        try:
+            os.link(filename, temp_filename)
+            os.rename(temp_filename, cached)
+        except OSError:
+            try:
+                os.remove(temp_filename)
+            except OSError:
+                pass
+        #
+        return
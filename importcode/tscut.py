@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+# ----------------------
+# Name: tscut.py   Provides the byte range copy used by the lossless_cut
+#                  transport stream cut "-R" option
+# Python Script
+# Author:   R.D. Vaughan
+# Purpose:  This python script supports the lossless_cut.py.
+#           A transport stream cut copies the kept keyframe aligned byte
+#           ranges of a recording into a new transport stream without
+#           demuxing. Each range is preceded by the program tables in
+#           effect at its start. The ranges are copied inside the kernel
+#           with copy_file_range or sendfile when the C library has them
+#           and otherwise read and written in blocks.
+#
+# Copyright (C) 2012 R.D. Vaughan
+# rdvLaunchpad@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# License:Creative Commons GNU GPL v2
+# (https://www.gnu.org/licenses/gpl-2.0.html)
+#-------------------------------------
+#
+"""
+__version__ = '0.1.0'
+# Version change log:
+# 0.1.0 Initial development
+#
+## Common function imports
+import os
+import errno
+import ctypes
+import ctypes.util
+#
+# Indicator specific imports
+import importcode.common as common
+#
+#
+def _kernel_copy_calls():
+    ''' Find the C library system calls which copy between two files
+    inside the kernel. Older C libraries have no copy_file_range and
+    copy_file_range cannot copy between file systems on older kernels so
+    sendfile is tried next.
+    return a list of functions taking (input fd, output fd, input
+    position, byte count) which return the bytes copied or -1
+    '''
+    calls = []
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    except (OSError, TypeError):
+        return calls
+    #
+    try:
+        copy_file_range = libc.copy_file_range
+    except AttributeError:
+        pass
+    else:
+        copy_file_range.restype = ctypes.c_ssize_t
+        copy_file_range.argtypes = [ctypes.c_int,
+                ctypes.POINTER(ctypes.c_int64), ctypes.c_int,
+                ctypes.POINTER(ctypes.c_int64), ctypes.c_size_t,
+                ctypes.c_uint]
+        calls.append(lambda infd, outfd, position, count:
+                copy_file_range(infd, ctypes.byref(position), outfd, None,
+                                count, 0))
+    #
+    try:
+        sendfile = libc.sendfile64
+    except AttributeError:
+        pass
+    else:
+        sendfile.restype = ctypes.c_ssize_t
+        sendfile.argtypes = [ctypes.c_int, ctypes.c_int,
+                ctypes.POINTER(ctypes.c_int64), ctypes.c_size_t]
+        calls.append(lambda infd, outfd, position, count:
+                sendfile(outfd, infd, ctypes.byref(position), count))
+    #
+    return calls
+#
+KERNEL_COPY_CALLS = _kernel_copy_calls()
+#
+def _write(outfd, data):
+    ''' Write all of a string to a file descriptor.
+    return nothing
+    '''
+    while data:
+        data = data[os.write(outfd, data):]
+    #
+    return
+#
+def _copy_range(infd, outfd, offset, length):
+    ''' Copy a byte range of the input file to the output file's current
+    position. Whatever the kernel system calls cannot copy is read and
+    written in blocks.
+    return nothing
+    '''
+    end = offset + length
+    position = ctypes.c_int64(offset)
+    for call in KERNEL_COPY_CALLS:
+        while position.value < end:
+            count = call(infd, outfd, position, min(end - position.value,
+                                            common.TS_CUT_COPY_BYTES))
+            if count < 0 and ctypes.get_errno() == errno.EINTR:
+                continue
+            if count <= 0:
+                break
+        if position.value >= end:
+            return
+    #
+    offset = position.value
+    os.lseek(infd, offset, os.SEEK_SET)
+    while offset < end:
+        data = os.read(infd, min(end - offset, common.TS_CUT_BLOCK_BYTES))
+        if not data:
+            raise IOError(errno.EIO,
+                    u'The recording ended before byte offset %d' % end)
+        _write(outfd, data)
+        offset += len(data)
+    #
+    return
+#
+def copy_ranges(filename, output, ranges):
+    ''' Make a transport stream from byte ranges of a recording. Each range
+    is preceded by its program table packets.
+    The ranges are the (start, end, table packets) tuples from
+    tsscan.cut_ranges.
+    return the number of bytes written
+    '''
+    written = 0
+    infd = os.open(filename, os.O_RDONLY)
+    try:
+        outfd = os.open(output, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                        0644)
+        try:
+            for start, end, tables in ranges:
+                _write(outfd, tables)
+                _copy_range(infd, outfd, start, end - start)
+                written += len(tables) + end - start
+        finally:
+            os.close(outfd)
+    finally:
+        os.close(infd)
+    #
+    return written
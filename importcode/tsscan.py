@@ -0,0 +1,385 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+# ----------------------
+# Name: tsscan.py   Provides the MPEG transport stream keyframe scan used
+#                   when a recording's recordedseek table is unusable
+# Python Script
+# Author:   R.D. Vaughan
+# Purpose:  This python script supports the lossless_cut.py and
+#           keyframe_adjust.py scripts.
+#           Some recordings have no recordedseek table keyframe records or
+#           damaged ones and otherwise need a "mythcommflag --rebuild".
+#           The recording file is memory mapped and its 188 byte packets
+#           are walked in batches to find the start of each picture on the
+#           video stream. The pictures that can be decoded on their own
+#           make a keyframe index of frame numbers and byte offsets that is
+#           used in place of the recordedseek table.
+#           The byte ranges copied by a transport stream cut are aligned
+#           to packets and the program tables in effect at the start of
+#           each range are found for the joins.
+#
+# Copyright (C) 2012 R.D. Vaughan
+# rdvLaunchpad@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# License:Creative Commons GNU GPL v2
+# (https://www.gnu.org/licenses/gpl-2.0.html)
+#-------------------------------------
+#
+"""
+__version__ = '0.1.1'
+# Version change log:
+# 0.1.0 Initial development
+# 0.1.1 Added the transport stream cut byte range alignment and the
+#       program table look up for the joins
+#
+## Common function imports
+import os
+import mmap
+#
+# Indicator specific imports
+import importcode.common as common
+#
+#
+def _find_sync(tsmap, start, end=None):
+    ''' Find the first packet boundary at or after a byte offset and
+    before an optional end offset. A boundary is three sync bytes one
+    packet apart.
+    return the byte offset or None
+    '''
+    size = len(tsmap)
+    if end is None:
+        end = size
+    packet = common.TS_PACKET_SIZE
+    offset = tsmap.find(common.TS_SYNC_BYTE, start)
+    while offset != -1 and offset < end and offset + 2 * packet < size:
+        if tsmap[offset + packet] == common.TS_SYNC_BYTE and \
+                tsmap[offset + 2 * packet] == common.TS_SYNC_BYTE:
+            return offset
+        offset = tsmap.find(common.TS_SYNC_BYTE, offset + 1)
+    #
+    return None
+#
+def _packet_pid(packet):
+    ''' A packet's PID and whether a PES packet or table section starts in
+    it. Packets flagged with transport errors have no PID.
+    return a tuple of (PID or None, payload unit start)
+    '''
+    if ord(packet[1]) & 0x80:
+        return None, False
+    return (ord(packet[1]) & 0x1f) << 8 | ord(packet[2]), \
+                                                bool(ord(packet[1]) & 0x40)
+#
+def _payload_start(packet):
+    ''' The offset of a packet's payload after any adaptation field.
+    return the offset or None when the packet has no payload
+    '''
+    control = ord(packet[3]) >> 4 & 0x03
+    if not control & 0x01:
+        return None
+    start = 4
+    if control & 0x02:
+        start += 1 + ord(packet[4])
+    if start >= common.TS_PACKET_SIZE:
+        return None
+    #
+    return start
+#
+def _random_access(packet):
+    ''' Check a packet's adaptation field random access indicator.
+    return True or False
+    '''
+    return bool(ord(packet[3]) & 0x20 and ord(packet[4]) and
+                                            ord(packet[5]) & 0x40)
+#
+def _section(packet, start):
+    ''' The table section which starts in a packet's payload. Only the part
+    of the section in this packet is returned, which holds the whole of
+    the program tables of nearly every recording.
+    return the section bytes
+    '''
+    start += 1 + ord(packet[start])
+    length = (ord(packet[start + 1]) & 0x0f) << 8 | ord(packet[start + 2])
+    #
+    return packet[start:start + 3 + length]
+#
+def _program_map_pids(section):
+    ''' The PIDs of the program map tables listed in a program
+    association table section. The network information table is skipped.
+    return a list of PIDs
+    '''
+    return [(ord(section[index + 2]) & 0x1f) << 8 | ord(section[index + 3])
+                for index in range(8, len(section) - 4 - 3, 4)
+                if section[index:index + 2] != '\x00\x00']
+#
+def _find_video_stream(tsmap, sync):
+    ''' Read the program association and program map tables at the start
+    of the recording to find the first video stream. When there are no
+    tables the first PID carrying a video PES packet is used.
+    return a tuple of (PID, stream type name, PES stream id) or None
+    '''
+    packet_size = common.TS_PACKET_SIZE
+    end = min(len(tsmap), sync + common.TS_PROGRAM_SCAN_BYTES)
+    program_pids = set()
+    video = None
+    first_pes = None
+    for offset in xrange(sync, end - packet_size + 1, packet_size):
+        packet = tsmap[offset:offset + packet_size]
+        if packet[0] != common.TS_SYNC_BYTE:
+            continue
+        pid, unit_start = _packet_pid(packet)
+        start = _payload_start(packet)
+        if not unit_start or start is None:
+            continue
+        try:
+            if pid == 0:
+                program_pids.update(
+                                _program_map_pids(_section(packet, start)))
+            elif pid in program_pids and video is None:
+                section = _section(packet, start)
+                if section[0] != '\x02':
+                    continue
+                index = 12 + ((ord(section[10]) & 0x0f) << 8 |
+                                                    ord(section[11]))
+                while index + 5 <= len(section) - 4:
+                    stream_type = ord(section[index])
+                    if stream_type in common.TS_VIDEO_STREAM_TYPES:
+                        video = ((ord(section[index + 1]) & 0x1f) << 8 |
+                                 ord(section[index + 2]),
+                                 common.TS_VIDEO_STREAM_TYPES[stream_type])
+                        break
+                    index += 5 + ((ord(section[index + 3]) & 0x0f) << 8 |
+                                  ord(section[index + 4]))
+            elif packet[start:start + 3] == '\x00\x00\x01' and \
+                    0xe0 <= ord(packet[start + 3]) <= 0xef:
+                if video is not None and pid == video[0]:
+                    return video + (packet[start + 3], )
+                if first_pes is None:
+                    first_pes = (pid, None, packet[start + 3])
+        except IndexError:
+            ## A table section cut short by a damaged packet
+            continue
+    #
+    return first_pes
+#
+def _keyframe_picture(data, stream_type):
+    ''' Check the start of a picture's elementary stream data for the
+    headers that begin a picture which can be decoded on its own.
+    return True or False
+    '''
+    index = data.find('\x00\x00\x01')
+    while index != -1 and index + 6 <= len(data):
+        code = ord(data[index + 3])
+        if stream_type == 'h264':
+            ## Sequence parameter set or IDR slice
+            if code & 0x1f in (5, 7):
+                return True
+        elif stream_type == 'hevc':
+            ## Random access point slices and parameter sets
+            if 16 <= code >> 1 & 0x3f <= 21 or code >> 1 & 0x3f == 33:
+                return True
+        else:
+            ## Sequence or group of pictures header or an I picture
+            if code in (0xb3, 0xb8):
+                return True
+            if code == 0x00:
+                return ord(data[index + 5]) >> 3 & 0x07 == 1
+        index = data.find('\x00\x00\x01', index + 3)
+    #
+    return False
+#
+def _open_map(filename):
+    ''' Memory map a recording that is long enough to hold a few packets.
+    return the memory map or None
+    '''
+    fileh = open(filename, 'rb')
+    try:
+        if os.fstat(fileh.fileno()).st_size < 3 * common.TS_PACKET_SIZE:
+            return None
+        return mmap.mmap(fileh.fileno(), 0, access=mmap.ACCESS_READ)
+    finally:
+        fileh.close()
+#
+def scan_keyframes(filename):
+    ''' Find the keyframes of a recording's video stream. Each PES packet
+    on the video PID starts a new frame. A frame is a keyframe when its
+    packet has the random access indicator set or its picture starts with
+    a sequence, group of pictures, IDR or random access point header.
+    Only the PES start codes of the video stream are searched for in each
+    batch of packets so the bytes in between are never walked in Python.
+    return a list of (frame number, byte offset) tuples in frame order
+    '''
+    packet_size = common.TS_PACKET_SIZE
+    batch_size = packet_size * common.TS_SCAN_BATCH_PACKETS
+    keyframes = []
+    tsmap = _open_map(filename)
+    if tsmap is None:
+        return keyframes
+    try:
+        sync = _find_sync(tsmap, 0)
+        if sync is None:
+            return keyframes
+        video = _find_video_stream(tsmap, sync)
+        if video is None:
+            return keyframes
+        video_pid, stream_type, stream_id = video
+        start_code = '\x00\x00\x01' + stream_id
+        #
+        frame = 0
+        offset = sync
+        size = len(tsmap)
+        while offset is not None and offset + packet_size <= size:
+            ## Find the packet boundaries again after damaged data
+            if tsmap[offset] != common.TS_SYNC_BYTE or \
+                    offset + packet_size < size and \
+                    tsmap[offset + packet_size] != common.TS_SYNC_BYTE:
+                offset = _find_sync(tsmap, offset)
+                continue
+            batch_end = min(size, offset + batch_size)
+            batch_end -= (batch_end - offset) % packet_size
+            batch = tsmap[offset:batch_end]
+            ## End the batch before the packet followed by the first lost
+            ## sync byte as damaged data can start with a sync byte
+            syncs = batch[::packet_size]
+            synced = len(syncs) - len(syncs.lstrip(common.TS_SYNC_BYTE))
+            if synced < len(syncs):
+                synced -= 1
+                batch_end = offset + synced * packet_size
+                batch = batch[:synced * packet_size]
+            index = batch.find(start_code)
+            while index != -1:
+                packet_start = index - index % packet_size
+                packet = batch[packet_start:packet_start + packet_size]
+                pid, unit_start = _packet_pid(packet)
+                if unit_start and pid == video_pid and \
+                        packet[0] == common.TS_SYNC_BYTE and \
+                        _payload_start(packet) == index - packet_start:
+                    payload = packet[index - packet_start:]
+                    if _random_access(packet) or _keyframe_picture(
+                            payload[9 + ord(payload[8:9] or '\x00'):],
+                            stream_type):
+                        keyframes.append((frame, offset + packet_start))
+                    frame += 1
+                    index = batch.find(start_code,
+                                       packet_start + packet_size)
+                else:
+                    index = batch.find(start_code, index + 1)
+            offset = batch_end
+    finally:
+        tsmap.close()
+    #
+    return keyframes
+#
+def transport_stream_sync(filename):
+    ''' Check that a recording is an MPEG transport stream by finding its
+    first packet boundary near the start of the file.
+    return the byte offset of the first packet or None
+    '''
+    tsmap = _open_map(filename)
+    if tsmap is None:
+        return None
+    try:
+        return _find_sync(tsmap, 0, common.TS_PROGRAM_SCAN_BYTES)
+    finally:
+        tsmap.close()
+#
+def _table_packet(tsmap, pid, offset, table_id):
+    ''' Find the last packet on a PID before a byte offset that starts a
+    section of a table, or failing that the first one after it. Only the
+    program scan bytes either side of the offset are searched.
+    return the packet or None
+    '''
+    packet_size = common.TS_PACKET_SIZE
+    size = len(tsmap)
+    header = common.TS_SYNC_BYTE + chr(0x40 | pid >> 8) + chr(pid & 0xff)
+    #
+    def table(index):
+        ''' The packet at a match of the header when it is a whole packet
+        starting a section of the table.
+        return the packet or None
+        '''
+        if index + packet_size > size or index + packet_size < size and \
+                tsmap[index + packet_size] != common.TS_SYNC_BYTE:
+            return None
+        packet = tsmap[index:index + packet_size]
+        start = _payload_start(packet)
+        if start is None:
+            return None
+        try:
+            if _section(packet, start)[0] == table_id:
+                return packet
+        except IndexError:
+            pass
+        return None
+    #
+    start = max(0, offset - common.TS_PROGRAM_SCAN_BYTES)
+    index = tsmap.rfind(header, start, offset)
+    while index != -1:
+        packet = table(index)
+        if packet is not None:
+            return packet
+        index = tsmap.rfind(header, start, index)
+    #
+    end = min(size, offset + common.TS_PROGRAM_SCAN_BYTES)
+    index = tsmap.find(header, offset, end)
+    while index != -1:
+        packet = table(index)
+        if packet is not None:
+            return packet
+        index = tsmap.find(header, index + 1, end)
+    #
+    return None
+#
+def cut_ranges(filename, ranges):
+    ''' Align the start and end of each byte range to be copied from a
+    recording to its packets and find the program association and program
+    map table packets in effect at each range start. A player starting at
+    a join needs these tables before it can find the video and audio
+    streams. Ranges which meet once aligned are joined.
+    return a list of (start, end, table packets) tuples
+    '''
+    packet_size = common.TS_PACKET_SIZE
+    aligned = []
+    tsmap = _open_map(filename)
+    if tsmap is None:
+        return aligned
+    try:
+        sync = _find_sync(tsmap, 0, common.TS_PROGRAM_SCAN_BYTES)
+        if sync is None:
+            return aligned
+        ## A packet cut short at the end of the recording is left out
+        last = len(tsmap) - (len(tsmap) - sync) % packet_size
+        for start, end in ranges:
+            start, end = [min(last, max(sync,
+                                offset - (offset - sync) % packet_size))
+                            for offset in (start, end)]
+            if start >= end:
+                continue
+            if aligned and start <= aligned[-1][1]:
+                aligned[-1] = (aligned[-1][0], max(end, aligned[-1][1]),
+                               aligned[-1][2])
+                continue
+            tables = ''
+            association = _table_packet(tsmap, 0, start, '\x00')
+            if association is not None:
+                tables = association
+                for pid in _program_map_pids(_section(association,
+                                        _payload_start(association))):
+                    program_map = _table_packet(tsmap, pid, start, '\x02')
+                    if program_map is not None:
+                        tables += program_map
+            aligned.append((start, end, tables))
+    finally:
+        tsmap.close()
+    #
+    return aligned
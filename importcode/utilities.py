@@ -28,7 +28,7 @@
 #-------------------------------------
 #
 """
-__version__ = '0.1.6'
+__version__ = '0.1.7'
 # Version change log:
 # 0.1.0 Initial development
 # 0.1.1 Alpha release
@@ -58,6 +58,28 @@ __version__ = '0.1.6'
 #       converting hours into seconds
 # 0.1.6 Handle abort when mediainfo cannot find a video's duration. The issue
 #       is likely caused by a corrupt recording.
+# 0.1.7 Added support for the new configuration section "performance"
+#       Added the grabber metadata and artwork cache settings
+#       The ISO639-2 language codes are now read from a precompiled index
+#       with exact name, alternate name and two or three letter code look ups
+#       A language name prefix or part of a name still finds its ISO639-2
+#       code when no exact name matches
+#       Added the optional error detection rule "stage" argument
+#       The working directory disk space check moved to the lossless_cut
+#       preflight stage
+#       Record the resource usage of every external command line run
+#       Split the mediainfo XML parsing and the cut timestamp list building
+#       into their own functions so they can be benchmarked
+#       Each lossless_cut job works in its own scratch directory which is
+#       removed as a unit. Directories left by jobs that died are swept.
+#       A rerun of a recording takes over the scratch directory of the job
+#       for the same recording that died so its stages can be resumed.
+#       A scratch directory with finished stages is kept until it expires
+#       and the working directory clean up leaves those stages' files.
+#       The mkvmerge cut and merge arguments are passed in option files
+#       A JSON mkvmerge option file is given the ".json" extension
+#       Added support for OPTS.tscut
+#       Added support for OPTS.follow
 #
 #
 ## Common function imports
@@ -67,6 +89,14 @@ import subprocess
 import locale
 import logging
 import string
+import re
+import time
+import tempfile
+import shutil
+import json
+import errno
+from socket import gethostname
+from pickle import load, dump
 from glob import glob
 from datetime import datetime, timedelta
 # Used for multilanguage support
@@ -74,6 +104,8 @@ import gettext
 #
 # Indicator specific imports
 import importcode.common as common
+import importcode.jobstats as jobstats
+from importcode.manifest import recorded_outputs
 #import common
 #
 ## Local variables
@@ -148,10 +180,13 @@ def create_logger(log_file, log_name=u"lossless_cut", filename=False):
 
 def exec_commandline(command):
     """Execute a command line and read the STDIO and STDERR results.
+    The tool's resource usage is recorded in the job statistics.
     return None if the command line failed
     return array of the stdout and stderr results
     """
     results = [u'', u'']
+    started = time.time()
+    stage = jobstats.current_stage()
 
     try:
         process = subprocess.Popen(command, shell=True,
@@ -173,9 +208,37 @@ def exec_commandline(command):
     except (UnicodeEncodeError, TypeError):
         pass
 
+    rusage = reap_process(process)
+    jobstats.record_tool_run(command, process.returncode,
+                                time.time() - started, rusage, stage)
+
     return results
  # end exec_commandline()
 
+def reap_process(process, wait=True):
+    """ Wait for a child process with os.wait4 so its resource usage is
+    collected. Sets the process's returncode when it has finished.
+    return the resource usage or None when the process is still running
+    or was already reaped
+    """
+    if process.returncode is not None:
+        return None
+    try:
+        if wait:
+            pid, status, rusage = os.wait4(process.pid, 0)
+        else:
+            pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+    except OSError:
+        return None
+    if not pid:
+        return None
+    if os.WIFSIGNALED(status):
+        process.returncode = -os.WTERMSIG(status)
+    else:
+        process.returncode = os.WEXITSTATUS(status)
+    return rusage
+ # end reap_process()
+
 def create_cachedir(full_path):
     """ Check if a directory exists and create it if
     it does not exist.
@@ -237,9 +300,6 @@ The directory path "%s" does not exist.
     err_read_write = _(
 u'''The script does not have read and write permissions for the "%s" variables
 path: "%s"''')
-    err_working_diskspace = _(
-u'''There is not enough available disk space in the working directory "%s" available "%s" bytes
-to loss less cut recording "%s", size "%s" bytes.''')
     err_missing_subtitle_args = _(
 u'''The "%%s" subtitle utility arguments variable is missing from the
 configuration file "%s".''') % common.CONFIG_FILE
@@ -252,6 +312,13 @@ or a "-m" move option. Replace "-r" is not valid.''')
     err_concert_cuts_2 = _(
 u'''The Concert Cuts option "-C" configuration file
 "%s" does not exist.''')
+    err_tscut = _(
+u'''The transport stream cut option "-R" must be accompanied with either a
+"-r" replace or a "-m" move option. The "-C", "-D", "-e" and "-S" options
+are not valid as the recording is not demuxed.''')
+    err_follow = _(
+u'''The follow option "-F" cuts segments into the segment cache and is not
+valid with the "-C" Concert Cuts or "-R" transport stream cut options.''')
     err_invalid_sequence_number  = _(
 u'''The value for the configuration file variable "%s" must end with
 a valid integer in the format "delete_rec_01".
@@ -266,6 +333,9 @@ You have the following "error_detection" configuration variables active:
 u'''The job ID -j "%%JOBID%%" command line argument must be an integer.
 Your invalid JobID is "%s".
 ''')
+    err_integer = _(
+u'''The value for the configuration file variable "%s" is invalid.
+It must be an integer.''')
     err_invalid_detection_values = _(
 u'''The error detection variable "%s" with configuration arguments:
 %s
@@ -293,6 +363,12 @@ configuration file documentation for the "error_detection" section.
         configuration[key] = common.DEFAULT_CONFIG_SETTINGS[
                                     'dvb_subtitle_defaults'][key]
     #
+    ## Initialize the default performance settings
+    for key in common.DEFAULT_CONFIG_SETTINGS[
+                                    'performance_defaults'].keys():
+        configuration[key] = common.DEFAULT_CONFIG_SETTINGS[
+                                    'performance_defaults'][key]
+    #
     cfg = ConfigParser.RawConfigParser()
     cfg.read(common.CONFIG_FILE)
     #
@@ -322,6 +398,12 @@ configuration file documentation for the "error_detection" section.
         add_new_cfg_section(configuration,
                     common.INIT_ERROR_DETECTION_CONFIG_FILE, cfg)
     #
+    ## Check if this config file is old and does not have a
+    ## "performance" section. Add the default one if it is missing.
+    if "performance" not in cfg.sections():
+        add_new_cfg_section(configuration,
+                    common.INIT_PERFORMANCE_CONFIG_FILE, cfg)
+    #
     for section in cfg.sections():
         if section[:5] == 'File ':
             configuration['config_file'] = section[5:]
@@ -593,7 +675,8 @@ configuration file documentation for the "error_detection" section.
                                                 option)
                 continue
         if section == 'error_detection':
-            keys = ['type', 'threshold', 'bash_command', 'comment_string' ]
+            keys = ['type', 'threshold', 'bash_command', 'comment_string',
+                    'stage', ]
             for option in cfg.options(section):
                 try:
                     error_args_dict = {}
@@ -608,9 +691,9 @@ configuration file documentation for the "error_detection" section.
                     if not error_args[-1]:
                         del(error_args[-1])
                     #
-                    if len(error_args) > 4:
+                    if len(error_args) > 5:
                         raise Exception(
-_(u'''"%s" has too many arguments "%s" detected, there can only be four.
+_(u'''"%s" has too many arguments "%s" detected, there can only be five.
 Arguments: %s
 Resulting argument list: %s''') % (option, len(error_args),
                                     original_args, error_args))
@@ -636,6 +719,14 @@ _(u' Threshold value "%s" must be an integer.') %
                         raise Exception(
 _(u' A bash command must be provided.'))
                     #
+                    ## The optional fifth argument is when the rule runs
+                    if not error_args_dict['stage']:
+                        error_args_dict['stage'] = u'output'
+                    if not error_args_dict['stage'] in ['source', 'output']:
+                        raise Exception(
+_(u' Invalid stage "%s" must be "source" or "output"') %
+                            error_args_dict['stage'])
+                    #
                     #
                     ## Verify that each variable has a valid argument
                     for key in keys:
@@ -651,6 +742,42 @@ _(u' A bash command must be provided.'))
                     error_message += u'\n\n%s' % errmsg
                     raise Exception(error_message)
                 continue
+        if section == 'performance':
+            for option in cfg.options(section):
+                if option in common.PERFORMANCE_INTEGER_OPTIONS:
+                    try:
+                        configuration[option] = cfg.getint(section, option)
+                    except ValueError:
+                        raise Exception(err_integer % option)
+                    continue
+                try:
+                    configuration[option] = unicode(
+                                        cfg.get(section, option), 'utf8')
+                except Exception:
+                    raise Exception(err_invalid_variable %
+                                                option)
+                continue
+    #
+    ## Make sure integer performance settings are integers even when
+    ## the defaults were used
+    for option in common.PERFORMANCE_INTEGER_OPTIONS:
+        try:
+            configuration[option] = int(configuration[option])
+        except ValueError:
+            raise Exception(err_integer % option)
+    #
+    ## Expand the "~" in the cache directory path and create it when
+    ## missing. A cache directory that cannot be created just disables
+    ## the disk caches.
+    if configuration['cachepath'][:1] == '~':
+        configuration['cachepath'] = os.path.expanduser(
+                                    "~") + configuration['cachepath'][1:]
+    try:
+        create_cachedir(configuration['cachepath'])
+    except OSError:
+        for option in common.PERFORMANCE_INTEGER_OPTIONS:
+            if option.endswith('_cache_hours'):
+                configuration[option] = 0
     #
     ## Change any configuration settings as dictated
     ## by the command line options
@@ -695,6 +822,19 @@ _(u' A bash command must be provided.'))
             else:
                 process_concert_cuts_cfg(opts.concertcuts, configuration)
         #
+        ## Check if the transport stream cut option is being used
+        configuration['tscut'] = opts.tscut
+        if opts.tscut:
+            if not (opts.replace_recorded or opts.movepath) or \
+                    opts.concertcuts or opts.delayvideo or \
+                    opts.mythvideo_export or opts.noextratracks:
+                raise Exception(err_tscut)
+        #
+        ## Check if the follow option is being used
+        configuration['follow'] = opts.follow
+        if opts.follow and (opts.concertcuts or opts.tscut):
+            raise Exception(err_follow)
+        #
         if opts.addmetadata:
             configuration['add_metadata'] = False
         configuration['movepath'] = u''
@@ -809,18 +949,6 @@ _(u' A bash command must be provided.'))
     except OSError:
         pass
     #
-    # Verify that there is enough disk space in the working drive
-    # to perform the edits
-    if not keyframe_adjust and not ll_report and not load_db:
-        stats = os.statvfs(configuration['workpath'])
-        available = stats.f_bsize * stats.f_bavail
-        filesize = os.path.getsize(configuration['recordedfile'])
-        if not available > filesize:
-            raise Exception(err_working_diskspace % (
-                                configuration['workpath'],
-                                available, configuration['recordedfile'],
-                                filesize))
-    #
     ## Add the MythTV v0.25+ built in subtitle extractor for
     configuration['mythccextractor_args'] = common.MYTHCCEXTRACTOR_ARGS
     #
@@ -1109,6 +1237,12 @@ OR for the Sun Java runtime:
             results[1][index+2:index+5], common.MKVTOOLNIX_DOWNLOADS_URL,
                                     common.MKVTOOLNIX_SOURCE_URL))
     #
+    ## Newer versions read their option files as a JSON array
+    version = re.search(r' v(\d+)\.(\d+)', results[1])
+    configuration['mkvmerge_json_options'] = bool(version) and \
+        tuple([int(number) for number in version.groups()]) >= \
+                                    common.MKVMERGE_JSON_OPTIONS_VERSION
+    #
     ## Check for mediainfo
     results = commandline_call('which', common.MEDIAINFO)
     if not results[0]:
@@ -1172,71 +1306,202 @@ OR for the Sun Java runtime:
     #
     return mythutil
 #
-def read_iso_language_codes(logger=False):
+def _normalize_language_name(name):
+    ''' Lowercase a language name and remove any bracketed qualifier
+    e.g. "English (US)" becomes "english".
+    return a normalized language name
+    '''
+    return u' '.join(
+        re.sub(u'\\([^)]*\\)', u' ', name.lower()).split()).strip(u' ,')
+#
+def _language_name_prefixes(name):
+    ''' The shorter forms a language name is also known by, the part
+    before the first comma and the first word e.g. "Greek, Modern (1453-)"
+    gives "greek, modern" and "greek".
+    return a list of language name prefixes
+    '''
+    name = _normalize_language_name(name)
+    prefixes = []
+    for prefix in [name.split(u',')[0].strip(), name.split()[0].strip(u',')]:
+        if prefix and prefix != name and prefix not in prefixes:
+            prefixes.append(prefix)
+    #
+    return prefixes
+#
+def _build_iso_language_index():
     ''' Read in a text file of ISO639-2 language codes and convert into
-    a dictionary.
+    dictionaries for each type of look up. The first entry in the file
+    wins when a name or code is used by more than one language. A name
+    prefix shared by several languages goes to the first language that
+    also has a two letter code e.g. "Greek" is Modern rather than Ancient
+    Greek.
     Source: http://loc.gov/standards/iso639-2/ISO-639-2_utf-8.txt
-    return dictionary of ISO639-2 language codes
+    return dictionary of ISO639-2 language code look up dictionaries
     '''
-    lang_codes = {}
-    if not os.path.isfile(common.ISO639_2_LANG_CODE_FILE):
-        return lang_codes
+    lang_index = {'updated': u'', 'count': 0, 'codes': {}, 'two_letter': {},
+                  'names': {}, 'alternates': {}, 'french': {},
+                  'normalized': {}, 'prefixes': {}, 'match_text': [], }
+    prefixes = []
     #
     fileh = open(common.ISO639_2_LANG_CODE_FILE, 'r')
     lang_text_list = unicode(fileh.read(), 'utf8').split(u'\n')
     fileh.close()
     #
-    for count in range(len(lang_text_list[:-1])):
-        if lang_text_list[count].find(u'|') == -1:
-            if logger:
-                # Show count one less as the first line should be the download
-                # date time text e.g. "Downloaded on Thursday Sept, 13th 2012"
-                logger.info(_(
-u''''ISO639-2 language code file was last updated on %s contains %d language codes''') %
-                    (lang_text_list[count].strip('\n'),
-                        len(lang_text_list) - 1))
+    for line in lang_text_list:
+        if not line.strip():
+            continue
+        if line.find(u'|') == -1:
+            # The first line should be the download date time text
+            # e.g. "Downloaded on Thursday Sept, 13th 2012"
+            lang_index['updated'] = line.strip()
             continue
         #
-        one_line = lang_text_list[count].replace(u'\n', u'').strip().split(u'|')
-        # Clean and lowrcase each value
-        for index in range(len(one_line)):
-            one_line[index] = one_line[index].strip().lower()
-        # Extract each item:
+        # Clean and lowercase each value
+        one_line = [value.strip().lower() for value in line.split(u'|')]
+        if len(one_line) < 5:
+            continue
         isocode = one_line[0]
-        match_text = u''
-        for text_count in range(3, 5):
-            if one_line[text_count]:
-                match_text += u' ' + one_line[text_count]
-        match_text = match_text.strip()
-        if not match_text:
+        english = [name.strip() for name in one_line[3].split(u';')
+                                                        if name.strip()]
+        french = [name.strip() for name in one_line[4].split(u';')
+                                                        if name.strip()]
+        if not english and not french:
             continue
-        lang_codes[isocode] = match_text
+        lang_index['count'] += 1
+        #
+        ## Both the bibliographic and terminology codes map to the
+        ## bibliographic code
+        for code in one_line[0:2]:
+            if code:
+                lang_index['codes'].setdefault(code, isocode)
+        if one_line[2]:
+            lang_index['two_letter'].setdefault(one_line[2], isocode)
+        if english:
+            lang_index['names'].setdefault(english[0], isocode)
+        for name in english[1:]:
+            lang_index['alternates'].setdefault(name, isocode)
+        for name in french:
+            lang_index['french'].setdefault(name, isocode)
+        for name in english + french:
+            lang_index['normalized'].setdefault(
+                            _normalize_language_name(name), isocode)
+            for prefix in _language_name_prefixes(name):
+                prefixes.append((not one_line[2], prefix, isocode))
+        lang_index['match_text'].append(
+                            (isocode, u' '.join(english + french)))
+    #
+    ## The sort is stable so languages stay in file order otherwise
+    for no_two_letter, prefix, isocode in sorted(prefixes,
+                                        key=lambda entry: entry[0]):
+        lang_index['prefixes'].setdefault(prefix, isocode)
+    #
+    return lang_index
+#
+## The ISO639-2 language index is only loaded once per process
+_ISO_LANGUAGE_INDEX = {}
+#
+def read_iso_language_codes(logger=False, cachepath=None):
+    ''' Load the ISO639-2 language code index. The index is kept in a
+    precompiled file in the cache directory which is rebuilt whenever the
+    ISO639-2 text file changes.
+    return dictionary of ISO639-2 language code look up dictionaries
+    '''
+    if not os.path.isfile(common.ISO639_2_LANG_CODE_FILE):
+        return {}
+    #
+    status = os.stat(common.ISO639_2_LANG_CODE_FILE)
+    source = (status.st_mtime, status.st_size,
+              common.ISO639_2_LANG_INDEX_FORMAT)
+    if _ISO_LANGUAGE_INDEX.get('source') == source:
+        return _ISO_LANGUAGE_INDEX['index']
+    #
+    lang_index = None
+    index_file = None
+    if cachepath:
+        index_file = common.ISO639_2_LANG_INDEX_FILE % {
+                                                'cachepath': cachepath}
+        try:
+            fileh = open(index_file, 'rb')
+            try:
+                precompiled = load(fileh)
+            finally:
+                fileh.close()
+            if precompiled['source'] == source:
+                lang_index = precompiled['index']
+        except Exception:
+            lang_index = None
+    #
+    if lang_index is None:
+        lang_index = _build_iso_language_index()
+        ## Failing to save the precompiled index is never fatal
+        if index_file:
+            try:
+                fileno, temp_filename = tempfile.mkstemp(
+                            dir=os.path.dirname(index_file), suffix=u'.tmp')
+                fileh = os.fdopen(fileno, 'wb')
+                try:
+                    dump({'source': source, 'index': lang_index}, fileh, 2)
+                finally:
+                    fileh.close()
+                os.rename(temp_filename, index_file)
+            except (IOError, OSError):
+                pass
     #
-    return lang_codes
+    _ISO_LANGUAGE_INDEX['source'] = source
+    _ISO_LANGUAGE_INDEX['index'] = lang_index
+    #
+    if logger:
+        logger.info(_(
+u''''ISO639-2 language code file was last updated on %s contains %d language codes''') %
+            (lang_index['updated'], lang_index['count']))
+    #
+    return lang_index
 #
 def get_iso_language_code(lang_codes, sublanguage, logger=False):
-    ''' Read in a text file of ISO639-2 language codes and convert into
-    a dictionary.
-    Source: http://loc.gov/standards/iso639-2/ISO-639-2_utf-8.txt
+    ''' Find the ISO639-2 language code for a subtitle language.
+    Matches are tried in this order of preference: three letter code,
+    two letter code, English name, alternate English name, French name,
+    any name with bracketed qualifiers removed, the part of a name before
+    its first comma or its first word and lastly the first language whose
+    names contain the subtitle language.
     return an ISO639-2 language code if one matches subtitle language
     return empty string if no match found
     '''
     #
     # Find a language match
-    lower_sublanguage = sublanguage.lower()
-    for key in lang_codes.keys():
-        if not lang_codes[key].find(lower_sublanguage) == -1:
-            if logger:
-                logger.info(_(
+    lower_sublanguage = sublanguage.strip().lower()
+    if lang_codes:
+        for key, text in [('codes', lower_sublanguage),
+                          ('two_letter', lower_sublanguage),
+                          ('names', lower_sublanguage),
+                          ('alternates', lower_sublanguage),
+                          ('french', lower_sublanguage),
+                          ('normalized',
+                                _normalize_language_name(lower_sublanguage)),
+                          ('prefixes',
+                                _normalize_language_name(lower_sublanguage)),
+                          ]:
+            if text in lang_codes[key]:
+                if logger:
+                    logger.info(_(
 u''''ISO639-2 language code match found for "%s" language codes "%s" will be used.''') %
-                (sublanguage, key))
-            return key
-    else:
-        if logger:
-            logger.info(_(
+                    (sublanguage, lang_codes[key][text]))
+                return lang_codes[key][text]
+        #
+        if lower_sublanguage:
+            for isocode, match_text in lang_codes['match_text']:
+                if match_text.find(lower_sublanguage) != -1:
+                    if logger:
+                        logger.info(_(
+u''''ISO639-2 language code match found for "%s" language codes "%s" will be used.''') %
+                        (sublanguage, isocode))
+                    return isocode
+    #
+    if logger:
+        logger.info(_(
 u''''No matching ISO639-2 language code was found for "%s" subtitle will default to "unknown".''') %
-                (sublanguage))
-        return u''
+            (sublanguage))
+    return u''
 #
 def make_timestamp(secs):
     '''Take a floating point number of fractional seconds and
@@ -1250,6 +1515,13 @@ def make_timestamp(secs):
     #
     return timestamp
 #
+def make_split_list(cuts, fps):
+    '''Convert keyframe cut points into cut point timestamp ranges.
+    return a list of "start-end" timestamps, one per cut
+    '''
+    return [u'%s-%s' % (make_timestamp(cut[0] / fps),
+                        make_timestamp(cut[1] / fps)) for cut in cuts]
+#
 def display_recorded_info(configuration, logger=False):
     ''' Display information about the recorded video.
     return verbage if there is no logger specified
@@ -1324,8 +1596,6 @@ def get_mediainfo(video_file, element_filter, tracks_filter,
     information about a video file.
     return dictionary containing an etree of info and track stats
     '''
-    tracks = {}
-    #
     # Get XML from mediainfo
     result = commandline_call(u'mediainfo',
                 common.MEDIAINFO_XML %  video_file)
@@ -1349,8 +1619,19 @@ Error: %s
         sys.stderr.write(verbage)
         exit(int(common.JOBSTATUS().ABORTED))
     #
+    return parse_mediainfo_xml(video_file, stdout, element_filter,
+                                tracks_filter, etree, logger, sys)
+#
+def parse_mediainfo_xml(video_file, xml, element_filter, tracks_filter,
+                    etree, logger, sys):
+    ''' Extract the track statistics and details from the mediainfo XML
+    of a video file.
+    return dictionary containing an etree of info and track stats
+    '''
+    tracks = {}
+    #
     # Create an etree structure from the mediainfo XML
-    tracks['etree'] = etree.fromstring(str(result[1]))
+    tracks['etree'] = etree.fromstring(str(xml))
     #
     # Extract some statistics etree
     tracks['general'] = tracks_filter(tracks['etree'],
@@ -1507,13 +1788,148 @@ def locate_matching_file(pattern, root=os.curdir):
         for filename in fnmatch.filter(files, pattern):
             return os.path.join(path, filename)
 #
+def write_mkvmerge_options(configuration, purpose, arguments):
+    ''' Write a list of mkvmerge arguments to an option file in the
+    working directory so long split and append lists never have to fit on
+    a shell command line. MKVToolNix 7.9.0 and later read a JSON array
+    from a ".json" file. Earlier versions read one argument per line with
+    backslashes, spaces, double quotes and hashes escaped.
+    return the mkvmerge command line argument that reads the option file
+    '''
+    if configuration.get('mkvmerge_json_options'):
+        filename = common.MKVMERGE_JSON_OPTIONS_FILE % dict(configuration,
+                                                        purpose=purpose)
+        text = json.dumps(arguments, ensure_ascii=False, indent=2)
+    else:
+        filename = common.MKVMERGE_OPTIONS_FILE % dict(configuration,
+                                                       purpose=purpose)
+        lines = []
+        for argument in arguments:
+            for character, escape in common.MKVMERGE_OPTIONS_ESCAPES:
+                argument = argument.replace(character, escape)
+            lines.append(argument)
+        text = u'\n'.join(lines) + u'\n'
+    fileh = open(filename, 'w')
+    try:
+        fileh.write(text.encode('utf8'))
+    finally:
+        fileh.close()
+    #
+    return u'@"%s"' % filename
+#
 def cleanup_working_dir(workingpath, recorded_name):
     ''' Remove any recording related files from the working directory.
+    The scratch directories of other jobs and the output files of the
+    finished stages in the job's manifest are left alone.
     return nothing
     '''
     #
+    keep = set(recorded_outputs(workingpath))
     for filename in glob(u'%s/%s*' % (workingpath, recorded_name, )):
-        os.remove(filename)
+        if filename not in keep and not os.path.isdir(filename):
+            os.remove(filename)
+    #
+    return
+#
+def process_alive(pid):
+    ''' Check if a process on this host is still running.
+    return True or False
+    '''
+    try:
+        os.kill(pid, 0)
+    except OSError as errmsg:
+        return errmsg.errno == errno.EPERM
+    return True
+#
+def create_job_workpath(configuration):
+    ''' Give the job its own scratch directory inside the working
+    directory so concurrent jobs never see or remove each other's files.
+    The configured directory is kept as "workpath_root" and "workpath"
+    becomes the job's scratch directory. The most recent scratch directory
+    of a job for the same recording on this host that died is taken over
+    so its finished stages can be resumed. The scratch directories of the
+    other jobs on this host that died are removed.
+    return nothing
+    '''
+    workpath_root = configuration['workpath']
+    workpath = common.JOB_WORKPATH % {
+        'workpath_root': workpath_root,
+        'recorded_name': configuration['recorded_name'],
+        'pid': os.getpid(), }
+    adopted = False
+    candidates = [directory for directory in glob(
+                common.JOB_WORKPATH_RECORDING_GLOB % {
+                    'workpath_root': workpath_root,
+                    'recorded_name': configuration['recorded_name'], })
+                if dead_job_workpath(directory)]
+    for directory in sorted(candidates, key=os.path.getmtime,
+                            reverse=True):
+        try:
+            os.rename(directory, workpath)
+        except OSError:
+            continue
+        adopted = True
+        break
+    if not adopted:
+        os.mkdir(workpath)
+    fileh = open(common.JOB_WORKPATH_OWNER % workpath, 'w')
+    try:
+        fileh.write(u'%s %d\n' % (gethostname(), os.getpid()))
+    finally:
+        fileh.close()
+    sweep_job_workpaths(workpath_root)
+    configuration['workpath_root'] = workpath_root
+    configuration['workpath'] = workpath
+    #
+    return
+#
+def remove_job_workpath(configuration):
+    ''' Remove the job's scratch directory and everything still in it.
+    return nothing
+    '''
+    if not configuration.get('workpath_root'):
+        return
+    shutil.rmtree(configuration['workpath'], ignore_errors=True)
+    configuration['workpath'] = configuration.pop('workpath_root')
+    #
+    return
+#
+def dead_job_workpath(directory):
+    ''' Check if a scratch directory belongs to a job on this host that
+    is no longer running. Directories owned by other hosts or without a
+    readable owner file are never treated as dead.
+    return True or False
+    '''
+    try:
+        fileh = open(common.JOB_WORKPATH_OWNER % directory, 'r')
+        try:
+            owner, pid = fileh.read().split()
+        finally:
+            fileh.close()
+        pid = int(pid)
+    except (IOError, ValueError):
+        return False
+    #
+    return owner == gethostname() and not process_alive(pid)
+#
+def sweep_job_workpaths(workpath_root):
+    ''' Remove the scratch directories of jobs on this host that are no
+    longer running. A directory with finished stages in its manifest is
+    kept for a rerun to resume until it expires.
+    return nothing
+    '''
+    oldest = time.time() - common.JOB_WORKPATH_RESUME_HOURS * 3600
+    for directory in glob(common.JOB_WORKPATH_GLOB % workpath_root):
+        if not dead_job_workpath(directory):
+            continue
+        if recorded_outputs(directory):
+            try:
+                if os.path.getmtime(common.JOB_MANIFEST_FILE % {
+                                'workpath': directory}) >= oldest:
+                    continue
+            except OSError:
+                pass
+        shutil.rmtree(directory, ignore_errors=True)
     #
     return
 #
@@ -1543,6 +1959,11 @@ def create_config_file():
     fileh = open(common.INIT_ERROR_DETECTION_CONFIG_FILE, 'r')
     init_config += u'\n' + fileh.read()
     fileh.close()
+    # Add the performance configuration section
+    fileh = open(common.INIT_PERFORMANCE_CONFIG_FILE, 'r')
+    init_config += u'\n' + (fileh.read() % \
+                common.DEFAULT_CONFIG_SETTINGS['performance_defaults'])
+    fileh.close()
     #
     # Add the default configuration settings
     init_config = init_config % common.DEFAULT_CONFIG_SETTINGS
@@ -41,6 +41,7 @@ from importcode.utilities import create_cachedir, create_logger, \
         check_dependancies, set_language, get_config, \
         create_config_file, get_mediainfo
 from importcode.mythtvinterface import Mythtvinterface
+from importcode.profiling import run_profiled
 #
 try:
     from lxml import etree as etree
@@ -60,7 +61,7 @@ VERSION = ''
 for digit in etree.LIBXML_VERSION:
     VERSION += str(digit)+'.'
 VERSION = VERSION[:-1]
-if VERSION < '2.7.2':
+if etree.LIBXML_VERSION < (2, 7, 2):
     sys.stderr.write(u'''
 Error: The installed version of the "lxml" python library "libxml" version
        is too old. At least "libxml" version 2.7.2 must be installed.
@@ -72,7 +73,7 @@ Error: The installed version of the "lxml" python library "libxml" version
 __title__ = u"keyframe_adjust.py"
 __author__ = common.__author__
 #
-__version__ = "0.1.4"
+__version__ = "0.1.6"
 # Version change log:
 # 0.1.0 Initial development
 # 0.1.1 Alpha release
@@ -81,6 +82,8 @@ __version__ = "0.1.4"
 #       command line switch
 # 0.1.4 Added lxml import and call for track info due to changes
 #       in the way fps, width and height info is gathered.
+# 0.1.5 Added the "--profile" option
+# 0.1.6 Only one job at a time may process a recording
 #
 # Language translation specific to this desktop
 _ = set_language()
@@ -179,6 +182,12 @@ PARSER.add_option(  "-u", "--usage", action="store_true",
 PARSER.add_option(  "-v", "--version", action="store_true",
                     default=False, dest="version",
                     help=_(u"Display version and author information"))
+PARSER.add_option(  "--profile", action="store_true",
+                    default=False, dest="profile",
+                    help=_(
+u'''Run the processing under the python profiler and save the profile
+statistics and a summary of the top functions and memory use in the log
+directory. Only used to find performance issues.'''))
 #
 OPTS, ARGS = PARSER.parse_args()
 #
@@ -342,9 +351,14 @@ _(u'''Start skip and/or cut list frame number adjustments for "%s" at: %s'''
                         self.element_filter, self.tracks_filter,
                         etree, self.logger, sys)
         #
-        self.mythtvinterface.adjust_frame_numbers()
-        #
-        self._cleanup()
+        ## The recording's processing lease is taken once its recorded
+        ## record is found and is always given up
+        try:
+            self.mythtvinterface.adjust_frame_numbers()
+            #
+            self._cleanup()
+        finally:
+            self.mythtvinterface.release_lease()
         #
         return
 #
@@ -465,6 +479,10 @@ copy the file "%s" to "%s", aborting script.
     #
     # Process the recorded video file according to the command line
     # options and the configuration file settings.
-    KEYFRAME_ADJUST.adjust_frame_numbers()
+    if OPTS.profile:
+        run_profiled(KEYFRAME_ADJUST.adjust_frame_numbers,
+                        KEYFRAME_ADJUST.configuration, u'keyframe_adjust')
+    else:
+        KEYFRAME_ADJUST.adjust_frame_numbers()
     #
     sys.exit(KEYFRAME_ADJUST.return_code)
@@ -0,0 +1,709 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# ----------------------
+"""
+# Name: ll_benchmark.py   Micro benchmarks of the lossless_cut cut list,
+#                         seek table, mediainfo and language code processing
+#
+# Python Script
+# Author:   R.D. Vaughan
+# Purpose:  This python script times the lossless_cut processing that grows
+#           with the size of a recording. Synthetic seek tables, markup and
+#           cut lists are used so neither MythTV nor any media tools are
+#           needed. Results can be saved as a baseline and later runs
+#           compared against it. Whole jobs can also be timed against the
+#           MythTV bindings stand-in.
+#
+# Copyright (C) 2012 R.D. Vaughan
+# rdvLaunchpad@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# License:Creative Commons GNU GPL v2
+# (https://www.gnu.org/licenses/gpl-2.0.html)
+#-------------------------------------
+#
+"""
+## System imports
+import os
+import sys
+import json
+import shutil
+import resource
+import platform
+import tempfile
+import subprocess
+from timeit import default_timer
+from optparse import OptionParser
+from datetime import datetime
+#
+# tracemalloc is only part of newer pythons. Without it only the growth
+# of the process's peak resident memory is reported.
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+#
+## Mythtv loss less cut specific imports
+import importcode.common as common
+import importcode.utilities as utilities
+from importcode.utilities import create_logger, set_language, \
+        get_iso_language_code, read_iso_language_codes, make_split_list, \
+        parse_mediainfo_xml, reap_process
+from importcode.mythtvinterface import Mythtvinterface
+from importcode.mythtv_standin import FPS, CHANID, STARTTIME, \
+        OWN_VERSION, KEYFRAME_SEEK_TYPE, make_seek_table, make_markup, \
+        make_mediainfo_xml, create_database, install_tools
+#
+## The mediainfo benchmark is skipped when lxml is not installed
+try:
+    from lxml import etree as etree
+except Exception:
+    etree = None
+#
+## Initialize local variables
+__title__ = u"ll_benchmark"
+__author__ = common.__author__
+#
+__version__ = "0.1.1"
+# Version change log:
+# 0.1.0 Initial development
+# 0.1.1 Added the "-e" option to time whole lossless_cut jobs run against
+#       the MythTV bindings stand-in
+#
+# Language translation specific to this desktop
+_ = set_language()
+#
+__purpose__ = _('''
+Time the lossless_cut processing that grows with the size of a recording
+using synthetic seek tables, markup and cut lists.
+''')
+#
+## Local variables
+## Help text
+USAGE_TEXT = _('''
+This script times the lossless_cut cut list, keyframe, seek table,
+mediainfo XML and language code processing. Synthetic data is used so
+neither MythTV nor any media tools are needed.
+
+Optional command line parameters:
+  -h or -u     Display this help/usage text
+  -b file      The baseline file. Default: "%s"
+  -c           Compare the results with the baseline. The exit code is 1
+               when any benchmark is slower than the baseline by more than
+               the regression ratio
+  -e           Time whole lossless_cut jobs instead of the micro
+               benchmarks. A synthetic recording is cut using an SQLite
+               stand-in for the MythTV python bindings and scripted
+               mkvmerge, mediainfo and mythutil tools. The time each job
+               stage spent in python code, excluding its nested stages and
+               the tools it ran, is reported
+  -k names     Only run these comma separated benchmarks:
+               %s
+  -r number    The number of times each benchmark or job is run, the
+               fastest run is reported. Default: "3"
+  -s size      The synthetic recording size "small", "medium" or "large".
+               Large is 500,000 seek table rows and 300 cuts.
+               Default: "medium"
+  -S           Save the results as the baseline
+  -v           Display version and author information
+
+''')
+#
+## Command line options and arguments
+PARSER = OptionParser(
+        usage=u"%prog usage: ll_benchmark.py -hubcekrsSv [parameters]\n")
+PARSER.add_option(  "-b", "--baseline", metavar="baseline",
+                    default=common.BENCHMARK_BASELINE_FILE, dest="baseline",
+                    help=_(u'The baseline results file.'))
+PARSER.add_option(  "-c", "--compare", action="store_true",
+                    default=False, dest="compare",
+                    help=_(u'Compare the results with the baseline.'))
+PARSER.add_option(  "-e", "--end-to-end", action="store_true",
+                    default=False, dest="end_to_end",
+                    help=_(
+u'Time whole lossless_cut jobs using the MythTV bindings stand-in.'))
+PARSER.add_option(  "-k", "--benchmarks", metavar="benchmarks",
+                    default="", dest="benchmarks",
+                    help=_(u'Only run these comma separated benchmarks.'))
+PARSER.add_option(  "-r", "--repeat", metavar="repeat", type="int",
+                    default=3, dest="repeat",
+                    help=_(
+u'The number of times each benchmark is run, the fastest is reported.'))
+PARSER.add_option(  "-s", "--size", metavar="size",
+                    default="medium", dest="size",
+                    help=_(
+u'The synthetic recording size "small", "medium" or "large".'))
+PARSER.add_option(  "-S", "--save", action="store_true",
+                    default=False, dest="save",
+                    help=_(u'Save the results as the baseline.'))
+PARSER.add_option(  "-u", "--usage", action="store_true",
+                    default=False, dest="usage",
+                    help=_(u"Display this help/usage text and exit."))
+PARSER.add_option(  "-v", "--version", action="store_true",
+                    default=False, dest="version",
+                    help=_(u"Display version and author information"))
+#
+## The jobqueue id of the end to end runs' job
+E2E_JOBID = 1
+## Number of calls made by each run of the quicker benchmarks
+DD_BLOCK_CALLS = 50
+MEDIAINFO_PARSES = 200
+SPLIT_LIST_BUILDS = 200
+LANGUAGE_LOOK_UPS = 2000
+## Subtitle languages as they appear in mediainfo and DVB streams
+LANGUAGES = [u'eng', u'en', u'English', u'fre', u'French', u'Deutsch',
+             u'German', u'English (US)', u'spa', u'Spanish; Castilian',
+             u'nld', u'français', u'Klingon', u'']
+#
+#
+class SyntheticRecorded(object):
+    """A recorded record with its seek table and markup."""
+    def __init__(self, seek, markup):
+        self.seek = seek
+        self.markup = markup
+        self.chanid = CHANID
+        self.starttime = STARTTIME
+        self.progstart = self.starttime
+        self.basename = u'1001_20120913200000.mpg'
+
+    def update(self, ):
+        return
+#
+#
+class SyntheticDB(object):
+    """Only the recorded record look ups used by keyframe_adjust."""
+    def __init__(self, recorded):
+        self.recorded = recorded
+
+    def searchRecorded(self, **kwargs):
+        return [self.recorded]
+
+    def Recorded(self, key, db=None):
+        return self.recorded
+#
+#
+class NullStream(object):
+    """Throw away console output."""
+    def write(self, obj):
+        return
+#
+#
+class SyntheticRecording(object):
+    """The synthetic data of one recording and a Mythtvinterface set up to
+    process it without a MythTV backend.
+    """
+    def __init__(self, size):
+        #
+        self.size = common.BENCHMARK_SIZES[size]
+        self.seek = make_seek_table(self.size['seek_rows'])
+        self.last_frame = self.seek[-1].mark
+        self.logger = create_logger(os.devnull, u'll_benchmark',
+                                    filename=True)
+        #
+        return    # end __init__()
+
+    def interface(self, keyframe_adjust=False):
+        ''' Create a Mythtvinterface for the recording with fresh markup.
+        The MythTV bindings are never loaded.
+        return a Mythtvinterface instance
+        '''
+        markup = make_markup(self.last_frame, self.size['cuts'])
+        recorded = SyntheticRecorded(self.seek, markup)
+        cutlist = markup.getcutlist()
+        configuration = {
+            'base_name': recorded.basename,
+            'recorded_name': u'1001_20120913200000',
+            'workpath': u'/tmp',
+            'SQL_starttime': u'2012-09-13 20:00:00',
+            'SQL_progstart': u'2012-09-13 20:00:00',
+            'gencutlist': False,
+            ## Like the "-s" summary the benchmarks never take the
+            ## recording's processing lease
+            'summary': True,
+            'fps': FPS,
+            'first_frame': self.seek[0].mark,
+            'last_frame': self.last_frame,
+            ## The recording file ends after its last keyframe
+            'recorded_filesize': max([seek.offset for seek in self.seek
+                        if seek.type == KEYFRAME_SEEK_TYPE]) + 1,
+            'rawcutlist': cutlist,
+            'pre_massage_cutlist': markup.getuncutlist(),
+            'keyframe_cuts': [],
+            'trackinfo': {'video_track_details': {
+                            'Original_frame_rate': u'29970',
+                            'Height': u'1080', 'Width': u'1920', }},
+        }
+        mythtvinterface = Mythtvinterface.__new__(Mythtvinterface)
+        mythtvinterface.logger = self.logger
+        mythtvinterface.configuration = configuration
+        mythtvinterface.stdout = NullStream()
+        mythtvinterface.stderr = NullStream()
+        mythtvinterface.mythdb = SyntheticDB(recorded)
+        mythtvinterface.Recorded = mythtvinterface.mythdb.Recorded
+        mythtvinterface.OWN_VERSION = OWN_VERSION
+        mythtvinterface.recorded = recorded
+        mythtvinterface.recorded_key = None
+        mythtvinterface.keyframe_index = None
+        mythtvinterface.keyframe_adjust = keyframe_adjust
+        mythtvinterface.markup_frame_difference = 1
+        mythtvinterface.keyframe_test_diff = 1
+        #
+        return mythtvinterface
+#
+#
+## Each benchmark is set up outside of the timed run. The set up returns
+## the function that is timed.
+def setup_process_cutlist(recording):
+    mythtvinterface = recording.interface()
+    return mythtvinterface._process_cutlist
+#
+def setup_adjust_frame_numbers(recording):
+    mythtvinterface = recording.interface(keyframe_adjust=True)
+    return mythtvinterface.adjust_frame_numbers
+#
+def setup_calc_dd_blocks(recording):
+    mythtvinterface = recording.interface()
+    duration = recording.last_frame / FPS
+    starttimes = [duration * count / DD_BLOCK_CALLS
+                                for count in range(DD_BLOCK_CALLS)]
+    def run():
+        for starttime in starttimes:
+            mythtvinterface.calc_dd_blocks(starttime)
+    return run
+#
+def setup_mediainfo_xml(recording):
+    if etree is None:
+        return None
+    xml = make_mediainfo_xml(
+                u'/var/lib/mythtv/recordings/1001_20120913200000.mpg',
+                recording.last_frame / FPS)
+    tracks_filter = etree.XPath(common.TRACKS_XPATH)
+    element_filter = etree.XPath(common.ELEMENTS_XPATH)
+    def run():
+        for count in range(MEDIAINFO_PARSES):
+            parse_mediainfo_xml(u'1001_20120913200000.mpg', xml,
+                    element_filter, tracks_filter, etree,
+                    recording.logger, sys)
+    return run
+#
+def setup_split_list(recording):
+    mythtvinterface = recording.interface()
+    mythtvinterface._process_cutlist()
+    keyframe_cuts = mythtvinterface.configuration['keyframe_cuts']
+    def run():
+        for count in range(SPLIT_LIST_BUILDS):
+            u','.join(make_split_list(keyframe_cuts, FPS))
+    return run
+#
+def setup_iso_language_load(recording):
+    def run():
+        utilities._ISO_LANGUAGE_INDEX.clear()
+        read_iso_language_codes()
+    return run
+#
+def setup_iso_language_code(recording):
+    lang_codes = read_iso_language_codes()
+    languages = (LANGUAGES * (LANGUAGE_LOOK_UPS // len(LANGUAGES) + 1))[
+                                                        :LANGUAGE_LOOK_UPS]
+    def run():
+        for language in languages:
+            get_iso_language_code(lang_codes, language, recording.logger)
+    return run
+#
+BENCHMARKS = [
+    ('process_cutlist', setup_process_cutlist, 1),
+    ('adjust_frame_numbers', setup_adjust_frame_numbers, 1),
+    ('calc_dd_blocks', setup_calc_dd_blocks, DD_BLOCK_CALLS),
+    ('mediainfo_xml', setup_mediainfo_xml, MEDIAINFO_PARSES),
+    ('split_list', setup_split_list, SPLIT_LIST_BUILDS),
+    ('iso_language_load', setup_iso_language_load, 1),
+    ('iso_language_code', setup_iso_language_code, LANGUAGE_LOOK_UPS),
+]
+#
+#
+def max_rss_kb():
+    ''' The peak resident memory of this process.
+    return kilobytes
+    '''
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+#
+def run_benchmark(size, name, setup, repeat):
+    ''' Time a benchmark's fastest run and the memory it used on top of
+    the synthetic recording.
+    return a dictionary of the benchmark's results
+    '''
+    recording = SyntheticRecording(size)
+    start_rss = max_rss_kb()
+    times = []
+    traced_peak = None
+    for count in range(repeat):
+        run = setup(recording)
+        if run is None:
+            return {'skipped': _(u'lxml is not installed')}
+        if tracemalloc is not None:
+            tracemalloc.start()
+        started = default_timer()
+        run()
+        times.append(default_timer() - started)
+        if tracemalloc is not None:
+            traced_peak = max(traced_peak,
+                              tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    #
+    result = {'seconds': round(min(times), 6),
+              'mean_seconds': round(sum(times) / len(times), 6),
+              'runs': repeat,
+              'max_rss_growth_kb': max_rss_kb() - start_rss, }
+    if traced_peak is not None:
+        result['traced_peak_bytes'] = traced_peak
+    #
+    return result
+#
+def run_isolated(size, name, setup, repeat):
+    ''' Run a benchmark in its own process so that its peak memory is not
+    hidden by an earlier benchmark's.
+    return a dictionary of the benchmark's results
+    '''
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            result = run_benchmark(size, name, setup, repeat)
+        except Exception, errmsg:
+            result = {'error': u'%s' % errmsg}
+        fileh = os.fdopen(write_fd, 'w')
+        fileh.write(json.dumps(result))
+        fileh.close()
+        os._exit(0)
+    #
+    os.close(write_fd)
+    fileh = os.fdopen(read_fd, 'r')
+    text = fileh.read()
+    fileh.close()
+    os.waitpid(pid, 0)
+    try:
+        return json.loads(text)
+    except ValueError:
+        return {'error': _(u'The benchmark process died')}
+#
+def read_json(filename):
+    ''' Read a saved baseline or a job statistics file.
+    return the dictionary or None if there is none
+    '''
+    try:
+        fileh = open(filename, 'r')
+    except IOError:
+        return None
+    try:
+        return json.load(fileh)
+    except ValueError:
+        return None
+    finally:
+        fileh.close()
+#
+def write_baseline(filename, baseline):
+    ''' Save the results as the baseline.
+    return nothing
+    '''
+    directory = os.path.dirname(filename)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    temp_filename = filename + u'.tmp'
+    fileh = open(temp_filename, 'w')
+    try:
+        json.dump(baseline, fileh, indent=2, sort_keys=True)
+    finally:
+        fileh.close()
+    os.rename(temp_filename, filename)
+    #
+    return
+#
+def format_memory(result):
+    ''' The memory column of a result.
+    return memory text
+    '''
+    if 'traced_peak_bytes' in result:
+        return u'%d KB' % (result['traced_peak_bytes'] // 1024)
+    if 'max_rss_kb' in result:
+        return u'%d KB' % result['max_rss_kb']
+    if 'max_rss_growth_kb' in result:
+        return u'+%d KB' % result['max_rss_growth_kb']
+    return u''
+#
+#
+## End to end runs of a whole lossless_cut job against the MythTV
+## bindings stand-in and its scripted media tools
+def run_job(directory, size):
+    ''' Run one lossless_cut job on a fresh stand-in recording. Every run
+    starts without a configuration file or any disk caches.
+    return the job's statistics, wall time, resource usage and exit code
+    '''
+    for name in [u'home', u'recordings', u'videos', u'work', u'logs',
+                 u'move']:
+        path = os.path.join(directory, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+    recorded_name = u'%s_%s' % (CHANID, STARTTIME.strftime('%Y%m%d%H%M%S'))
+    recorded_file = os.path.join(directory, u'recordings',
+                                 recorded_name + u'.mpg')
+    database = os.path.join(directory, u'standin.sqlite')
+    create_database(database, recorded_file, size['seek_rows'],
+                    size['cuts'], jobid=E2E_JOBID)
+    #
+    environment = dict(os.environ)
+    environment['HOME'] = os.path.join(directory, u'home')
+    environment['PATH'] = os.path.join(directory, u'tools') + os.pathsep + \
+                                            environment.get('PATH', u'')
+    environment[common.MYTHTV_STANDIN_ENV] = database
+    command = [sys.executable, u'%slossless_cut.py' % common.APPDIR,
+               u'-f', recorded_file,
+               u'-m', os.path.join(directory, u'move'),
+               u'-w', os.path.join(directory, u'work'),
+               u'-l', os.path.join(directory, u'logs'),
+               u'-k', u'-j', unicode(E2E_JOBID), ]
+    output = open(os.path.join(directory, u'job_output.txt'), 'w')
+    try:
+        started = default_timer()
+        process = subprocess.Popen(command, env=environment,
+                        stdout=output, stderr=subprocess.STDOUT)
+        rusage = reap_process(process)
+        wall_seconds = default_timer() - started
+    finally:
+        output.close()
+    #
+    statistics = read_json(common.JOB_STATS_FILE % {
+                        'logpath': os.path.join(directory, u'logs'),
+                        'recorded_name': recorded_name, })
+    #
+    return statistics, wall_seconds, rusage, process.returncode
+#
+def job_python_seconds(statistics, wall_seconds):
+    ''' Split a job's time into the time spent in its own python code
+    in each stage, outside of any stage and starting up. A stage's own
+    time excludes its nested stages and the tools it ran.
+    return a list of (name, seconds) in stage order
+    '''
+    tool_seconds = {}
+    for record in statistics['tool_runs']:
+        tool_seconds[record['stage']] = \
+                tool_seconds.get(record['stage'], 0.0) + record['seconds']
+    nested_seconds = {}
+    stage_names = []
+    for record in statistics['stages']:
+        nested_seconds[record['parent']] = \
+                nested_seconds.get(record['parent'], 0.0) + record['seconds']
+        if not record['stage'] in stage_names:
+            stage_names.append(record['stage'])
+    #
+    seconds = [
+        (u'job_wall', wall_seconds),
+        (u'job_startup', wall_seconds - statistics['seconds']),
+        (u'job_unstaged', statistics['seconds'] -
+                nested_seconds.get(None, 0.0) - tool_seconds.get(None, 0.0)),
+    ]
+    for name in stage_names:
+        seconds.append((u'job_%s' % name,
+                statistics['stage_totals'][name]['seconds'] -
+                nested_seconds.get(name, 0.0) - tool_seconds.get(name, 0.0)))
+    seconds.append((u'job_tools', sum(tool_seconds.values())))
+    #
+    return [(name, max(0.0, value)) for name, value in seconds]
+#
+def run_end_to_end(size, repeat):
+    ''' Time whole lossless_cut jobs in a temporary directory that is
+    removed afterwards.
+    return a list of (name, result dictionary) in stage order
+    '''
+    directory = tempfile.mkdtemp(prefix=u'll_benchmark_')
+    try:
+        os.makedirs(os.path.join(directory, u'tools'))
+        install_tools(os.path.join(directory, u'tools'))
+        names = []
+        times = {}
+        max_rss = 0
+        for count in range(repeat):
+            statistics, wall_seconds, rusage, returncode = run_job(
+                                directory, common.BENCHMARK_SIZES[size])
+            if returncode or statistics is None:
+                fileh = open(os.path.join(directory, u'job_output.txt'), 'r')
+                try:
+                    output = fileh.read().decode('utf8', 'replace')
+                finally:
+                    fileh.close()
+                # TRANSLATORS: Please leave %s as it is,
+                # because it is needed by the program.
+                # Thank you for contributing to this project.
+                return [(u'job', {'error': _(
+u'''lossless_cut failed with exit code (%s):
+%s''') % (returncode, output.strip()[-2000:])})]
+            if rusage is not None:
+                max_rss = max(max_rss, rusage.ru_maxrss)
+            for name, seconds in job_python_seconds(statistics,
+                                                    wall_seconds):
+                if not name in names:
+                    names.append(name)
+                times.setdefault(name, []).append(seconds)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    #
+    results = []
+    for name in names:
+        result = {'seconds': round(min(times[name]), 6),
+                  'mean_seconds': round(sum(times[name]) / len(times[name]),
+                                        6),
+                  'runs': len(times[name]), }
+        if name == u'job_wall':
+            result['max_rss_kb'] = max_rss
+        results.append((name, result))
+    #
+    return results
+#
+#
+if __name__ == "__main__":
+    OPTS, ARGS = PARSER.parse_args()
+    names = [name for name, setup, calls in BENCHMARKS]
+    #
+    # Check for the help or usage option then exit
+    if OPTS.usage:
+        sys.stdout.write(USAGE_TEXT % (common.BENCHMARK_BASELINE_FILE,
+                                        u', '.join(names)))
+        sys.exit(0)
+    #
+    # Display version and author information then exit
+    if OPTS.version:
+        # TRANSLATORS: Please leave %s as it is,
+        # because it is needed by the program.
+        # Thank you for contributing to this project.
+        sys.stdout.write(_(u"""
+Title: (%s); Version: description(%s); Author: (%s)
+%s
+
+""") % (__title__, __version__, __author__, __purpose__ ))
+        sys.exit(0)
+    #
+    if not OPTS.size in common.BENCHMARK_SIZES:
+        # TRANSLATORS: Please leave %s as it is,
+        # because it is needed by the program.
+        # Thank you for contributing to this project.
+        sys.stderr.write(_(
+u'''The size "%s" must be one of "small", "medium" or "large".\n''') %
+                            OPTS.size)
+        sys.exit(1)
+    #
+    selected = names
+    if OPTS.benchmarks:
+        selected = [name.strip() for name in OPTS.benchmarks.split(u',')]
+        for name in selected:
+            if not name in names:
+                # TRANSLATORS: Please leave %s as it is,
+                # because it is needed by the program.
+                # Thank you for contributing to this project.
+                sys.stderr.write(_(
+u'''There is no benchmark called "%s". The benchmarks are: %s\n''') %
+                            (name, u', '.join(names)))
+                sys.exit(1)
+    #
+    baseline = None
+    if OPTS.compare:
+        baseline = read_json(OPTS.baseline)
+        if baseline is None:
+            # TRANSLATORS: Please leave %s as it is,
+            # because it is needed by the program.
+            # Thank you for contributing to this project.
+            sys.stderr.write(_(
+u'''There is no baseline file "%s", save one with the "-S" option.\n''') %
+                            OPTS.baseline)
+            sys.exit(1)
+        if baseline.get('end_to_end', False) != OPTS.end_to_end:
+            # TRANSLATORS: Please leave %s as it is,
+            # because it is needed by the program.
+            # Thank you for contributing to this project.
+            sys.stderr.write(_(
+u'''The baseline "%s" was not run with the same "-e" option.\n''') %
+                            OPTS.baseline)
+            sys.exit(1)
+        if baseline['size'] != OPTS.size:
+            # TRANSLATORS: Please leave %s as it is,
+            # because it is needed by the program.
+            # Thank you for contributing to this project.
+            sys.stderr.write(_(
+u'''The baseline was run with the size "%s" not "%s".\n''') %
+                            (baseline['size'], OPTS.size))
+            sys.exit(1)
+    #
+    sys.stdout.write(_(
+u'''Synthetic recording: %(seek_rows)d seek table rows and %(cuts)d cuts\n\n''')
+                            % common.BENCHMARK_SIZES[OPTS.size])
+    sys.stdout.write(u'%-22s %7s %12s %12s %12s %10s\n' % (u'benchmark',
+                u'calls', u'seconds', u'per call', u'memory', u'baseline'))
+    #
+    if OPTS.end_to_end:
+        runs = run_end_to_end(OPTS.size, OPTS.repeat)
+    else:
+        runs = []
+        for name, setup, calls in BENCHMARKS:
+            if not name in selected:
+                continue
+            result = run_isolated(OPTS.size, name, setup, OPTS.repeat)
+            result['calls'] = calls
+            runs.append((name, result))
+    #
+    results = {}
+    regressions = []
+    for name, result in runs:
+        calls = result.setdefault('calls', 1)
+        results[name] = result
+        if 'seconds' not in result:
+            sys.stdout.write(u'%-22s %s\n' % (name,
+                        result.get('skipped', result.get('error'))))
+            continue
+        #
+        compared = u''
+        if baseline and name in baseline['results'] and \
+                        baseline['results'][name].get('seconds'):
+            ratio = result['seconds'] / baseline['results'][name]['seconds']
+            compared = u'%.2fx' % ratio
+            if ratio > common.BENCHMARK_REGRESSION_RATIO and \
+                    baseline['results'][name]['seconds'] >= \
+                                    common.BENCHMARK_MIN_COMPARE_SECONDS:
+                compared += u' !'
+                regressions.append(name)
+        sys.stdout.write(u'%-22s %7d %12.6f %12.6f %12s %10s\n' % (name,
+                    calls, result['seconds'], result['seconds'] / calls,
+                    format_memory(result), compared))
+    #
+    if OPTS.save:
+        write_baseline(OPTS.baseline, {
+            'created': datetime.now().isoformat(),
+            'size': OPTS.size,
+            'end_to_end': OPTS.end_to_end,
+            'python': platform.python_version(),
+            'version': common.VERSION,
+            'results': results, })
+        # TRANSLATORS: Please leave %s as it is,
+        # because it is needed by the program.
+        # Thank you for contributing to this project.
+        sys.stdout.write(_(u'''\nSaved the baseline "%s"\n''') %
+                                OPTS.baseline)
+    #
+    if regressions:
+        # TRANSLATORS: Please leave %s as it is,
+        # because it is needed by the program.
+        # Thank you for contributing to this project.
+        sys.stdout.write(_(
+u'''\nSlower than the baseline by more than %.2f times: %s\n''') %
+            (common.BENCHMARK_REGRESSION_RATIO, u', '.join(regressions)))
+        sys.exit(1)
+    #
+    sys.exit(0)
@@ -45,6 +45,7 @@ from importcode.utilities import create_cachedir, create_logger, \
         display_recorded_info, commandline_call, get_mediainfo, \
         create_config_file
 from importcode.mythtvinterface import Mythtvinterface
+from importcode.profiling import run_profiled
 #
 try:
     from lxml import etree as etree
@@ -64,7 +65,7 @@ VERSION = ''
 for digit in etree.LIBXML_VERSION:
     VERSION += str(digit)+'.'
 VERSION = VERSION[:-1]
-if VERSION < '2.7.2':
+if etree.LIBXML_VERSION < (2, 7, 2):
     sys.stderr.write(u'''
 Error: The installed version of the "lxml" python library "libxml" version
        is too old. At least "libxml" version 2.7.2 must be installed.
@@ -76,7 +77,7 @@ Error: The installed version of the "lxml" python library "libxml" version
 __title__ = u"ll_report"
 __author__ = common.__author__
 #
-__version__ = "0.1.4"
+__version__ = "0.1.5"
 # Version change log:
 # 0.1.0 Initial development
 # 0.1.1 Alpha release
@@ -84,6 +85,7 @@ __version__ = "0.1.4"
 # 0.1.3 Added columns for the recording device manufacturer
 #       and model
 # 0.1.4 Added the new config file sections
+# 0.1.5 Added the "--profile" option
 #
 # Language translation specific to this desktop
 _ = set_language()
@@ -184,6 +186,12 @@ PARSER.add_option(  "-w", "--wiki", action="store_true",
                     help=_(
 u'''Display a Wiki page table entry that can be used to identify recording
 device's whose recorded videos either work or fail with lossless_cut.py'''))
+PARSER.add_option(  "--profile", action="store_true",
+                    default=False, dest="profile",
+                    help=_(
+u'''Run the processing under the python profiler and save the profile
+statistics and a summary of the top functions and memory use in the log
+directory. Only used to find performance issues.'''))
 #
 OPTS, ARGS = PARSER.parse_args()
 #
@@ -694,6 +702,10 @@ copy the file "%s" to "%s", aborting script.
     #
     # Process the recorded video file according to the command line
     # options and the configuration file settings.
-    LL_REPORT.ll_report()
+    if OPTS.profile:
+        run_profiled(LL_REPORT.ll_report, LL_REPORT.configuration,
+                        u'll_report')
+    else:
+        LL_REPORT.ll_report()
     #
     sys.exit(0)
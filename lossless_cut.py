@@ -37,7 +37,13 @@
 ## System imports
 import os
 import sys
+import time
+import signal
+import subprocess
+import threading
+import Queue
 from glob import glob
+from shutil import move
 from optparse import OptionParser
 from datetime import datetime
 from copy import deepcopy
@@ -48,10 +54,20 @@ from importcode.utilities import create_cachedir, \
         set_language, get_config, exec_commandline, \
         check_dependancies, create_logger, commandline_call, \
         get_iso_language_code, read_iso_language_codes, make_timestamp, \
-        display_recorded_info, get_mediainfo, cleanup_working_dir, \
-        create_config_file
+        make_split_list, display_recorded_info, get_mediainfo, \
+        cleanup_working_dir, create_config_file, reap_process, \
+        create_job_workpath, remove_job_workpath, write_mkvmerge_options
 #
 from importcode.mythtvinterface import Mythtvinterface
+from importcode.jobstats import JobStatistics, record_tool_run
+from importcode.reservations import SpaceReservations
+from importcode.manifest import JobManifest
+from importcode.segmentcache import SegmentCache, segment_cache_bytes
+from importcode.tsscan import transport_stream_sync, cut_ranges
+from importcode.tscut import copy_ranges
+from importcode.planner import build_plan, format_plan, \
+        record_throughput, group_segments
+from importcode.profiling import run_profiled
 #
 try:
     from lxml import etree as etree
@@ -71,7 +87,7 @@ VERSION = ''
 for digit in etree.LIBXML_VERSION:
     VERSION += str(digit)+'.'
 VERSION = VERSION[:-1]
-if VERSION < '2.7.2':
+if etree.LIBXML_VERSION < (2, 7, 2):
     sys.stderr.write(u'''
 Error: The installed version of the "lxml" python library "libxml" version
        is too old. At least "libxml" version 2.7.2 must be installed.
@@ -151,6 +167,13 @@ MythTV database:
 
   /path to/script file/lossless_cut.py -f "%%DIR%%/%%FILE%%" -r
 
+OR
+
+To trim a transport stream recording and replace it in the MythTV database
+without making a mkv file:
+
+  /path to/script file/lossless_cut.py -f "%%DIR%%/%%FILE%%" -r -R
+
 %s
 Optional command line parameters:
   Most of these parameters can be set in the automatically
@@ -164,6 +187,12 @@ Optional command line parameters:
                                 or negative number (start later than other tracks)
                                 in milliseconds. One second = 1000
                                 This option should only be chosen by experienced users.
+  -F                            Follow a recording that is still being
+                                recorded. The kept parts of the recording
+                                are cut into the segment cache as soon as
+                                their cut list boundaries are final and the
+                                remaining parts are cut and merged once the
+                                recording has ended.
   -g                            Generate a cut list if one does not exist but there is
                                 a skip list.
   -h or -u                      Display this help/usage text
@@ -173,10 +202,20 @@ Optional command line parameters:
   -l "/log directory path"      Specify a directory path to save the jobs
                                 log file
   -s                            Display a summary of the options that would
-                                be used during processing
+                                be used during processing and a plan of the
+                                stages with their predicted bytes read and
+                                written, peak working directory space, output
+                                size and estimated run time
                                 but exit before processing begins. Used this
-                                option for debugging. No changes to the mpg
-                                file occurs.
+                                option for debugging or to schedule large
+                                jobs. No changes to the mpg file or the MythTV
+                                data base occurs.
+  -R                            Trim the transport stream recording without
+                                demuxing instead of making a mkv file. The
+                                kept keyframe aligned byte ranges of the
+                                recording are copied with the program tables
+                                at each join. Only used with the "-r" or "-m"
+                                options.
   -S                            Strip away any subtitle or secondary audio tracks
   -T                            Identifies a specific Audio track to copy in
                                 conjunction with the "-S" Strip option.
@@ -216,7 +255,7 @@ MANDITORY = (MANDITORY + "%s") % u''
 #
 ## Command line options and arguments
 PARSER = OptionParser(
-        usage=u"%prog usage: lossless_cut.py -aCDefghujklmrsStTvXw [parameters]\n")
+        usage=u"%prog usage: lossless_cut.py -aCDefFghujklmrRsStTvXw [parameters]\n")
 
 PARSER.add_option(  "-a", "--addmetadata", action="store_true",
                     default=False, dest="addmetadata",
@@ -237,6 +276,12 @@ PARSER.add_option(  "-e", "--mythvideo_export", action="store_true",
                     default=False, dest="mythvideo_export",
                     help=_(
 u"Export the final mkv video into MythVideo, this includes subdirectory creation when necessary."))
+PARSER.add_option(  "-F", "--follow", action="store_true",
+                    default=False, dest="follow",
+                    help=_(
+u'''Follow a recording that is still being recorded and cut its kept
+parts into the segment cache once their cut list boundaries are final.
+The remaining parts are cut and merged when the recording ends.'''))
 PARSER.add_option(  "-f", "--recordedfile", metavar="recordedfile",
                     default="", dest="recordedfile",
                     help=_(
@@ -266,12 +311,19 @@ PARSER.add_option(  "-r", "--replace_recorded", action="store_true",
                     default=False, dest="replace_recorded",
                     help=_(
 u"Replace the recorded video file with the loss less cut version. Use with caution!"))
+PARSER.add_option(  "-R", "--tscut", action="store_true",
+                    default=False, dest="tscut",
+                    help=_(
+u'''Trim the transport stream recording by copying its kept keyframe
+aligned byte ranges instead of making a mkv file. Only used with the
+"-r" replace or "-m" move options.'''))
 PARSER.add_option(  "-s", "--summary", action="store_true",
                     default=False, dest="summary",
                     help=_(
 u'''Display a summary of the options that would be used during processing
-but exit before processing begins. Used this for debugging. No changes
-to the mpg file occur.'''))
+and a plan of the stages with their predicted I/O, disk space and run time
+but exit before processing begins. Used this for debugging or scheduling.
+No changes to the mpg file occur.'''))
 PARSER.add_option(  "-S", "--noextratracks", action="store_true",
                     default=False, dest="noextratracks",
                     help=_(
@@ -303,6 +355,12 @@ PARSER.add_option(  "-w", "--workingpath", metavar="WORKINGPATH",
                     default="", dest="workingpath",
                     help=_(
 u'Specify a working directory path to manipulate the video file'))
+PARSER.add_option(  "--profile", action="store_true",
+                    default=False, dest="profile",
+                    help=_(
+u'''Run the processing under the python profiler and save the profile
+statistics and a summary of the top functions and memory use in the log
+directory. Only used to find performance issues.'''))
 #
 OPTS, ARGS = PARSER.parse_args()
 #
@@ -437,11 +495,14 @@ Error(%s)\n''')
         #
         self.processing_started = datetime.now()
         self.subtitles = None
+        self.reservations = None
+        self.manifest = None
         #
         ## Check if the user wants to automatically generate a cut list when
-        ## it is empty but there is a skip list
+        ## it is empty but there is a skip list. The summary never changes
+        ## the MythTV data base.
         self.configuration['gencutlist'] = False
-        if opts.gencutlist:
+        if opts.gencutlist and not self.configuration['summary']:
             self.configuration['gencutlist'] = True
         #
         # end __init__()
@@ -456,6 +517,7 @@ Error(%s)\n''')
         '''
         if self.configuration['summary']:
             self._display_variables(summary=True)
+            self._display_plan()
             sys.exit(int(self.jobstatus.UNKNOWN))
         #
         if self.configuration['test']:
@@ -500,20 +562,156 @@ _(u'''Start loss less commercial cut of "%s" at: %s''') % (
         #
         self._display_variables()
         #
-        self._collect_metadate()
+        ## Time each stage and save the results even when the job aborts
+        self.jobstats = JobStatistics()
+        ## The job's intermediate files are kept in its own scratch
+        ## directory which is removed as a unit when the job ends. A job
+        ## that fails after finishing a stage keeps it for a rerun.
+        create_job_workpath(self.configuration)
+        completed = False
+        try:
+            ## Cut the final parts of a recording that is still being
+            ## recorded then start again with the finished recording. The
+            ## cut list is only generated once the recording has ended.
+            if self.configuration['follow']:
+                gencutlist = self.configuration['gencutlist']
+                self.configuration['gencutlist'] = False
+                self._collect_metadate()
+                self.configuration['gencutlist'] = gencutlist
+                with self.jobstats.stage('follow'):
+                    self._follow_recording()
+            #
+            self._collect_metadate()
+            #
+            with self.jobstats.stage('preflight'):
+                self._preflight()
+            #
+            self._load_manifest()
+            #
+            if self.configuration['tscut']:
+                self._tscut()
+            else:
+                # Only process subtitles if they need to be included
+                if not self.configuration['strip'] and self.subtitles:
+                    with self.jobstats.stage('subtitles'):
+                        self._process_subtitles()
+                #
+                with self.jobstats.stage('preprocessing'):
+                    self._cut_preprocessing()
+                #
+                if self.configuration['concertcuts']:
+                    with self.jobstats.stage('concert_cuts'):
+                        self._process_concert_cuts()
+                else:
+                    self._lossless_cut()
+            #
+            with self.jobstats.stage('cleanup'):
+                self._cleanup()
+            completed = True
+        finally:
+            if self.reservations is not None:
+                self.reservations.release()
+            if completed or self.manifest is None or \
+                    not self.manifest.stages:
+                remove_job_workpath(self.configuration)
+            else:
+                # TRANSLATORS: Please leave %s as it is,
+                # because it is needed by the program.
+                # Thank you for contributing to this project.
+                self.logger.info(_(
+u'''The scratch directory "%s" is kept so a rerun of this job can resume
+from its finished stages.''') % self.configuration['workpath'])
+            self.mythtvinterface.release_lease()
+            self._write_job_statistics()
         #
-        # Only process subtitles if they need to be included
-        if not self.configuration['strip'] and self.subtitles:
-            self._process_subtitles()
+        return
+#
+    def _write_job_statistics(self,):
+        ''' Save the job's stage timing and I/O statistics as a JSON file
+        in the log directory. Failing to save them is never fatal.
+        return nothing
+        '''
+        filename = common.JOB_STATS_FILE % self.configuration
+        job_details = {
+            'version': self.configuration['version'],
+            'recordedfile': self.configuration['recordedfile'],
+            'recorded_filesize': self.configuration.get(
+                                                'recorded_filesize'),
+            'mkv_file': self.configuration.get('mkv_file'),
+            'mkv_filesize': self.configuration.get('filesize'),
+            'jobid': self.configuration['jobid'],
+            'concertcuts': bool(self.configuration['concertcuts']),
+            'tscut': self.configuration['tscut'],
+            'error_detected': self.configuration.get('error_detected'),
+        }
+        try:
+            self.jobstats.write(filename, job_details)
+        except (IOError, OSError, TypeError, ValueError) as errmsg:
+            self.logger.info(
+_(u'''Could not save the job statistics file "%s".
+Error: %s''') % (filename, errmsg))
         #
-        self._cut_preprocessing()
+        ## Keep the stage throughput for the "-s" execution plan
+        record_throughput(self.configuration, self.jobstats.totals())
         #
-        if self.configuration['concertcuts']:
-            self._process_concert_cuts()
-        else:
-            self._lossless_cut()
+        return
+#
+    def _load_manifest(self,):
+        ''' Start the job's manifest of finished stages. When an earlier
+        run of this recording with the same cut list and settings died,
+        the stages it finished whose outputs are verified are not run
+        again.
+        return nothing
+        '''
+        job = {
+            'version': self.configuration['version'],
+            'recordedfile': self.configuration['recordedfile'],
+            'recorded_filesize': self.configuration['recorded_filesize'],
+            'recorded_mtime': os.path.getmtime(
+                                    self.configuration['recordedfile']),
+            'keyframe_cuts': self.configuration['keyframe_cuts'],
+            'subtitles': bool(self.subtitles),
+        }
+        for key in ['strip', 'tracknumber', 'concertcuts', 'tscut',
+                    'mkvmerge_cut_addon']:
+            job[key] = self.configuration[key]
+        self.manifest = JobManifest(self.configuration['workpath'],
+                            self.configuration['recorded_name'], job)
+        finished = self.manifest.load()
+        if finished:
+            # TRANSLATORS: Please leave %s as it is,
+            # because it is needed by the program.
+            # Thank you for contributing to this project.
+            verbage = _(
+u'''Resuming an earlier run of this job, the verified stages "%s"
+are not run again.''') % u', '.join(finished)
+            self.logger.info(verbage)
+            sys.stdout.write(verbage + u'\n')
         #
-        self._cleanup()
+        return
+#
+    def _display_plan(self,):
+        ''' Display the stages that would run with their predicted bytes
+        read and written, the peak working directory space, the output
+        size and the estimated run time. Only the recording's metadata is
+        collected, nothing is cut or changed.
+        return nothing
+        '''
+        self.jobstats = JobStatistics()
+        self._collect_metadate()
+        #
+        ## The byte range of each kept segment from the recordedseek table
+        frames = []
+        for cut in self.configuration['keyframe_cuts']:
+            frames.extend(cut)
+        offsets = self.mythtvinterface.keyframe_byte_offsets(frames)
+        segments = [(offsets[index], offsets[index + 1])
+                        for index in range(0, len(offsets), 2)]
+        #
+        plan = build_plan(self.configuration, self.subtitles, segments,
+                    transport_stream=transport_stream_sync(
+                        self.configuration['recordedfile']) is not None)
+        sys.stdout.write(format_plan(self.configuration, plan))
         #
         return
 #
@@ -526,14 +724,18 @@ _(u'''Start loss less commercial cut of "%s" at: %s''') % (
         '''
         #
         self.subtitles = False
+        self.configuration['recorded_filesize'] = os.path.getsize(
+                                    self.configuration['recordedfile'])
         # Get the xml track info using mediainfo
-        self.configuration['trackinfo'] = get_mediainfo(
+        with self.jobstats.stage('mediainfo'):
+            self.configuration['trackinfo'] = get_mediainfo(
                         self.configuration['recordedfile'],
                         self.element_filter, self.tracks_filter,
                         etree, self.logger, sys)
         #
         ## Get this recordings metadata and other data from the MyhTV DB
-        self.mythtvinterface.get_recorded_data()
+        with self.jobstats.stage('metadata'):
+            self.mythtvinterface.get_recorded_data()
         #
         display_recorded_info(self.configuration, self.logger)
         #
@@ -559,7 +761,8 @@ _(u'''Start loss less commercial cut of "%s" at: %s''') % (
                     u'%(title)s' % self.configuration
         #
         self.configuration['iso639_2_lang_codes'] = \
-                            read_iso_language_codes(logger=self.logger)
+                            read_iso_language_codes(logger=self.logger,
+                                cachepath=self.configuration['cachepath'])
         #
         ## Replace mythvidexport format variables with config key equivalents
         for find_replace in self.configuration['mythvidexport_rep']:
@@ -594,6 +797,15 @@ Recorded file:
         return nothing
         '''
         #
+        ## An earlier run of this job finished the subtitles. Only a
+        ## verified subtitle remux is left in the working directory.
+        tmp_mkv = u'%(workpath)s/%(recorded_name)s_tmp.mkv' % \
+                                                        self.configuration
+        if self.manifest.finished('subtitles'):
+            if os.path.isfile(tmp_mkv):
+                self.configuration['sourcefile'] = tmp_mkv
+            return
+        #
         self.configuration['srt_files'] = []
         #
         ## Attempt to extract non-SRT subtitle tracks and convert
@@ -890,6 +1102,7 @@ Commandline options: "%s"
         #
         ## If there are no srt files to process return
         if not self.configuration['srt_files']:
+            self.manifest.record('subtitles', [])
             return
         #
         ## Add the srt file(s)
@@ -959,8 +1172,8 @@ Error: %s''') % (result[1])
         #
         ## Change the source video file that will be cut then merged
         ## into a final mkv video including srt subtitle track(s).
-        self.configuration['sourcefile'] = \
-            "%(workpath)s/%(recorded_name)s_tmp.mkv" % self.configuration
+        self.configuration['sourcefile'] = tmp_mkv
+        self.manifest.record('subtitles', [tmp_mkv])
         #
         # Refresh the xml track info using mediainfo
         self.configuration['trackinfo'] = get_mediainfo(
@@ -970,15 +1183,35 @@ Error: %s''') % (result[1])
         #
         return
 #
-    def _cut_preprocessing(self,):
+    def _preflight(self,):
         '''
-        Generate the get cutlist
-        Get cutlist and massage it to match keyframes
-        Create timecode split list using recordseek's fps value
-        Build the track appendto list
-        Build the merge string of segments
+        Perform the inexpensive checks before the first full pass over the
+        recording so a job that cannot succeed ends straight away:
+        1) A MythVideo export file name that already exists
+        2) The output mkv file name or Concert Cut file name collisions
+        3) A cut list that leaves nothing to keep
+        4) Working and output directory disk space
+        5) Error detection rules marked to run against the source
+        6) A transport stream cut of a recording that is not a transport
+           stream
         return nothing
         '''
+        ## A transport stream cut keeps the recording's file extension
+        self.configuration['output_extension'] = u'.mkv'
+        if self.configuration['tscut']:
+            self.configuration['output_extension'] = \
+                                u'.' + self.configuration['recorded_ext']
+            if transport_stream_sync(
+                        self.configuration['recordedfile']) is None:
+                # TRANSLATORS: Please leave %s as it is,
+                # because it is needed by the program.
+                # Thank you for contributing to this project.
+                verbage = _(u'''
+The transport stream cut option "-R" only works with MPEG transport stream
+recordings, aborting script.
+Recording: %s''') % (self.configuration['recordedfile'])
+                self._preflight_abort(verbage)
+        #
         # If the video is being exported set the move directory
         # and mkv title to the recorded dir and the filename.
         # With export trick logic into processing the video
@@ -997,13 +1230,7 @@ Error: %s''') % (result[1])
                 verbage = _(u'''
 The MythVideo already exists, aborting script.
 MythVideo: %s''') % (self.configuration['export_path_file'])
-                self.logger.critical(verbage)
-                sys.stderr.write(verbage + u'\n')
-                #
-                ## Remove this recording's files from the working directory
-                cleanup_working_dir(self.configuration['workpath'],
-                                    self.configuration['recorded_name'])
-                exit(int(self.jobstatus.ABORTED))
+                self._preflight_abort(verbage)
             #
             directory, filename = os.path.split(
                                 self.configuration['export_path_file'])
@@ -1016,7 +1243,8 @@ MythVideo: %s''') % (self.configuration['export_path_file'])
             while True:
                 self.configuration['mkv_file'] = os.path.join(
                     self.configuration['movepath'],
-                    self.configuration['mkv_title'] + u'.mkv')
+                    self.configuration['mkv_title'] +
+                                    self.configuration['output_extension'])
                 ## Check for a duplicate file in export directory
                 if os.path.isfile(self.configuration['mkv_file']):
                     self.configuration['mkv_title'] = \
@@ -1024,6 +1252,16 @@ MythVideo: %s''') % (self.configuration['export_path_file'])
                         datetime.now().strftime(common.LL_START_END_FORMAT)
                     continue
                 break
+        elif self.configuration['tscut']:
+            ## The cut is renamed over the recording in the cleanup
+            self.configuration['mkv_file'] = \
+                        common.TS_CUT_REPLACE_FILE % self.configuration
+            #
+            # Remove any old cut file that may exist
+            try:
+                os.remove(self.configuration['mkv_file'])
+            except:
+                pass
         else:
             self.configuration['mkv_file'] = os.path.join(
                 self.configuration['recorded_dir'],
@@ -1035,6 +1273,242 @@ MythVideo: %s''') % (self.configuration['export_path_file'])
             except:
                 pass
         #
+        if self.configuration['concertcuts']:
+            self._preflight_concert_cuts()
+        #
+        ## A cut list where every cut falls outside the recording's
+        ## keyframes would leave nothing to copy
+        if self.configuration['rawcutlist'] and \
+                    not self.configuration['keyframe_cuts']:
+            # TRANSLATORS: Please leave %s as it is,
+            # because it is needed by the program.
+            # Thank you for contributing to this project.
+            verbage = _(u'''
+The cut list leaves nothing to keep once adjusted to keyframes, aborting script.
+Cut list: %s''') % (self.configuration['rawcutlist'], )
+            self._preflight_abort(verbage)
+        #
+        self._preflight_disk_space()
+        #
+        ## Run any error detection rules that check the source recording
+        self.configuration['source_error_detected'] = False
+        with self.jobstats.stage('error_detection'):
+            self.configuration['source_error_detected'] = \
+                                    self.error_detection(stage='source')
+        #
+        return
+#
+    def _preflight_concert_cuts(self,):
+        ''' Check that none of the Concert Cut segment file names are
+        already used by a file or a MythVideo record.
+        return nothing
+        '''
+        ## If there is no subtitle then remove it from the file name
+        ## format string
+        default_sub_var = '%(subtitle)s'
+        if not self.configuration['subtitle'] and \
+                self.configuration['concertcuts'].find(
+                                                default_sub_var) != -1:
+            self.configuration['concertcuts'] = \
+                    self.configuration['concertcuts'].replace(
+                                            default_sub_var, u'').strip()
+            if self.configuration['concertcuts'][-1:] == ':':
+                self.configuration['concertcuts'] = \
+                        self.configuration['concertcuts'][:-1]
+        #
+        ## One Concert Cut per kept part or the whole recording when
+        ## there is no cut list. The cut timestamps are only made later.
+        segments = 1
+        if self.configuration['rawcutlist']:
+            segments = len(self.configuration['keyframe_cuts'])
+        export_path_file = self.configuration.get('export_path_file')
+        for seg_num in range(1, segments + 1):
+            file_name = self._concert_cut_file_name(seg_num)
+            if self.configuration['mythvideo_export']:
+                self.configuration['export_path_file'] = file_name
+                duplicate = self.mythtvinterface.is_unique()
+            else:
+                duplicate = os.path.isfile(os.path.join(
+                        self.configuration['movepath'], file_name + u'.mkv'))
+            if duplicate:
+                # TRANSLATORS: Please leave %s as it is,
+                # because it is needed by the program.
+                # Thank you for contributing to this project.
+                verbage = _(u'''
+The Concert Cut segment file already exists, aborting script.
+Segment: %s''') % (file_name)
+                self._preflight_abort(verbage)
+        self.configuration['export_path_file'] = export_path_file
+        #
+        return
+#
+    def _preflight_disk_space(self,):
+        ''' Estimate the space used in the working and the output
+        directories from the recording's size and the portion of the
+        recording being kept.
+        return nothing
+        '''
+        filesize = os.path.getsize(self.configuration['recordedfile'])
+        #
+        ## The kept portion of the recording from the keyframe cut list
+        kept_size = filesize
+        if self.configuration['rawcutlist'] and \
+                    self.configuration['last_frame']:
+            kept_frames = 0
+            for cut in self.configuration['keyframe_cuts']:
+                kept_frames += cut[1] - cut[0]
+            kept_size = min(filesize, long(filesize * \
+                    (float(kept_frames) / self.configuration['last_frame'])))
+        #
+        ## The subtitle remux is a full copy of the recording in the
+        ## working directory followed by the cut segments. A transport
+        ## stream cut is written straight to its output directory.
+        work_needed = kept_size
+        if self.configuration['tscut']:
+            work_needed = 0
+        elif not self.configuration['strip'] and self.subtitles:
+            work_needed += filesize
+        #
+        ## The segment cache outlives the job and may grow to its size
+        ## limit. The job's own segments are already counted and become
+        ## part of the cache.
+        if not self.configuration['tscut'] and \
+                self.configuration['segment_cache_hours'] > 0 and \
+                self.configuration['segment_cache_megabytes'] > 0:
+            cache_limit = \
+                self.configuration['segment_cache_megabytes'] * 1024 * 1024
+            work_needed += max(0, cache_limit - kept_size -
+                                segment_cache_bytes(self.configuration))
+        #
+        ## Several mkvmerge cut processes of a transport stream recording
+        ## each read a copy of their own span of it
+        cuts = self.configuration['keyframe_cuts']
+        if self.configuration['rawcutlist'] and len(cuts) > 1 and \
+                self.configuration['cut_processes'] > 1 and \
+                not self.configuration['tscut'] and \
+                not self.configuration['concertcuts'] and \
+                (self.configuration['strip'] or not self.subtitles) and \
+                transport_stream_sync(
+                        self.configuration['recordedfile']) is not None:
+            first_frame, start, end = \
+                    self.mythtvinterface.keyframe_byte_span(cuts[0][0],
+                                                            cuts[-1][1])
+            work_needed += end - start
+        output_dir = os.path.dirname(self.configuration['mkv_file'])
+        if self.configuration['concertcuts']:
+            if self.configuration['mythvideo_export']:
+                output_dir = self.configuration['workpath']
+            else:
+                output_dir = self.configuration['movepath']
+        #
+        needed = {}
+        for directory, size in [(self.configuration['workpath'],
+                                                    work_needed),
+                                (output_dir, kept_size)]:
+            device = os.stat(directory).st_dev
+            if device in needed:
+                needed[device][1] += size
+            else:
+                needed[device] = [directory, size]
+        #
+        workpath_device = os.stat(self.configuration['workpath']).st_dev
+        for device, (directory, size) in needed.items():
+            size = long(size * common.PREFLIGHT_DISK_SPACE_MARGIN)
+            if device == workpath_device:
+                ## Concurrent jobs share the working directory's space
+                directory = self.configuration['workpath']
+                with self.jobstats.stage('reservation_wait'):
+                    available = self._reserve_workpath_space(size)
+            else:
+                stats = os.statvfs(directory)
+                available = stats.f_bsize * stats.f_bavail
+            if not available > size:
+                # TRANSLATORS: Please leave %s as it is,
+                # because it is needed by the program.
+                # Thank you for contributing to this project.
+                verbage = _(
+u'''There is not enough available disk space in the directory "%s" available "%s" bytes
+to loss less cut recording "%s", estimated space needed "%s" bytes, aborting script.''') % (
+                    directory, available,
+                    self.configuration['recordedfile'], size)
+                self._preflight_abort(verbage)
+        #
+        return
+#
+    def _reserve_workpath_space(self, size):
+        ''' Reserve the working directory space in the ledger shared by
+        the running jobs. Wait while the other jobs' reservations leave
+        too little space, for at most the "reservation_wait_minutes"
+        performance setting.
+        return the bytes available to this job
+        '''
+        self.reservations = SpaceReservations(
+                                self.configuration['workpath_root'],
+                                self.configuration['recorded_name'])
+        started = time.time()
+        waiting = False
+        while True:
+            reserved, available = self.reservations.try_reserve(size)
+            if reserved:
+                break
+            #
+            minutes = self.configuration['reservation_wait_minutes']
+            if time.time() - started >= minutes * 60:
+                # TRANSLATORS: Please leave %s as it is,
+                # because it is needed by the program.
+                # Thank you for contributing to this project.
+                verbage = _(
+u'''Waited %s minutes for other jobs to free space in the working directory "%s",
+estimated space needed "%s" bytes, available "%s" bytes, aborting script.''') % (
+                    minutes, self.configuration['workpath_root'], size,
+                    available)
+                self._preflight_abort(verbage)
+            #
+            if not waiting:
+                waiting = True
+                # TRANSLATORS: Please leave %s as it is,
+                # because it is needed by the program.
+                # Thank you for contributing to this project.
+                verbage = _(
+u'''Waiting for other jobs to free space in the working directory "%s",
+estimated space needed "%s" bytes, available "%s" bytes.''') % (
+                    self.configuration['workpath_root'], size, available)
+                self.logger.info(verbage)
+                sys.stdout.write(verbage + u'\n')
+                if self.configuration['jobid']:
+                    self.mythtvinterface.update_jobqueue(
+                            self.jobstatus.RUNNING,
+                            _(u'Waiting for working directory space'))
+            time.sleep(common.RESERVATION_POLL_SECONDS)
+        #
+        if waiting:
+            self.logger.info(
+_(u'''Reserved "%s" bytes of working directory space after waiting "%d" seconds.''')
+                    % (size, time.time() - started))
+        #
+        return available
+#
+    def _preflight_abort(self, verbage):
+        ''' Report a failed preflight check and abort the script.
+        return nothing
+        '''
+        self.logger.critical(verbage)
+        sys.stderr.write(verbage + u'\n')
+        #
+        ## Remove this recording's files from the working directory
+        cleanup_working_dir(self.configuration['workpath'],
+                            self.configuration['recorded_name'])
+        exit(int(self.jobstatus.ABORTED))
+#
+    def _cut_preprocessing(self,):
+        '''
+        Generate the get cutlist
+        Get cutlist and massage it to match keyframes
+        Create timecode split list using recordseek's fps value
+        Build the track appendto list
+        Build the merge string of segments
+        return nothing
+        '''
         ## Get track total
         arguments = u'--identify "%(sourcefile)s"'
         result = commandline_call(common.MKVMERGE,
@@ -1112,19 +1586,11 @@ will be used with all -S subtitle tracks removed:
         if self.configuration['rawcutlist']:
             #
             ## Create timecode split list using recordseeks fps value
-            splitlist = u''
-            fps = self.configuration['fps']
-            for cut in self.configuration['keyframe_cuts']:
-                start_secs = cut[0] / fps
-                start_timecode = make_timestamp(start_secs)
-                end_secs = cut[1] / fps
-                end_timecode = make_timestamp(end_secs)
-                if splitlist:
-                    splitlist += u','
-                split = u'%s-%s' % (start_timecode, end_timecode)
-                splitlist += split
-                self.configuration['concert_cut_list'].append(split)
-            self.configuration['split_list'] = splitlist
+            self.configuration['concert_cut_list'] = make_split_list(
+                                self.configuration['keyframe_cuts'],
+                                self.configuration['fps'])
+            self.configuration['split_list'] = \
+                            u','.join(self.configuration['concert_cut_list'])
             #
             self.logger.info(u'''Cut timestamps: %(split_list)s\n''' %
                                 self.configuration)
@@ -1164,34 +1630,16 @@ u'''Start copying at the first keyframe to the last keyframe, timestamps: %(spli
             if self.configuration['mkvmerge_cut_addon']:
                 mkvmerge += u' ' + self.configuration['mkvmerge_cut_addon']
             #
-            arguments = common.CUTS_CMD % self.configuration
-            result = commandline_call(mkvmerge, arguments)
-            stdout = u''
-            if self.configuration['verbose']:
-                stdout = result[1]
-            self.logger.info(_(u'''mkvmerge perform cuts command:
-> %s %s
-%s
-''' % (mkvmerge, arguments, stdout)))
-            if not result[0]:
-                # TRANSLATORS: Please leave %s as it is,
-                # because it is needed by the program.
-                # Thank you for contributing to this project.
-                verbage = _(
-u'''%s failed to cut the video into segments, aborting script.
-Error: %s''') % (common.MKVMERGE, result[1])
-                self.logger.critical(verbage)
-                sys.stderr.write(verbage + u'\n')
-                #
-                ## Remove this recording's files from the working directory
-                cleanup_working_dir(self.configuration['workpath'],
-                                    self.configuration['recorded_name'])
-                exit(int(self.jobstatus.ABORTED))
+            if self.manifest.finished('cut'):
+                self.logger.info(_(
+u'''The cut segments of an earlier run of this job were verified,
+the cuts are not performed again.'''))
+            else:
+                self._cut_segments(mkvmerge)
             #
             ## Build the track appendto list
             ## Format for one video, two audio and a subtitle track e.g.
             ## "%s:0:%s:0,%s:1:%s:1,%s:2:%s:2,%s:3:%s:3"
-            self.configuration['append_list'] = u''
             if self.configuration['strip']:
                 total_tracks = 3 # Only track 0 and 1 to worry about
             else:
@@ -1201,22 +1649,18 @@ Error: %s''') % (common.MKVMERGE, result[1])
                     self.configuration))
             if len(segments) == 1:
                 self.configuration['sourcefile'] = segments[0]
+                append_list = []
             else:
-                for segment in range(len(segments))[:-1]:
-                    nxt_segment = segment + 1
-                    for track in range(total_tracks)[:-1]:
-                        if self.configuration['append_list']:
-                            self.configuration['append_list'] += u','
-                        self.configuration['append_list'] += \
-                            common.APPENDTO_FORMAT % (
-                                nxt_segment, track, segment, track, )
+                append_list = [common.APPENDTO_FORMAT % (
+                                    segment + 1, track, segment, track, )
+                                for segment in range(len(segments) - 1)
+                                for track in range(total_tracks - 1)]
+            self.configuration['append_list'] = u','.join(append_list)
             #
-            self.configuration['merge'] = u''
-            for filename in segments:
-                if not self.configuration['merge']:
-                    self.configuration['merge'] = u'"%s"' % filename
-                else:
-                    self.configuration['merge'] += u' +"%s"' % filename
+            merge_files = segments[:1] + [u'+' + filename
+                                            for filename in segments[1:]]
+            self.configuration['merge'] = u' '.join([u'"%s"' % filename
+                                            for filename in merge_files])
         #
             self.logger.info(_(
 u'''
@@ -1227,66 +1671,52 @@ MKV metadata (only used if add metadata is "true"):
   Program title:       "%(mkv_title)s"
   Program description: "%(mkv_description)s"
 ''') % self.configuration)
-        #
-        merge_common = u'-o "%(mkv_file)s"'
         #
         ## Add any user specified mkvmerge merge options that may have
         ## been specified in the lossless_cut.cfg file
+        mkvmerge = common.MKVMERGE
         if self.configuration['mkvmerge_merge_addon']:
-            merge_common += u' ' + self.configuration['mkvmerge_merge_addon']
+            mkvmerge += u' ' + self.configuration['mkvmerge_merge_addon']
+        #
+        arguments = [u'-o', self.configuration['mkv_file']]
         #
         ## Add a video track delay (plus or minus) in millseconds
         ## Only when one was specified on the command line "-D"
         if self.configuration['delayvideo']:
-            merge_common += self.configuration['delayvideo']
+            arguments.extend(self.configuration['delayvideo'].split())
         #
-        merge_one_segment = u' "%(sourcefile)s"'
-        merge_metadata = \
-u' --title "%(mkv_title)s" --attachment-description "%(mkv_description)s"' % \
-            self.configuration
-        #
-        if not self.configuration['add_metadata']:
-            merge_metadata = u''
+        merge_metadata = []
+        if self.configuration['add_metadata']:
+            merge_metadata = [u'--title', self.configuration['mkv_title'],
+                u'--attachment-description',
+                                self.configuration['mkv_description']]
         if not self.configuration['rawcutlist'] or \
                             not self.configuration['append_list']:
             if self.configuration.has_key('append_list'):
-                arguments = u'%s%s%s' % (merge_common, merge_one_segment,
-                                            merge_metadata)
+                arguments += [self.configuration['sourcefile']] + \
+                                                            merge_metadata
             else:
-                arguments = u'%s %s' % (merge_common, common.START_CUT_CMD)
-        elif self.configuration['append_list']:
-            arguments = u'%s%s%s' % \
-                (merge_common, merge_metadata,
-            u' --append-mode track %(merge)s --append-to %(append_list)s')
+                arguments += self.configuration['strip_args'].split() + \
+                    [u'--split', u'parts:' + self.configuration['split_list'],
+                                            self.configuration['sourcefile']]
         else:
-            arguments = u'%s%s%s' % \
-                (merge_common, merge_metadata,
-                u' --append-mode track %(merge)s')
-    #
-    #
-############# Do not un-comment unless used for debugging ########
-#        for key in sorted(self.configuration.keys()):
-#            print u'key(%s) value(%s)' % (key, self.configuration[key])
-#        print
-#        print u'arguments(%s)' % (arguments % self.configuration)
-#        #
-#        ## Remove this recording's files from the working directory
-#        cleanup_working_dir(self.configuration['workpath'],
-#                            self.configuration['recorded_name'])
-##        exit(int(self.jobstatus.ABORTED))
-#################################################################
-    #
-    #
-        arguments = arguments % self.configuration
-        result = commandline_call(common.MKVMERGE, arguments)
+            arguments += merge_metadata + [u'--append-mode', u'track'] + \
+                merge_files + [u'--append-to',
+                                        self.configuration['append_list']]
+        #
+        options = write_mkvmerge_options(self.configuration, u'merge',
+                                         arguments)
+        with self.jobstats.stage('merge'):
+            result = commandline_call(mkvmerge, options)
         stdout = u''
         if self.configuration['verbose']:
             stdout = result[1]
         self.logger.info(_(u'''mkvmerge create final mkv video file command:
-> mkvmerge %s
+> %s %s
+Option file arguments: %s
 
 %s
-''' % (arguments, stdout)))
+''' % (mkvmerge, options, u' '.join(arguments), stdout)))
         if not result[0]:
             # TRANSLATORS: Please leave %s as it is,
             # because it is needed by the program.
@@ -1301,8 +1731,18 @@ Error: %s''') % (common.MKVMERGE, result[1])
                                 self.configuration['recorded_name'])
             exit(int(self.jobstatus.ABORTED))
         #
+        self._check_output()
+        #
+        return
+#
+    def _check_output(self,):
+        ''' Run the error detection rules against the new video file, check
+        that it was created and export it to MythVideo when requested.
+        return nothing
+        '''
         ## Perform user error detection processing
-        self.configuration['error_detected'] = self.error_detection()
+        with self.jobstats.stage('error_detection'):
+            self.configuration['error_detected'] = self.error_detection()
         #
         # Check that the new mkv video file was created
         if not os.path.isfile(self.configuration['mkv_file']):
@@ -1327,7 +1767,8 @@ Check the log file: "%(logfile)s"''') % self.configuration
         ## If this as an mythvidexport then add the MythVideo record
         if self.configuration['mythvideo_export']:
             try:
-                self.mythtvinterface.add_to_mythvideo()
+                with self.jobstats.stage('export'):
+                    self.mythtvinterface.add_to_mythvideo()
             except self.mythtvinterface.MythError as errmsg:
                 verbage = _(
 u'''The export to MythVideo failed, aborting script.
@@ -1347,23 +1788,299 @@ Error: %s''') % errmsg
         #
         return
 #
-    def _process_concert_cuts(self):
-        ''' Make each cut segment into a separate file.
+    def _tscut(self,):
+        ''' Copy the kept keyframe aligned byte ranges of the recording into
+        a new transport stream with the program tables at the start of each
+        range. Nothing is demuxed so the copy runs at close to disk speed.
+        Without a cut list the first to the last keyframe is copied.
         return nothing
         '''
+        if self.configuration['rawcutlist']:
+            cuts = self.configuration['keyframe_cuts']
+        else:
+            cuts = self.configuration['first_last_keyframes']
+        frames = []
+        for cut in cuts:
+            frames.extend(cut)
+        offsets = self.mythtvinterface.keyframe_byte_offsets(frames)
+        ranges = cut_ranges(self.configuration['recordedfile'],
+                            [(offsets[index], offsets[index + 1])
+                                for index in range(0, len(offsets), 2)])
         #
-        ## If there is no subtitle then remove it from the file name
-        ## format string
-        default_sub_var = '%(subtitle)s'
-        if not self.configuration['subtitle'] and \
-                self.configuration['concertcuts'].find(
-                                                default_sub_var) != -1:
-            self.configuration['concertcuts'] = \
-                    self.configuration['concertcuts'].replace(
-                                            default_sub_var, u'').strip()
-            if self.configuration['concertcuts'][-1:] == ':':
-                self.configuration['concertcuts'] = \
-                        self.configuration['concertcuts'][:-1]
+        try:
+            with self.jobstats.stage('tscut'):
+                written = copy_ranges(self.configuration['recordedfile'],
+                                      self.configuration['mkv_file'], ranges)
+        except (IOError, OSError) as errmsg:
+            # TRANSLATORS: Please leave %s as it is,
+            # because it is needed by the program.
+            # Thank you for contributing to this project.
+            verbage = _(
+u'''The transport stream cut of "%s" failed, aborting script.
+Error: %s''') % (self.configuration['recordedfile'], errmsg)
+            self.logger.critical(verbage)
+            sys.stderr.write(verbage + u'\n')
+            #
+            try:
+                os.remove(self.configuration['mkv_file'])
+            except OSError:
+                pass
+            ## Remove this recording's files from the working directory
+            cleanup_working_dir(self.configuration['workpath'],
+                                self.configuration['recorded_name'])
+            exit(int(self.jobstatus.ABORTED))
+        #
+        # TRANSLATORS: Please leave %s as it is,
+        # because it is needed by the program.
+        # Thank you for contributing to this project.
+        self.logger.info(_(u'''
+Transport stream cut byte ranges: %s
+Copied "%d" bytes into "%s"
+''') % (u', '.join([u'%d-%d' % (start, end)
+                            for start, end, tables in ranges]),
+                written, self.configuration['mkv_file']))
+        #
+        self._check_output()
+        #
+        return
+#
+    def _follow_recording(self,):
+        ''' Cut the kept parts of a recording while MythTV is still
+        recording it. At each "follow_poll_seconds" check the keyframes and
+        the cut list are read again and each kept part that ended at least
+        "follow_guard_seconds" before the last keyframe is cut into the
+        segment cache. Once the recording has ended the job only has to cut
+        the parts after the last staged one before the merge.
+        return nothing
+        '''
+        staging = True
+        if not self.configuration['segment_cache_hours'] > 0:
+            staging = False
+            verbage = _(
+u'''The segment cache is disabled by its "segment_cache_hours" performance
+setting so no segments are cut while the recording is followed.''')
+            self.logger.info(verbage)
+        elif not self.configuration['strip'] and self.subtitles:
+            staging = False
+            verbage = _(
+u'''The subtitles are remuxed into a copy of the finished recording before
+it is cut so no segments are cut while the recording is followed.''')
+            self.logger.info(verbage)
+        #
+        mkvmerge = common.MKVMERGE
+        if self.configuration['mkvmerge_cut_addon']:
+            mkvmerge += u' ' + self.configuration['mkvmerge_cut_addon']
+        #
+        staged = set()
+        while self.mythtvinterface.recording_in_progress():
+            if staging:
+                self.mythtvinterface.refresh_recording()
+                guard = self.configuration['fps'] * \
+                            self.configuration['follow_guard_seconds']
+                cuts = self.configuration['keyframe_cuts']
+                final = [index for index in range(len(cuts))
+                    if cuts[index][1] + guard <= \
+                                        self.configuration['last_frame'] and
+                        tuple(cuts[index]) not in staged]
+                if final:
+                    # TRANSLATORS: Please leave %s as it is,
+                    # because it is needed by the program.
+                    # Thank you for contributing to this project.
+                    self.logger.info(_(
+u'''The recording is still being recorded, cutting "%d" kept parts whose
+cut list boundaries are final.''') % len(final))
+                    with self.jobstats.stage('preprocessing'):
+                        self._cut_preprocessing()
+                    self._cut_segments(mkvmerge, final)
+                    staged.update([tuple(cuts[index]) for index in final])
+                    ## The staged segments are kept in the segment cache
+                    cleanup_working_dir(self.configuration['workpath'],
+                                        self.configuration['recorded_name'])
+            time.sleep(self.configuration['follow_poll_seconds'])
+        #
+        # TRANSLATORS: Please leave %s as it is,
+        # because it is needed by the program.
+        # Thank you for contributing to this project.
+        self.logger.info(_(
+u'''The recording has ended, "%d" kept parts were cut while it was
+being recorded.''') % len(staged))
+        #
+        return
+#
+    def _cut_segments(self, mkvmerge, indexes=None):
+        ''' Cut the source video into one segment file per kept part of
+        the recording. Unchanged segments of an earlier cut of this
+        recording are reused from the segment cache and only the segments
+        that changed are cut. While a recording is followed only the kept
+        parts with the given indexes are cut into the segment cache and the
+        job's manifest is left alone.
+        return nothing
+        '''
+        segment_cache = SegmentCache(self.configuration)
+        segment_cache.expire()
+        cuts = self.configuration['keyframe_cuts']
+        segment_files = [common.SEGMENT_FILE % dict(self.configuration,
+                            seg_num=index + 1) for index in range(len(cuts))]
+        staging = indexes is not None
+        if not staging:
+            indexes = range(len(cuts))
+        missing = [index for index in indexes
+            if not segment_cache.fetch(cuts[index], segment_files[index])]
+        if len(missing) < len(indexes):
+            # TRANSLATORS: Please leave %s as it is,
+            # because it is needed by the program.
+            # Thank you for contributing to this project.
+            self.logger.info(_(
+u'''Reused "%d" of "%d" cut segments from the segment cache.''') % (
+                        len(indexes) - len(missing), len(indexes)))
+        if not missing:
+            if not staging:
+                self.manifest.record('cut', segment_files)
+            return
+        #
+        ## The new segments are cut to temporary names and then moved
+        ## into their places among the reused segments. Each group of
+        ## consecutive new segments is cut by its own mkvmerge process.
+        groups = self._group_cut_segments(missing)
+        inputs = self._cut_group_inputs(groups)
+        commands = []
+        for cut_process in range(len(groups)):
+            cut_names = dict(self.configuration,
+                recorded_name=common.SEGMENT_CUT_PREFIX % dict(
+                    self.configuration, cut_process=cut_process))
+            source, first_frame, ranges = inputs[cut_process]
+            split_list = u','.join(make_split_list(
+                    [(cuts[index][0] - first_frame, cuts[index][1] - first_frame)
+                                        for index in groups[cut_process]],
+                    self.configuration['fps']))
+            arguments = [u'-o', common.CUTS_OUTPUT % cut_names] + \
+                self.configuration['strip_args'].split() + \
+                [u'--split', u'parts:' + split_list, source]
+            options = write_mkvmerge_options(self.configuration,
+                                        u'cut%02d' % cut_process, arguments)
+            commands.append((cut_names, arguments, options))
+        #
+        results = [None] * len(commands)
+        def cut_group(cut_process):
+            ## A failure of any kind is reported by the abort below
+            source, first_frame, ranges = inputs[cut_process]
+            try:
+                if ranges is not None:
+                    copy_ranges(self.configuration['sourcefile'], source,
+                                ranges)
+                results[cut_process] = commandline_call(mkvmerge,
+                                                    commands[cut_process][2])
+            except Exception as errmsg:
+                results[cut_process] = [False, unicode(errmsg)]
+        #
+        with self.jobstats.stage('cut'):
+            if len(commands) == 1:
+                cut_group(0)
+            else:
+                workers = []
+                for cut_process in range(len(commands)):
+                    thread = threading.Thread(target=cut_group,
+                                              args=(cut_process, ))
+                    thread.daemon = True
+                    thread.start()
+                    workers.append(thread)
+                for thread in workers:
+                    thread.join()
+        #
+        for (cut_names, arguments, options), result in zip(commands, results):
+            stdout = u''
+            if self.configuration['verbose']:
+                stdout = result[1]
+            self.logger.info(_(u'''mkvmerge perform cuts command:
+> %s %s
+Option file arguments: %s
+%s
+''' % (mkvmerge, options, u' '.join(arguments), stdout)))
+        for result in results:
+            if result[0]:
+                continue
+            # TRANSLATORS: Please leave %s as it is,
+            # because it is needed by the program.
+            # Thank you for contributing to this project.
+            verbage = _(
+u'''%s failed to cut the video into segments, aborting script.
+Error: %s''') % (common.MKVMERGE, result[1])
+            self.logger.critical(verbage)
+            sys.stderr.write(verbage + u'\n')
+            #
+            ## Remove this recording's files from the working directory
+            cleanup_working_dir(self.configuration['workpath'],
+                                self.configuration['recorded_name'])
+            exit(int(self.jobstatus.ABORTED))
+        #
+        for source, first_frame, ranges in inputs:
+            if ranges is not None:
+                os.remove(source)
+        for group, (cut_names, arguments, options) in zip(groups, commands):
+            new_files = sorted(glob(
+                u'%(workpath)s/%(recorded_name)s-*.mkv' % cut_names))
+            for index, filename in zip(group, new_files):
+                os.rename(filename, segment_files[index])
+                segment_cache.store(cuts[index], segment_files[index])
+        segment_cache.expire()
+        #
+        if not staging:
+            self.manifest.record('cut', segment_files)
+        #
+        return
+#
+    def _group_cut_segments(self, missing):
+        ''' Split the segments to cut into at most "cut_processes" groups
+        of consecutive segments with about the same number of frames in
+        each group.
+        return a list of lists of segment indexes
+        '''
+        cuts = self.configuration['keyframe_cuts']
+        ## A kept part that runs to the end of the recording may end past
+        ## its last frame
+        last_frame = self.configuration['last_frame']
+        frames = [max(1, min(cuts[index][1], last_frame) - cuts[index][0])
+                                                    for index in missing]
+        #
+        return [[missing[index] for index in group] for group in
+            group_segments(frames, self.configuration['cut_processes'])]
+#
+    def _cut_group_inputs(self, groups):
+        ''' Find what each mkvmerge cut process reads. mkvmerge reads its
+        input from the start so several processes sharing a transport
+        stream recording are each given a copy of only their own span of
+        it, from the keyframe starting their first kept part to the
+        keyframe after their last. A span starts with the recording's
+        program tables and its cut timestamps are from its start keyframe.
+        return a list of (input file, first frame, byte ranges to copy or
+        None) tuples, one per group
+        '''
+        sourcefile = self.configuration['sourcefile']
+        if len(groups) < 2 or \
+                sourcefile != self.configuration['recordedfile'] or \
+                transport_stream_sync(sourcefile) is None:
+            return [(sourcefile, 0, None) for group in groups]
+        #
+        cuts = self.configuration['keyframe_cuts']
+        inputs = []
+        for cut_process, group in enumerate(groups):
+            first_frame, start, end = \
+                    self.mythtvinterface.keyframe_byte_span(
+                            cuts[group[0]][0], cuts[group[-1]][1])
+            inputs.append((common.SEGMENT_SPAN_FILE % dict(
+                                self.configuration, cut_process=cut_process),
+                           first_frame,
+                           cut_ranges(sourcefile, [(start, end)])))
+        #
+        return inputs
+#
+    def _process_concert_cuts(self):
+        ''' Make each cut segment into a separate file using a single
+        mkvmerge pass then give each file its Concert Cut name.
+        Segments are named, checked and exported while mkvmerge is still
+        cutting the following segments.
+        return nothing
+        '''
         #
         mkvmerge = common.MKVMERGE
         #
@@ -1378,98 +2095,210 @@ Error: %s''') % errmsg
             mkvmerge += self.configuration['delayvideo']
         #
         self.configuration['seg_num'] =  1
-        for self.configuration['split_list'] in self.configuration[
-                                                        'concert_cut_list']:
-            #
-            if self.configuration['segment_names'].has_key(
-                            self.configuration['seg_num']):
-                file_name = self.configuration[
-                                'segment_names'][
-                                self.configuration['seg_num']] % \
-                                    self.configuration
-            else:
-                file_name = self.configuration['concertcuts'] % \
-                                self.configuration
-            #
-            ## For a move make sure the sub directories
-            ## already exist. If not then create them
-            if self.configuration['mythvideo_export']:
-                directory, basefile = os.path.split(file_name)
-            else:
-                directory, basefile = os.path.split(
-                        os.path.join(self.configuration['movepath'],
-                                        file_name))
-                if not os.path.isdir(directory):
-                    os.makedirs(directory)
-            #
-            self.configuration['segment_filename'] = basefile
-            if self.configuration['mythvideo_export']:
-                self.configuration['segment_path'] = \
-                                            self.configuration['workpath']
-            else:
-                self.configuration['segment_path'] = directory
-            #
-            ## Perform the actual segment cut
-            arguments = common.CONCERT_CUTS_CMD % self.configuration
-            result = commandline_call(mkvmerge,
-                        arguments)
-            stdout = u''
-            if self.configuration['verbose']:
-                stdout = result[1]
-            self.logger.info(_(u'''mkvmerge perform Concert Cuts command:
+        ## Cut every segment with a single mkvmerge pass through the
+        ## recording. Each "parts:" range is written to its own numbered
+        ## file in the working directory.
+        concert_cut_list = self.configuration['concert_cut_list']
+        self.configuration['split_list'] = u','.join(concert_cut_list)
+        arguments = write_mkvmerge_options(self.configuration,
+            u'concert_cuts', [u'-o', common.CONCERT_CUTS_FILE %
+                                                    self.configuration] +
+            self.configuration['strip_args'].split() +
+            [u'--split', u'parts:' + self.configuration['split_list'],
+                                            self.configuration['sourcefile']])
+        log_file = common.CONCERT_CUTS_LOG % self.configuration
+        started = time.time()
+        logh = open(log_file, 'w')
+        try:
+            process = subprocess.Popen(
+                    (u'exec %s %s' % (mkvmerge, arguments)).encode('utf8'),
+                    shell=True, stdin=subprocess.PIPE, stdout=logh,
+                    stderr=subprocess.STDOUT, close_fds=True)
+        finally:
+            logh.close()
+        #
+        ## A bounded queue keeps the number of finished segments waiting
+        ## in the working directory capped
+        segment_queue = Queue.Queue(
+                    max(1, self.configuration['concert_cuts_queue_size']))
+        rusage = []
+        producer = threading.Thread(target=self._concert_cut_producer,
+                    args=(process, segment_queue, len(concert_cut_list),
+                            rusage))
+        producer.daemon = True
+        producer.start()
+        #
+        try:
+            for self.configuration['split_list'] in concert_cut_list:
+                segment_file = segment_queue.get()
+                if segment_file is None:
+                    break
+                self._export_concert_cut(segment_file)
+            producer.join()
+        finally:
+            ## Stop mkvmerge when the script is aborting part way through
+            rusage.append(reap_process(process, wait=False))
+            if process.returncode is None:
+                os.kill(process.pid, signal.SIGCONT)
+                process.kill()
+                rusage.append(reap_process(process))
+            rusage = [usage for usage in rusage if usage is not None]
+            record_tool_run(u'%s %s' % (mkvmerge, arguments),
+                    process.returncode, time.time() - started,
+                    (rusage or [None])[0], self.jobstats.current_stage())
+        #
+        fileh = open(log_file, 'r')
+        log_text = unicode(fileh.read(), 'utf8', 'replace')
+        fileh.close()
+        os.remove(log_file)
+        stdout = u''
+        if self.configuration['verbose']:
+            stdout = log_text
+        self.logger.info(_(u'''mkvmerge perform Concert Cuts command:
 > %s %s
 %s
 ''' % (mkvmerge, arguments, stdout)))
-            if not result[0]:
-                # TRANSLATORS: Please leave %s as it is,
-                # because it is needed by the program.
-                # Thank you for contributing to this project.
-                verbage = _(
+        if process.returncode >= common.MKVMERGE_ERROR_RETURN_CODE or \
+                    not self.configuration['seg_num'] == \
+                                        len(concert_cut_list) + 1:
+            # TRANSLATORS: Please leave %s as it is,
+            # because it is needed by the program.
+            # Thank you for contributing to this project.
+            verbage = _(
 u'''%s failed to Concert Cut the video into segments, aborting script.
-Error: %s''') % (common.MKVMERGE, result[1])
-                self.logger.critical(verbage)
-                sys.stderr.write(verbage + u'\n')
-                #
-                ## Remove this recording's cut files from the working directory
-                for filename in glob(u'%s/*' %
-                                        self.configuration['workpath']):
-                    os.remove(filename)
-                exit(int(self.jobstatus.ABORTED))
-            #
-            ## Perform user error detection processing
-            self.configuration['error_detected'] = self.error_detection()
+Error: %s''') % (common.MKVMERGE, log_text)
+            self.logger.critical(verbage)
+            sys.stderr.write(verbage + u'\n')
             #
-            ## If this is a mythvidexport then add the MythVideo record
-            ## and transfer the cut segment to MythVideo
-            if self.configuration['mythvideo_export']:
-                self.configuration['mkv_file'] = \
-                        u"%(segment_path)s/%(segment_filename)s.mkv" % \
-                                self.configuration
-                self.configuration['mkv_title'] = basefile
-                self.configuration['export_path_file'] = file_name
-                self.configuration['filesize'] = \
-                        os.path.getsize(self.configuration['mkv_file'])
+            ## Remove this recording's cut files from the working directory
+            cleanup_working_dir(self.configuration['workpath'],
+                                self.configuration['recorded_name'])
+            exit(int(self.jobstatus.ABORTED))
+        #
+        return
+#
+    def _concert_cut_producer(self, process, segment_queue, total,
+                                                            rusage):
+        ''' Runs in its own thread. Watch the single pass Concert Cut
+        mkvmerge and queue each segment file once mkvmerge has started
+        the next segment or has finished. mkvmerge is paused while the
+        queue is full. A None is always queued last. mkvmerge's resource
+        usage is added to the rusage list when it finishes.
+        return nothing
+        '''
+        file_format = common.CONCERT_CUTS_FILE % self.configuration
+        seg_index = 1
+        try:
+            while seg_index <= total:
+                if process.returncode is None:
+                    rusage.append(reap_process(process, wait=False))
+                finished = process.returncode is not None
+                if not finished and not os.path.isfile(
+                                        file_format % (seg_index + 1)):
+                    time.sleep(common.CONCERT_CUTS_POLL_SECONDS)
+                    continue
+                segment_file = file_format % seg_index
+                if not os.path.isfile(segment_file) or (finished and \
+                        process.returncode >= \
+                                common.MKVMERGE_ERROR_RETURN_CODE):
+                    break
                 try:
+                    segment_queue.put(segment_file, False)
+                except Queue.Full:
+                    if not finished:
+                        os.kill(process.pid, signal.SIGSTOP)
+                    segment_queue.put(segment_file)
+                    if not finished:
+                        os.kill(process.pid, signal.SIGCONT)
+                seg_index += 1
+        finally:
+            segment_queue.put(None)
+        #
+        return
+#
+    def _concert_cut_file_name(self, seg_num):
+        ''' Format the Concert Cut file name of a segment.
+        return the segment file name without the ".mkv" extension
+        '''
+        saved_seg_num = self.configuration.get('seg_num')
+        self.configuration['seg_num'] = seg_num
+        if self.configuration['segment_names'].has_key(seg_num):
+            file_name = self.configuration['segment_names'][seg_num] % \
+                                self.configuration
+        else:
+            file_name = self.configuration['concertcuts'] % \
+                            self.configuration
+        self.configuration['seg_num'] = saved_seg_num
+        #
+        return file_name
+#
+    def _export_concert_cut(self, segment_file):
+        ''' Give one cut segment its Concert Cut name then perform the
+        error detection and either the move or the MythVideo export.
+        return nothing
+        '''
+        file_name = self._concert_cut_file_name(
+                                        self.configuration['seg_num'])
+        #
+        ## For a move make sure the sub directories
+        ## already exist. If not then create them
+        if self.configuration['mythvideo_export']:
+            directory, basefile = os.path.split(file_name)
+        else:
+            directory, basefile = os.path.split(
+                    os.path.join(self.configuration['movepath'],
+                                    file_name))
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+        #
+        self.configuration['segment_filename'] = basefile
+        if self.configuration['mythvideo_export']:
+            self.configuration['segment_path'] = \
+                                        self.configuration['workpath']
+        else:
+            self.configuration['segment_path'] = directory
+        #
+        ## Give the cut segment its Concert Cut name. A move may be to
+        ## a different file system so the file is moved not renamed.
+        move(segment_file,
+                u"%(segment_path)s/%(segment_filename)s.mkv" % \
+                            self.configuration)
+        #
+        ## Perform user error detection processing
+        with self.jobstats.stage('error_detection'):
+            self.configuration['error_detected'] = self.error_detection()
+        #
+        ## If this is a mythvidexport then add the MythVideo record
+        ## and transfer the cut segment to MythVideo
+        if self.configuration['mythvideo_export']:
+            self.configuration['mkv_file'] = \
+                    u"%(segment_path)s/%(segment_filename)s.mkv" % \
+                            self.configuration
+            self.configuration['mkv_title'] = basefile
+            self.configuration['export_path_file'] = file_name
+            self.configuration['filesize'] = \
+                    os.path.getsize(self.configuration['mkv_file'])
+            try:
+                with self.jobstats.stage('export'):
                     self.mythtvinterface.add_to_mythvideo()
-                except self.mythtvinterface.MythError as errmsg:
-                    verbage = _(
+            except self.mythtvinterface.MythError as errmsg:
+                verbage = _(
 u'''The export to MythVideo failed, aborting script.
 Error: %s''') % errmsg
-                    self.logger.critical(verbage)
-                    sys.stderr.write(verbage + u'\n')
-                    #
-                    ## Delete this recording's cut segment files
-                    ## from the working directory
-                    for filename in glob(u'%s/*' %
-                                        self.configuration['workpath']):
-                        os.remove(filename)
-                    exit(int(self.jobstatus.ABORTED))
+                self.logger.critical(verbage)
+                sys.stderr.write(verbage + u'\n')
                 #
-                ## Remove the tramsferred segment from the workpath
-                ## directory as it is no longer required
-                os.remove(self.configuration['mkv_file'])
+                ## Delete this recording's cut segment files
+                ## from the working directory
+                cleanup_working_dir(self.configuration['workpath'],
+                                    self.configuration['recorded_name'])
+                exit(int(self.jobstatus.ABORTED))
             #
-            self.configuration['seg_num'] += 1
+            ## Remove the tramsferred segment from the workpath
+            ## directory as it is no longer required
+            os.remove(self.configuration['mkv_file'])
+        #
+        self.configuration['seg_num'] += 1
         #
         return
 #
@@ -1532,6 +2361,13 @@ _(u'''The original recording has been renamed to:
 "%s"''') % (self.configuration['recordedfile'] + u'.old')
                 self.logger.info(verbage)
                 sys.stdout.write(verbage + u'\n')
+            #
+            ## The transport stream cut takes the recording's file name
+            if self.configuration['tscut']:
+                os.rename(self.configuration['mkv_file'],
+                          self.configuration['recordedfile'])
+                self.configuration['mkv_file'] = \
+                                    self.configuration['recordedfile']
         #
         ## Remove this recording's files from the working directory
         cleanup_working_dir(self.configuration['workpath'],
@@ -1643,9 +2479,10 @@ u'''
         #
         return
 #
-    def error_detection(self, ):
-        ''' Execute user specified error detection. Depending on the
-        results:
+    def error_detection(self, stage='output'):
+        ''' Execute the user specified error detection rules for either
+        the "source" recording stage or the "output" mkv stage.
+        Depending on the results:
         1) Return after no issues were detected
         2) Update the job queue comment and status then return
         3) Update the job queue comment and status clean up working files
@@ -1654,14 +2491,35 @@ u'''
         return false to indicate that no error condition was detected
         '''
         #
+        ## A source rule that was triggered in the preflight stage still
+        ## counts as an error for the final mkv file
         error_detected = False
+        if stage == 'output':
+            error_detected = self.configuration['source_error_detected']
+        rules = [error for error in self.configuration['error_detection']
+                        if error['stage'] == stage]
         # There may be no user error checking specified
-        if not self.configuration['error_detection']:
+        if not rules:
             return error_detected
         #
-        for error in self.configuration['error_detection']:
-            arguments = error['bash_command'] % self.configuration
-            results = exec_commandline(arguments)
+        ## Run the rules' bash commands together on a bounded pool of
+        ## threads then apply the results in the configured order. An
+        ## "abort" rule ends a batch so the rules after it are only run
+        ## when it did not abort the job.
+        commands = [error['bash_command'] % self.configuration
+                        for error in rules]
+        all_results = []
+        #
+        for index, error in enumerate(rules):
+            if index == len(all_results):
+                batch_end = index + 1
+                while batch_end < len(rules) and \
+                        rules[batch_end - 1]['type'] != 'abort':
+                    batch_end += 1
+                all_results += self._run_error_detection_commands(
+                                            commands[index:batch_end])
+            arguments = commands[index]
+            results = all_results[index]
             errors, count_arg = "", ""
             if results[0]:
                 count_arg = results[0].strip()
@@ -1758,6 +2616,49 @@ Examine the log file "%s" for further details.
                 exit(int(self.jobstatus.ABORTED))
         #
         return error_detected
+#
+    def _run_error_detection_commands(self, commands):
+        ''' Run the error detection bash commands at the same time using
+        at most the configured number of worker threads. A command that
+        cannot be run returns no output.
+        return a list of the [stdout, stderr] results in the same order
+        as the commands
+        '''
+        all_results = [None] * len(commands)
+        command_queue = Queue.Queue()
+        for index in range(len(commands)):
+            command_queue.put(index)
+        #
+        def worker():
+            while True:
+                try:
+                    index = command_queue.get(False)
+                except Queue.Empty:
+                    return
+                results = [u'', u'']
+                try:
+                    results = exec_commandline(commands[index]) or results
+                except Exception as errmsg:
+                    # TRANSLATORS: Please leave %s as it is,
+                    # because it is needed by the program.
+                    # Thank you for contributing to this project.
+                    self.logger.error(_(
+u'''The error detection command "%s" failed: %s''') %
+                        (commands[index], errmsg))
+                finally:
+                    all_results[index] = results
+        #
+        workers = []
+        for count in range(min(len(commands), max(1,
+                        self.configuration['error_detection_workers']))):
+            thread = threading.Thread(target=worker)
+            thread.daemon = True
+            thread.start()
+            workers.append(thread)
+        for thread in workers:
+            thread.join()
+        #
+        return all_results
 #
 #
 if __name__ == "__main__":
@@ -1823,6 +2724,10 @@ copy the file "%s" to "%s", aborting script.
     #
     # Process the recorded video file according to the command line
     # options and the configuration file settings.
-    LOSSLESS_CUT.cut_video_file()
+    if OPTS.profile:
+        run_profiled(LOSSLESS_CUT.cut_video_file,
+                        LOSSLESS_CUT.configuration, u'lossless_cut')
+    else:
+        LOSSLESS_CUT.cut_video_file()
     #
     sys.exit(LOSSLESS_CUT.return_code)